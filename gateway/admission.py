@@ -0,0 +1,128 @@
+import threading
+import time
+
+from flask import Response, g, request
+from flask import current_app as app
+
+
+WRITE_METHODS = ('POST', 'PUT', 'DELETE')
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit of a class of routes, adapted to its latency the AIMD
+    way: each request answered within `target` seconds while the limit was
+    at least half used raises it by 1/limit (so by one per limit requests),
+    a slower or failed one cuts it by `backoff`, at most once per `target`
+    seconds so that one burst of slow requests is not counted many times.
+    """
+    def __init__(self, limit=50, min_limit=2, max_limit=200, target=1, backoff=0.9, share=1.0):
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target = target
+        self.backoff = backoff
+        self.share = share
+        self.inflight = 0
+        self.shed = 0
+        self._decreased_at = 0
+
+    def update(self, latency, ok):
+        if not ok or latency > self.target:
+            now = time.monotonic()
+            if now - self._decreased_at >= self.target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._decreased_at = now
+        elif self.inflight + 1 >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self):
+        return {'limit': int(self.limit), 'inflight': self.inflight, 'shed': self.shed}
+
+
+class AdmissionController:
+    """
+    Lets a request in only while its class of routes is under its adaptive
+    limit and all the classes together are under `share` of `max_inflight`.
+    Classes with a lower share (heavy pages) are shed first when the gateway
+    fills up, leaving the rest of it to those with a higher one (logins).
+    """
+    def __init__(self, classes, routes=None, max_inflight=200, **defaults):
+        defaults.setdefault('max_limit', max_inflight)
+        self.classes = {name: AdaptiveLimit(**dict(defaults, **options)) for name, options in classes.items()}
+        self.routes = dict(routes or {})
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(routes=config.get('ADMISSION_ROUTES'), **config['ADMISSION'])
+
+    def class_of(self, rule, method):
+        """
+        The class of a route, None for those never shed.
+        """
+        if rule in self.routes:
+            return self.routes[rule]
+        return 'writes' if method in WRITE_METHODS else 'reads'
+
+    def acquire(self, name):
+        limit = self.classes[name]
+        with self._lock:
+            if limit.inflight >= limit.limit or self.inflight >= self.max_inflight * limit.share:
+                limit.shed += 1
+                return False
+            limit.inflight += 1
+            self.inflight += 1
+            return True
+
+    def release(self, name, latency, ok):
+        limit = self.classes[name]
+        with self._lock:
+            limit.inflight -= 1
+            self.inflight -= 1
+            limit.update(latency, ok)
+
+    def stats(self):
+        return {name: limit.stats() for name, limit in self.classes.items()}
+
+
+def _admit():
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    name = app.admission.class_of(rule, request.method)
+    if name is None:
+        return None
+    if not app.admission.acquire(name):
+        return Response(app.overloaded_page, 503, {'Retry-After': '1'}, mimetype='text/html')
+    g.admission = (name, time.perf_counter())
+
+
+def _admitted_finished(response):
+    g.admission_ok = response.status_code < 500
+    return response
+
+
+def _admitted_teardown(exc):
+    admitted = g.pop('admission', None)
+    if admitted is not None:
+        name, started = admitted
+        ok = exc is None and g.pop('admission_ok', False)
+        app.admission.release(name, time.perf_counter() - started, ok)
+
+
+def init_admission(app):
+    """
+    Shed the requests over the admission limits at once with a 503, from a
+    page rendered here once for all, before they queue behind the backends.
+    With ADMISSION_ENABLED off nothing is shed, the limits are only shown.
+    """
+    app.admission = AdmissionController.from_config(app.config)
+    if not app.config.get('ADMISSION_ENABLED', True):
+        return
+    with app.app_context():
+        app.overloaded_page = app.jinja_env.get_template('message.html').render(
+            message='\\_(-.-)_/ TOO BUSY, TRY AGAIN IN A MOMENT \\_(-.-)_/', notlogged=True)
+    app.before_request(_admit)
+    app.after_request(_admitted_finished)
+    app.teardown_request(_admitted_teardown)
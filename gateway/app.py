@@ -1,7 +1,19 @@
+from gateway.admission import init_admission
 from gateway.auth import login_manager
+from gateway.backend import BackendClient, FanoutError
+from gateway.dice_strips import DiceStrips
+from gateway.identity import Identity, RotatingSessionInterface
+from gateway.instrumentation import init_instrumentation
+from gateway.login_throttle import LoginThrottle
+from gateway.rate_limit import init_rate_limiting
+from gateway.static_assets import StaticAssets
+from gateway.story_index import StoryIndex
+from gateway.templating import init_templating
+from gateway.user_store import make_user_store
 from gateway.views import blueprints
 
 from flask import Flask, jsonify, render_template
+from requests.exceptions import RequestException
 
 def internal_error(e):
     return render_template('message.html', message='\_(-.-)_/ SOMETHING WENT WRONG \_(-.-)_/'), 500
@@ -12,8 +24,9 @@ def missing_page(e):
 def unauthorized_access(e):
     return render_template('message.html', message='\_(-.-)_/ UNAUTHORIZED ACCESS \_(-.-)_/', notlogged=True), 401
 
-def create_app(test = False):
+def create_app(test = False, config = None):
     app = Flask(__name__, static_url_path='/static')
+    app.config.from_object('gateway.settings')
     app.config['WTF_CSRF_SECRET_KEY'] = 'A SECRET KEY'
     app.config['SECRET_KEY'] = 'ANOTHER ONE'
     if test:
@@ -21,13 +34,30 @@ def create_app(test = False):
         app.config['CELERY_ALWAYS_EAGER'] = True
         app.config['WTF_CSRF_ENABLED'] = False
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if config is not None:
+        app.config.update(config)
     
     for bp in blueprints:
         app.register_blueprint(bp)
         bp.app = app
 
-    app.users = {}
+    app.users = make_user_store(app.config)
+    app.identity = Identity.from_config(app.config)
+    if app.config.get('IDENTITY_KEYS'):
+        app.session_interface = RotatingSessionInterface(app.config['IDENTITY_KEYS'])
+    app.login_throttle = LoginThrottle.from_config(app.config)
+    app.backend = BackendClient.from_config(app.config)
+    app.story_index = StoryIndex.from_config(app.backend, app.config) if app.config['STORY_INDEX'] else None
+    app.assets = StaticAssets(app.config['ASSETS_DIR'])
+    app.dice_strips = DiceStrips(app.assets, app.config['DICE_STRIPS_DIR'], app.config['DICE_STRIPS_MAX_FILES'],
+                                 max_cells=app.config['DICE_STRIPS_MAX_CELLS'])
+    init_templating(app)
+    init_instrumentation(app)
+    init_admission(app)
+    init_rate_limiting(app)
     app.register_error_handler(500, internal_error)
+    app.register_error_handler(FanoutError, internal_error)
+    app.register_error_handler(RequestException, internal_error)
     app.register_error_handler(404, missing_page)
     app.register_error_handler(401, unauthorized_access)
     login_manager.init_app(app)
@@ -1,9 +1,9 @@
 import functools
 
-from gateway.classes.user import User
+from gateway.classes.user import SessionUser
 
 from flask_login import current_user, LoginManager
-from flask import current_app as app
+from flask import current_app as app, session
 
 
 login_manager = LoginManager()
@@ -17,15 +17,28 @@ def admin_required(func):
         return func(*args, **kw)
     return _admin_required
 
+def remember_user(user):
+    if app.config['IDENTITY'] == 'token':
+        session['identity'] = app.identity.dumps(user)
+    else:
+        app.users[str(user.user_id)] = user
+
+def forget_user(user_id):
+    if app.config['IDENTITY'] == 'token':
+        app.identity.revoke(session.pop('identity', None))
+    else:
+        app.users.pop(str(user_id))
+
 @login_manager.user_loader
 def load_user(user_id):
-    user_id = str(user_id)
-    if user_id in app.users:
-        user = app.users[user_id]
+    if app.config['IDENTITY'] == 'token':
+        user = app.identity.loads(session.get('identity'))
+        if user is not None and str(user.user_id) != str(user_id):
+            user = None
     else:
-        user = None
+        user = app.users.get(str(user_id))
 
     if user is not None:
-        user.is_authenticated = True
+        user = SessionUser(user)
 
     return user
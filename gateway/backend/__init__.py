@@ -0,0 +1,9 @@
+from .breaker import CircuitBreaker, CircuitOpenError
+from .client import BackendClient, BackendResponse
+from .codec import JsonCodec, OrjsonCodec, get_codec
+from .deadline import DeadlineExceeded
+from .fanout import Call, FanoutError
+from .hedging import Hedging
+from .models import Story
+from .registry import ServiceRegistry
+from .retry import RetryBudget
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import deque
+
+import requests
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Watches the outcome of the last `window` calls to a service. Once at
+    least `min_calls` were made and the share of failed ones (errors, 5xx
+    replies or replies slower than `slow_call` seconds) reaches
+    `error_rate`, the circuit opens and calls fail at once. After
+    `open_for` seconds a single probe call is let through (half open): its
+    success closes the circuit, its failure opens it again.
+    """
+    def __init__(self, name, window=20, min_calls=10, error_rate=0.5, slow_call=0.8, open_for=5):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.open_for = open_for
+        self.state = CLOSED
+        self.rejected = 0
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Raise CircuitOpenError unless a call may go through now.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_for:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError('circuit of ' + self.name + ' is open')
+
+    def record(self, ok, latency=0):
+        failed = not ok or latency > self.slow_call
+        with self._lock:
+            if self.state == OPEN:
+                return
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls and \
+                    sum(self._outcomes) >= self.error_rate * len(self._outcomes):
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': sum(self._outcomes),
+            'calls': len(self._outcomes),
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+FRESH = 'fresh'
+STALE = 'stale'
+
+
+class ResponseCache:
+    """
+    Backend replies kept for a while, grouped by named policies each with its
+    own time to live. Past its ttl an entry is still served for `stale`
+    seconds while the caller refreshes it. At most `max_size` entries are
+    kept, the least recently used go first.
+    """
+    def __init__(self, ttls, max_size=1000, stale=60):
+        self.ttls = dict(ttls)
+        self.max_size = max_size
+        self.stale = stale
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, policy, key):
+        """
+        Return (response, FRESH or STALE), or (None, None) on a miss.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((policy, key))
+            if entry is not None:
+                stored, response = entry
+                age = now - stored
+                if age < self.ttls[policy]:
+                    self._entries.move_to_end((policy, key))
+                    self.hits += 1
+                    return response, FRESH
+                if age < self.ttls[policy] + self.stale:
+                    self.stale_hits += 1
+                    return response, STALE
+                del self._entries[(policy, key)]
+            self.misses += 1
+            return None, None
+
+    def put(self, policy, key, response):
+        with self._lock:
+            self._entries[(policy, key)] = (time.monotonic(), response)
+            self._entries.move_to_end((policy, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, policy, key=None):
+        """
+        Drop the entry `key` of `policy`, or every entry of `policy`.
+        """
+        with self._lock:
+            if key is not None:
+                self._entries.pop((policy, key), None)
+                return
+            for cached in [cached for cached in self._entries if cached[0] == policy]:
+                del self._entries[cached]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+        }
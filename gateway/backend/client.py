@@ -0,0 +1,309 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .breaker import CircuitBreaker, CircuitOpenError
+from .cache import STALE, ResponseCache
+from .codec import JsonCodec, get_codec
+from .deadline import DEADLINE_HEADER, DeadlineExceeded, remaining
+from .fanout import fanout, gather
+from .hedging import Hedging
+from .histogram import Histogram
+from .models import Story
+from .registry import ServiceRegistry
+from .retry import RetryBudget
+from .singleflight import SingleFlight
+from .tracing import current_trace, route_of
+
+
+class BackendResponse:
+    """
+    Fully read reply of a backend call. The connection is already back in
+    its pool when this object is returned to the view.
+    """
+    __slots__ = ('status_code', 'content', 'headers', 'elapsed', 'codec')
+
+    def __init__(self, status_code, content, headers, elapsed, codec=JsonCodec):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.elapsed = elapsed
+        self.codec = codec
+
+    def json(self):
+        return self.codec.loads(self.content)
+
+    def story(self):
+        return Story(self.json(), self.codec.loads)
+
+    def stories(self, key='stories'):
+        loads = self.codec.loads
+        return [Story(data, loads) for data in self.json()[key]]
+
+
+def _key(service, path, scope, params):
+    # What a GET reply depends on, for the response cache and coalescing.
+    return (service, path, scope, repr(params))
+
+
+def _succeeded(r):
+    return r.status_code < 500
+
+
+class BackendClient:
+    """
+    Gateway-wide http client towards the microservices. Each service gets
+    its own keep-alive connection pool and its own timeout, so views only
+    name the service and the path they want to reach.
+    """
+    def __init__(self, services, pool_size=10, pool_sizes=None, timeout=1,
+                 timeouts=None, pooling=True, fanout_workers=32, fanout_deadline=1,
+                 cache_ttls=None, cache_size=1000, cache_stale=60, coalescing=True,
+                 breaker=None, last_good_ttl=3600, codec='auto', balancing=None, retries=None,
+                 hedging=None):
+        self.services = ServiceRegistry(services, **(balancing or {}))
+        self.pool_sizes = dict(pool_sizes or {})
+        self.pool_size = pool_size
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = timeout
+        self.pooling = pooling
+        self.fanout_deadline = fanout_deadline
+        self.fanout_workers = fanout_workers
+        self.cache = ResponseCache(cache_ttls or {}, cache_size, cache_stale)
+        self.last_good = ResponseCache({'last_good': last_good_ttl}, cache_size, 0)
+        self.coalescing = coalescing
+        self.flights = SingleFlight()
+        self.breakers = {service: CircuitBreaker(service, **(breaker or {})) for service in self.services}
+        self.codec = get_codec(codec)
+        retries = dict(retries or {'attempts': 1})
+        self.attempts = retries.pop('attempts', 2)
+        self.retry_budgets = {service: RetryBudget(**retries) for service in self.services}
+        self.hedging = Hedging(**hedging) if hedging is not None else None
+        self.latency = Histogram('gateway_backend_request_seconds', 'Calls to the backend services.',
+                                 ('method', 'service', 'route', 'status'))
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['BACKEND_SERVICES'],
+                   pool_size=config.get('BACKEND_POOL_SIZE', 10),
+                   pool_sizes=config.get('BACKEND_POOL_SIZES'),
+                   timeout=config.get('BACKEND_TIMEOUT', 1),
+                   timeouts=config.get('BACKEND_TIMEOUTS'),
+                   pooling=config.get('BACKEND_POOLING', True),
+                   fanout_workers=config.get('BACKEND_FANOUT_WORKERS', 32),
+                   fanout_deadline=config.get('BACKEND_FANOUT_DEADLINE', 1),
+                   cache_ttls=config.get('BACKEND_CACHE_TTLS'),
+                   cache_size=config.get('BACKEND_CACHE_SIZE', 1000),
+                   cache_stale=config.get('BACKEND_CACHE_STALE', 60),
+                   coalescing=config.get('BACKEND_COALESCING', True),
+                   breaker=config.get('BACKEND_BREAKER'),
+                   last_good_ttl=config.get('BACKEND_LAST_GOOD_TTL', 3600),
+                   codec=config.get('BACKEND_JSON', 'auto'),
+                   balancing=config.get('BACKEND_BALANCING'),
+                   retries=config.get('BACKEND_RETRIES'),
+                   hedging=config.get('BACKEND_HEDGING'))
+
+    def reset(self):
+        """
+        Start over with fresh pools and fan-out threads, e.g. in a worker
+        process forked from a parent that already used this client.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.fanout_workers)
+        # Hedges have their own threads: a fan-out call waiting for its hedge
+        # must not wait for a fan-out thread too.
+        self._hedge_executor = ThreadPoolExecutor(max_workers=self.fanout_workers)
+        self._sessions = {}
+        if self.pooling:
+            for service in self.services:
+                self._sessions[service] = self._make_session(service)
+
+    def _make_session(self, service):
+        size = self.pool_sizes.get(service, self.pool_size)
+        adapter = HTTPAdapter(pool_connections=len(self.services.instances(service)), pool_maxsize=size)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def timeout(self, service):
+        return self.timeouts.get(service, self.default_timeout)
+
+    def request(self, service, method, path, cache=None, scope=None, hedge=False, **kwargs):
+        """
+        Call the backend `service`. GETs naming a `cache` policy are answered
+        from the response cache when the policy has a ttl, and identical GETs in flight
+        at the same time are merged into one upstream call. Pass a `scope`
+        (e.g. the user id) when the reply depends on more than the url.
+        Failed GETs are tried again within the retry budget of the service,
+        and slow ones are hedged when asked with `hedge`.
+        """
+        if method != 'GET' or cache not in self.cache.ttls:
+            return self._fetch(service, method, path, scope, hedge, kwargs)
+
+        key = _key(service, path, scope, kwargs.get('params'))
+        r, state = self.cache.get(cache, key)
+        if state == STALE:
+            self._revalidate(cache, key, service, path, kwargs)
+        if r is None:
+            r = self._fetch(service, method, path, scope, hedge, kwargs)
+            if r.status_code == 200:
+                self.cache.put(cache, key, r)
+        return r
+
+    def invalidate(self, cache, service=None, path=None, scope=None, params=None):
+        """
+        Drop the cached reply of `path` on `service`, for the same `scope`
+        and `params` as the call that cached it, or every reply of the
+        `cache` policy.
+        """
+        self.cache.invalidate(cache, _key(service, path, scope, params) if path is not None else None)
+
+    def _revalidate(self, cache, key, service, path, kwargs):
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def refresh():
+            try:
+                r = self._send(service, 'GET', path, **kwargs)
+                if r.status_code == 200:
+                    self.cache.put(cache, key, r)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(key)
+
+        self._executor.submit(refresh)
+
+    def _fetch(self, service, method, path, scope, hedge, kwargs):
+        if method != 'GET':
+            return self._send(service, method, path, **kwargs)
+        if not self.coalescing:
+            return self._get(service, path, hedge, kwargs)
+        key = _key(service, path, scope, kwargs.get('params'))
+        return self.flights.do(key, lambda: self._get(service, path, hedge, kwargs))
+
+    def _get(self, service, path, hedge, kwargs):
+        """
+        A GET, tried up to `attempts` times in all while it fails with an
+        error or a 5xx reply and the retry budget of the service allows.
+        """
+        budget = self.retry_budgets[service]
+        budget.deposit()
+        for attempt in range(1, self.attempts + 1):
+            try:
+                if hedge and self.hedging is not None:
+                    r = self.hedging.call(self._hedge_executor, service, route_of(path),
+                                          lambda: self._send(service, 'GET', path, **kwargs), budget, _succeeded)
+                else:
+                    r = self._send(service, 'GET', path, **kwargs)
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except requests.exceptions.RequestException:
+                if attempt == self.attempts or not budget.withdraw():
+                    raise
+                continue
+            if _succeeded(r) or attempt == self.attempts or not budget.withdraw():
+                return r
+
+    def _send(self, service, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout(service))
+        headers = {}
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                raise DeadlineExceeded('deadline of the request exceeded before calling ' + service)
+            kwargs['timeout'] = min(kwargs['timeout'], left)
+            headers[DEADLINE_HEADER] = str(int(left * 1000))
+        trace = current_trace.get()
+        if trace is not None:
+            headers['traceparent'] = trace.child_header()
+        if headers:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **headers)
+        breaker = self.breakers[service]
+        instance = None
+        status = 'error'
+        started = time.perf_counter()
+        try:
+            breaker.allow()
+            instance = self.services.pick(service)
+            instance.started()
+            try:
+                if self.pooling:
+                    r = self._sessions[service].request(method, instance.url + path, **kwargs)
+                else:
+                    r = requests.request(method, instance.url + path, **kwargs)
+            except requests.exceptions.RequestException:
+                breaker.record(False)
+                raise
+            status = r.status_code
+        except CircuitOpenError:
+            status = 'circuit_open'
+            raise
+        finally:
+            if instance is not None:
+                instance.finished(status != 'error' and status < 500)
+            elapsed = time.perf_counter() - started
+            route = route_of(path)
+            self.latency.observe(elapsed, method, service, route, str(status))
+            if trace is not None:
+                trace.calls.append((service, route, status, elapsed))
+        elapsed = r.elapsed.total_seconds()
+        breaker.record(r.status_code < 500, elapsed)
+        return BackendResponse(r.status_code, r.content, r.headers, elapsed, self.codec)
+
+    def get(self, service, path, **kwargs):
+        return self.request(service, 'GET', path, **kwargs)
+
+    def post(self, service, path, **kwargs):
+        return self.request(service, 'POST', path, **kwargs)
+
+    def put(self, service, path, **kwargs):
+        return self.request(service, 'PUT', path, **kwargs)
+
+    def delete(self, service, path, **kwargs):
+        return self.request(service, 'DELETE', path, **kwargs)
+
+    def remember_good_reply(self, service, path, r):
+        self.last_good.put('last_good', service + path, r)
+
+    def last_good_reply(self, service, path):
+        """
+        The last good reply to an optional call, to stand in for a failed one.
+        """
+        return self.last_good.get('last_good', service + path)[0]
+
+    def fanout(self, *calls, deadline=None):
+        """
+        Run independent backend calls at the same time, see `fanout.fanout`.
+        """
+        if deadline is None:
+            deadline = self.fanout_deadline
+        return fanout(self, self._executor, calls, deadline)
+
+    def gather(self, *calls, deadline=None):
+        """
+        Run independent backend calls at the same time, see `fanout.gather`.
+        """
+        if deadline is None:
+            deadline = self.fanout_deadline
+        return gather(self, self._executor, calls, deadline)
+
+    def submit(self, fn, *args):
+        """
+        Run `fn` in the background on the fan-out threads.
+        """
+        return self._executor.submit(fn, *args)
+
+    def close(self):
+        self.services.close()
+        self._executor.shutdown(wait=False)
+        self._hedge_executor.shutdown(wait=False)
+        for session in self._sessions.values():
+            session.close()
@@ -0,0 +1,52 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JsonCodec:
+    """
+    The json of the standard library, always available.
+    """
+    name = 'json'
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+
+class OrjsonCodec:
+    """
+    orjson, several times faster at decoding large replies. Needs the
+    optional `orjson` package.
+    """
+    name = 'orjson'
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+    @staticmethod
+    def dumps(obj):
+        return orjson.dumps(obj)
+
+
+def get_codec(name='auto'):
+    """
+    The codec called `name`, or with 'auto' the fastest one installed.
+    """
+    if name == 'auto':
+        return JsonCodec if orjson is None else OrjsonCodec
+    if name == 'json':
+        return JsonCodec
+    if name == 'orjson':
+        if orjson is None:
+            raise ValueError('The orjson codec needs the orjson package')
+        return OrjsonCodec
+    raise ValueError('Unknown json codec: ' + name)
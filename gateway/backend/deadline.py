@@ -0,0 +1,39 @@
+import contextvars
+import time
+
+import requests
+
+
+# Milliseconds left to the deadline, received from the caller of the gateway
+# and passed on to the backends.
+DEADLINE_HEADER = 'X-Request-Timeout-Ms'
+
+current_deadline = contextvars.ContextVar('current_deadline', default=None)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    pass
+
+
+def remaining():
+    """
+    Seconds left to the deadline of the request being served, None if it
+    has none.
+    """
+    deadline = current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def deadline_of(seconds, header=None):
+    """
+    The monotonic time a request must be answered by: `seconds` from now, or
+    sooner if the `header` of the caller asks so. None if neither is set. A
+    header that is not a positive number of milliseconds is ignored.
+    """
+    try:
+        asked = int(header) / 1000 if header else None
+    except ValueError:
+        asked = None
+    if asked is not None and asked > 0 and (not seconds or asked < seconds):
+        seconds = asked
+    return time.monotonic() + seconds if seconds else None
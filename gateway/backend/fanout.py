@@ -0,0 +1,118 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .tracing import in_context
+
+
+class Call:
+    """
+    One backend call of a fan-out. `ok` lists the status codes the view
+    knows how to handle. A required call failing fails the whole fan-out;
+    an optional one only gives up its own result, after at most `budget`
+    seconds.
+    """
+    __slots__ = ('service', 'method', 'path', 'ok', 'required', 'budget', 'kwargs')
+
+    def __init__(self, service, path, method='GET', ok=(200,), required=True, budget=None, **kwargs):
+        self.service = service
+        self.method = method
+        self.path = path
+        self.ok = ok
+        self.required = required
+        self.budget = budget
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return '<Call %s %s%s>' % (self.method, self.service, self.path)
+
+
+class FanoutError(Exception):
+    def __init__(self, call, reason):
+        Exception.__init__(self, '%r failed: %s' % (call, reason))
+        self.call = call
+        self.reason = reason
+
+
+def fanout(client, executor, calls, deadline):
+    """
+    Run `calls` concurrently and return their responses in the same order.
+    A required call raising, replying with a status outside its `ok` codes
+    or going past `deadline` seconds cancels the pending calls and raises
+    FanoutError. An optional call doing the same, or going past its budget,
+    is replaced by the last good reply to it, or None if there is none.
+    """
+    started = time.monotonic()
+    futures = {}
+    ends = {}
+    for index, call in enumerate(calls):
+        limit = deadline if call.budget is None else min(call.budget, deadline)
+        kwargs = dict(call.kwargs)
+        kwargs['timeout'] = min(kwargs.get('timeout', client.timeout(call.service)), limit)
+        future = in_context(executor, client.request, call.service, call.method, call.path, **kwargs)
+        futures[future] = index
+        ends[future] = started + limit
+
+    responses = [None] * len(calls)
+
+    def failed(future, reason):
+        call = calls[futures[future]]
+        if call.required:
+            raise FanoutError(call, reason)
+        responses[futures[future]] = client.last_good_reply(call.service, call.path)
+
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            for future in [f for f in pending if ends[f] <= now and not f.done()]:
+                pending.discard(future)
+                failed(future, 'over its %.3fs budget' % (ends[future] - started))
+            if not pending:
+                break
+
+            done, _ = wait(pending, timeout=min(ends[f] for f in pending) - now,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                call = calls[futures[future]]
+                try:
+                    r = future.result()
+                except Exception as e:
+                    failed(future, e)
+                    continue
+                if r.status_code not in call.ok:
+                    failed(future, 'status %d' % r.status_code)
+                    continue
+                if not call.required and r.status_code == 200:
+                    client.remember_good_reply(call.service, call.path, r)
+                responses[futures[future]] = r
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return responses
+
+
+def gather(client, executor, calls, deadline):
+    """
+    Run independent `calls` concurrently and return, in the same order, the
+    response of each or the exception it raised. Unlike `fanout` no call
+    can fail the others.
+    """
+    futures = []
+    for call in calls:
+        kwargs = dict(call.kwargs)
+        kwargs['timeout'] = min(kwargs.get('timeout', client.timeout(call.service)), deadline)
+        futures.append(in_context(executor, client.request, call.service, call.method, call.path, **kwargs))
+
+    wait(futures, timeout=deadline)
+    results = []
+    for call, future in zip(calls, futures):
+        if not future.done():
+            future.cancel()
+            results.append(FanoutError(call, 'deadline of %ss exceeded' % deadline))
+        elif future.exception() is not None:
+            results.append(future.exception())
+        else:
+            results.append(future.result())
+    return results
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .tracing import in_context
+
+
+class Hedging:
+    """
+    Latencies of the last `window` hedged calls of each route. Once a route
+    has `min_calls` of them, a second request is sent when the first one is
+    still running after the `percentile` of its latencies.
+    """
+    def __init__(self, percentile=95, window=200, min_calls=20):
+        self.percentile = percentile
+        self.window = window
+        self.min_calls = min_calls
+        self.hedged = 0
+        self.won = 0
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def delay(self, service, route):
+        """
+        Seconds to wait before hedging a call, None while too few were seen.
+        """
+        latencies = self._latencies.get((service, route))
+        if latencies is None or len(latencies) < self.min_calls:
+            return None
+        with self._lock:
+            ordered = sorted(latencies)
+        return ordered[min(len(ordered) * self.percentile // 100, len(ordered) - 1)]
+
+    def record(self, service, route, seconds):
+        with self._lock:
+            latencies = self._latencies.get((service, route))
+            if latencies is None:
+                latencies = self._latencies[(service, route)] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def call(self, executor, service, route, attempt, budget, ok):
+        """
+        Run `attempt` and return its reply. If it is still running after
+        the delay of the route and `budget` has a retry left, run it a second
+        time on `executor`: the first reply passing `ok` wins, the other one
+        is left to finish unwatched.
+        """
+        delay = self.delay(service, route)
+        if delay is None:
+            return self._timed(service, route, attempt)
+        first = in_context(executor, self._timed, service, route, attempt)
+        done, _ = wait([first], timeout=delay)
+        if done or not budget.withdraw():
+            return first.result()
+        with self._lock:
+            self.hedged += 1
+        futures = [first, in_context(executor, self._timed, service, route, attempt)]
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and ok(future.result()):
+                    if future is not first:
+                        with self._lock:
+                            self.won += 1
+                    return future.result()
+        return first.result()
+
+    def _timed(self, service, route, attempt):
+        started = time.perf_counter()
+        r = attempt()
+        self.record(service, route, time.perf_counter() - started)
+        return r
+
+    def stats(self):
+        return {'hedged': self.hedged, 'won': self.won, 'routes': len(self._latencies)}
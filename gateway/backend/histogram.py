@@ -0,0 +1,57 @@
+import threading
+from bisect import bisect_left
+
+
+# Seconds, from a cached reply to a request close to its timeout.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join('%s="%s"' % (name, _escape(value)) for name, value in zip(names, values)) + '}'
+
+
+class Histogram:
+    """
+    Distribution of observed values, one per combination of `labels`,
+    exposed in the prometheus text format.
+    """
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return 0 if series is None else sum(series[0])
+
+    def expose(self):
+        lines = ['# HELP %s %s' % (self.name, self.documentation), '# TYPE %s histogram' % self.name]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append('%s_bucket%s %d' % (self.name, format_labels(self.labels + ('le',), labels + (bound,)),
+                                                 cumulative))
+            lines.append('%s_sum%s %r' % (self.name, format_labels(self.labels, labels), total))
+            lines.append('%s_count%s %d' % (self.name, format_labels(self.labels, labels), cumulative))
+        return lines
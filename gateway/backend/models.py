@@ -0,0 +1,52 @@
+from .codec import JsonCodec
+
+
+def _field(name):
+    return property(lambda self: self._data[name], doc='The `%s` of the reply.' % name)
+
+
+class Story:
+    """
+    A story as sent by the stories service, also for the last stories of the
+    writers. Items read the reply as it came (story['title'], as templates
+    do), attributes are typed: `rolls_outcome` is the list of rolled faces,
+    decoded from its nested json on first use only, so lists of stories
+    never pay for it.
+    """
+    __slots__ = ('_data', '_loads', '_faces')
+
+    def __init__(self, data, loads=JsonCodec.loads):
+        self._data = data
+        self._loads = loads
+
+    id = _field('id')
+    title = _field('title')
+    text = _field('text')
+    author_id = _field('author_id')
+    author_name = _field('author_name')
+    likes = _field('likes')
+    dislikes = _field('dislikes')
+    date = _field('date')
+    theme = _field('theme')
+    published = _field('published')
+
+    @property
+    def rolls_outcome(self):
+        try:
+            return self._faces
+        except AttributeError:
+            outcome = self._data.get('rolls_outcome') or '[]'
+            self._faces = self._loads(outcome) if isinstance(outcome, (str, bytes)) else outcome
+            return self._faces
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __repr__(self):
+        return '<Story %r>' % self._data.get('id')
@@ -0,0 +1,169 @@
+import itertools
+import os
+import threading
+import time
+
+import requests
+
+
+ROUND_ROBIN = 'round_robin'
+LEAST_OUTSTANDING = 'least_outstanding'
+
+
+class Instance:
+    """
+    One replica of a service. After `eject_after` failures in a row it is
+    ejected, taking no calls for `eject_for` seconds or until a health check
+    finds it alive again.
+    """
+    def __init__(self, url, eject_after=5, eject_for=10):
+        self.url = url.rstrip('/')
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self.outstanding = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0
+        self._lock = threading.Lock()
+
+    def available(self, now):
+        return self.ejected_until <= now
+
+    def started(self):
+        with self._lock:
+            self.outstanding += 1
+
+    def finished(self, ok):
+        with self._lock:
+            self.outstanding -= 1
+            if ok:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures >= self.eject_after:
+                self.eject()
+
+    def eject(self):
+        self.ejected_until = time.monotonic() + self.eject_for
+        self.ejections += 1
+        self.failures = 0
+
+    def revive(self):
+        self.ejected_until = 0
+        self.failures = 0
+
+    def stats(self):
+        return {
+            'outstanding': self.outstanding,
+            'ejected': not self.available(time.monotonic()),
+            'ejections': self.ejections,
+        }
+
+
+class ServicePool:
+    """
+    The instances of a service and the choice of the one taking the next
+    call. Ejected instances are skipped, unless all of them are: then calls
+    still go to all, as refusing them would not help.
+    """
+    def __init__(self, name, urls, balancer=ROUND_ROBIN, eject_after=5, eject_for=10):
+        if balancer not in (ROUND_ROBIN, LEAST_OUTSTANDING):
+            raise ValueError('Unknown balancer: ' + balancer)
+        self.name = name
+        self.balancer = balancer
+        self.instances = [Instance(url, eject_after, eject_for) for url in urls]
+        self._turn = itertools.count()
+
+    def pick(self):
+        if len(self.instances) == 1:
+            return self.instances[0]
+        now = time.monotonic()
+        candidates = [instance for instance in self.instances if instance.available(now)] or self.instances
+        # The turn rotates the start, so ties are spread evenly too.
+        start = next(self._turn) % len(candidates)
+        candidates = candidates[start:] + candidates[:start]
+        if self.balancer == LEAST_OUTSTANDING:
+            return min(candidates, key=lambda instance: instance.outstanding)
+        return candidates[0]
+
+
+def _urls(value):
+    # A single url, several separated by commas, or a list of them.
+    if isinstance(value, str):
+        value = value.split(',')
+    return [url.strip() for url in value if url.strip()]
+
+
+class ServiceRegistry:
+    """
+    Where each backend service lives: its list of instances, balanced on the
+    client side. Services with several instances get their instances checked
+    every `check_interval` seconds by a background thread; any reply below
+    500 to `check_path` counts as alive.
+    """
+    def __init__(self, services, balancer=ROUND_ROBIN, eject_after=5, eject_for=10,
+                 check_interval=5, check_path='/', check_timeout=1):
+        self.pools = {name: ServicePool(name, _urls(urls), balancer, eject_after, eject_for)
+                      for name, urls in services.items()}
+        self.check_interval = check_interval
+        self.check_path = check_path
+        self.check_timeout = check_timeout
+        self.checks = 0
+        self._checker_pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return iter(self.pools)
+
+    def __contains__(self, service):
+        return service in self.pools
+
+    def instances(self, service):
+        return self.pools[service].instances
+
+    def pick(self, service):
+        if self.check_interval and self._checker_pid != os.getpid():
+            self._start_checker()
+        return self.pools[service].pick()
+
+    def _start_checker(self):
+        # Started on first use, and again in a forked worker.
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        if not any(len(pool.instances) > 1 for pool in self.pools.values()):
+            return
+        thread = threading.Thread(target=self._check_forever, name='health-checks')
+        thread.daemon = True
+        thread.start()
+
+    def _check_forever(self):
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def check(self):
+        """
+        Check once every instance of the services having several.
+        """
+        for pool in self.pools.values():
+            if len(pool.instances) < 2:
+                continue
+            for instance in pool.instances:
+                try:
+                    alive = requests.get(instance.url + self.check_path, timeout=self.check_timeout).status_code < 500
+                except requests.exceptions.RequestException:
+                    alive = False
+                if alive:
+                    instance.revive()
+                elif instance.available(time.monotonic()):
+                    instance.eject()
+        self.checks += 1
+
+    def close(self):
+        self._stop.set()
+
+    def stats(self):
+        return {name: {instance.url: instance.stats() for instance in pool.instances}
+                for name, pool in self.pools.items()}
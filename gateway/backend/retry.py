@@ -0,0 +1,47 @@
+import threading
+import time
+
+
+class RetryBudget:
+    """
+    How many retries a service may get, so that retries cannot multiply the
+    load of a service that is already failing. Every call earns `ratio` of
+    a retry, `min_per_second` more are earned every second so that a quiet
+    service can be retried too, and a retry spends one. The balance never
+    goes over `window` seconds of the minimum.
+    """
+    def __init__(self, ratio=0.1, min_per_second=10, window=10):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(min_per_second * window, 1)
+        self.retries = 0
+        self.refused = 0
+        self._balance = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._earn(self.ratio)
+
+    def withdraw(self):
+        """
+        Spend a retry, False if none is left.
+        """
+        with self._lock:
+            self._earn(0)
+            if self._balance < 1:
+                self.refused += 1
+                return False
+            self._balance -= 1
+            self.retries += 1
+            return True
+
+    def _earn(self, amount):
+        now = time.monotonic()
+        amount += (now - self._updated_at) * self.min_per_second
+        self._updated_at = now
+        self._balance = min(self._balance + amount, self.capacity)
+
+    def stats(self):
+        return {'retries': self.retries, 'refused': self.refused, 'balance': int(self._balance)}
@@ -0,0 +1,53 @@
+import threading
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Merges concurrent calls sharing a key: the first caller runs the call,
+    the ones arriving while it is in flight wait and get the same result
+    (or the same exception).
+    """
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        return {'leaders': self.leaders, 'followers': self.followers, 'in_flight': len(self._flights)}
@@ -0,0 +1,67 @@
+import time
+import unittest
+
+from gateway.backend import CircuitBreaker, CircuitOpenError
+from gateway.backend.breaker import CLOSED, HALF_OPEN, OPEN
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_on_error_rate(self):
+        breaker = CircuitBreaker('rank', window=4, min_calls=4, error_rate=0.5)
+        for ok in (True, False, True):
+            breaker.allow()
+            breaker.record(ok)
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record(False)
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        self.assertEqual(breaker.stats()['rejected'], 1)
+
+    def test_slow_calls_are_failures(self):
+        breaker = CircuitBreaker('rank', min_calls=2, slow_call=0.1)
+        breaker.record(True, 0.5)
+        breaker.record(True, 0.5)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker('rank', min_calls=1, open_for=0.01)
+        breaker.record(False)
+        time.sleep(0.02)
+        breaker.allow()
+        self.assertEqual(breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        breaker.record(False)
+        self.assertEqual(breaker.state, OPEN)
+
+        time.sleep(0.02)
+        breaker.allow()
+        breaker.record(True)
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.allow()
+
+
+class TestBreakerClient(StubTestCase):
+    services = ('auth', 'stories', 'rank')
+    stubs = {'latency': 0.2}
+
+    def test_dead_service_fails_fast(self):
+        breaker = {'min_calls': 3, 'open_for': 60}
+        app = self.gateway(BACKEND_TIMEOUTS={'rank': 0.05}, BACKEND_BREAKER=breaker, BACKEND_CACHE_TTLS={})
+        client = self.logged(app)
+        # The home page renders without the suggested stories meanwhile.
+        for _ in range(3):
+            self.assertEqual(client.get('/').status_code, 200)
+
+        before = self.cluster.hits('rank')
+        start = time.monotonic()
+        with self.assertRaises(CircuitOpenError):
+            app.backend.get('rank', '/rank/1')
+        self.assertLess(time.monotonic() - start, 0.01)
+        self.assertEqual(self.cluster.hits('rank'), before)
+
+        self.assertEqual(client.get('/metrics/json').json['breakers']['rank']['state'], OPEN)
+        self.assertEqual(client.get('/metrics/json').json['breakers']['stories']['state'], CLOSED)
@@ -0,0 +1,92 @@
+import time
+import unittest
+
+from gateway.backend import BackendClient
+from gateway.backend.cache import FRESH, STALE, ResponseCache
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_fresh_stale_expired(self):
+        cache = ResponseCache({'themes': 0.02}, stale=0.02)
+        cache.put('themes', 'k', 'reply')
+        self.assertEqual(cache.get('themes', 'k'), ('reply', FRESH))
+        time.sleep(0.025)
+        self.assertEqual(cache.get('themes', 'k'), ('reply', STALE))
+        time.sleep(0.02)
+        self.assertEqual(cache.get('themes', 'k'), (None, None))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['stale_hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResponseCache({'rank': 60}, max_size=2)
+        cache.put('rank', 'a', 1)
+        cache.put('rank', 'b', 2)
+        cache.get('rank', 'a')
+        cache.put('rank', 'c', 3)
+        self.assertEqual(cache.get('rank', 'b'), (None, None))
+        self.assertEqual(cache.get('rank', 'a'), (1, FRESH))
+
+    def test_invalidate(self):
+        cache = ResponseCache({'rank': 60, 'themes': 60})
+        cache.put('rank', 'a', 1)
+        cache.put('rank', 'b', 2)
+        cache.put('themes', 'a', 3)
+        cache.invalidate('rank', 'a')
+        self.assertEqual(cache.get('rank', 'a'), (None, None))
+        self.assertEqual(cache.get('rank', 'b'), (2, FRESH))
+        cache.invalidate('rank')
+        self.assertEqual(cache.stats()['size'], 1)
+
+
+class TestCachedClient(StubTestCase):
+
+    def test_repeated_get_skips_backend(self):
+        client = BackendClient(self.cluster.urls, cache_ttls={'themes': 60})
+        before = self.cluster.hits('stories')
+        for _ in range(3):
+            self.assertEqual(client.get('stories', '/retrieve-set-themes', cache='themes').status_code, 200)
+        self.assertEqual(self.cluster.hits('stories') - before, 1)
+
+    def test_scope_and_params_are_part_of_the_key(self):
+        client = BackendClient(self.cluster.urls, cache_ttls={'stories': 60})
+        before = self.cluster.hits('stories')
+        for _ in range(2):
+            client.get('stories', '/stories', cache='stories', scope=1)
+            client.get('stories', '/stories', cache='stories', scope=2)
+            client.get('stories', '/stories', cache='stories', scope=1, params={'limit': 2})
+        self.assertEqual(self.cluster.hits('stories') - before, 3)
+
+        client.invalidate('stories', 'stories', '/stories', scope=1)
+        client.get('stories', '/stories', cache='stories', scope=1)
+        client.get('stories', '/stories', cache='stories', scope=2)
+        self.assertEqual(self.cluster.hits('stories') - before, 4)
+
+    def test_stale_reply_is_refreshed_in_background(self):
+        client = BackendClient(self.cluster.urls, cache_ttls={'rank': 0.01}, cache_stale=60)
+        client.get('rank', '/rank/1', cache='rank')
+        time.sleep(0.02)
+        before = self.cluster.hits('rank')
+        self.assertEqual(client.get('rank', '/rank/1', cache='rank').status_code, 200)
+        for _ in range(50):
+            if self.cluster.hits('rank') > before:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.cluster.hits('rank') - before, 1)
+
+    def test_writes_invalidate(self):
+        app = self.gateway()
+        client = self.logged(app)
+        client.get('/explore')
+        client.get('/explore')
+        self.assertEqual(app.backend.cache.stats()['hits'], 1)
+
+        client.get('/story/1/like')
+        before = self.cluster.hits('stories')
+        client.get('/explore')
+        self.assertEqual(self.cluster.hits('stories') - before, 1)
+
+        reply = client.get('/metrics/json')
+        self.assertEqual(reply.json['cache']['misses'], 2)
@@ -0,0 +1,40 @@
+import requests
+
+from gateway.backend import BackendClient
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestBackendClient(StubTestCase):
+    services = ('stories', 'stats')
+
+    def test_pooled_connections_are_reused(self):
+        client = BackendClient(self.cluster.urls)
+        before = self.cluster.connections('stats')
+        for _ in range(5):
+            r = client.get('stats', '/stats/1')
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.json()['score'], 4.2)
+        self.assertEqual(self.cluster.connections('stats') - before, 1)
+        client.close()
+
+    def test_unpooled_opens_a_connection_per_call(self):
+        client = BackendClient(self.cluster.urls, pooling=False)
+        before = self.cluster.connections('stories')
+        for _ in range(3):
+            client.get('stories', '/retrieve-set-themes')
+        self.assertEqual(self.cluster.connections('stories') - before, 3)
+
+    def test_timeouts(self):
+        client = BackendClient(self.cluster.urls, timeout=2, timeouts={'stats': 0.5})
+        self.assertEqual(client.timeout('stats'), 0.5)
+        self.assertEqual(client.timeout('stories'), 2)
+
+    def test_unknown_service(self):
+        client = BackendClient(self.cluster.urls)
+        with self.assertRaises(KeyError):
+            client.get('rank', '/rank/1')
+
+    def test_unreachable_service(self):
+        client = BackendClient({'stats': 'http://127.0.0.1:1'})
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.get('stats', '/stats/1')
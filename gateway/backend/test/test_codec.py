@@ -0,0 +1,43 @@
+import json
+import unittest
+
+from gateway.backend import BackendResponse, JsonCodec, Story, get_codec
+from gateway.backend.codec import orjson
+from gateway.bench.stubs import FACES, make_story
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        data = {'stories': [make_story(1)], 'next_cursor': None}
+        for codec in (get_codec('json'), get_codec('auto')):
+            self.assertEqual(codec.loads(codec.dumps(data)), data)
+            self.assertEqual(codec.loads(json.dumps(data).encode()), data)
+
+    def test_choice(self):
+        self.assertIs(get_codec('json'), JsonCodec)
+        self.assertEqual(get_codec('auto').name, 'json' if orjson is None else 'orjson')
+        self.assertRaises(ValueError, get_codec, 'yaml')
+
+
+class TestStory(unittest.TestCase):
+
+    def response(self, data):
+        return BackendResponse(200, json.dumps(data).encode(), {}, 0, get_codec('auto'))
+
+    def test_fields(self):
+        story = self.response(make_story(3)).story()
+        self.assertEqual(story.id, 3)
+        self.assertEqual(story['title'], 'Story 3')
+        self.assertEqual(story.get('missing', 'x'), 'x')
+        self.assertIn('theme', story)
+        self.assertEqual(story.rolls_outcome, FACES)
+        self.assertIs(story.rolls_outcome, story.rolls_outcome)
+
+    def test_stories(self):
+        stories = self.response({'stories': [make_story(i) for i in range(1, 4)]}).stories()
+        self.assertEqual([story.id for story in stories], [1, 2, 3])
+
+    def test_outcome_missing_or_decoded(self):
+        self.assertEqual(Story({'id': 1}).rolls_outcome, [])
+        self.assertEqual(Story({'id': 1, 'rolls_outcome': FACES}).rolls_outcome, FACES)
@@ -0,0 +1,75 @@
+import time
+
+from gateway.backend import BackendClient, Call, FanoutError
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestFanout(StubTestCase):
+    stubs = {'latency': 0.2}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.client = BackendClient(cls.cluster.urls)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        super().tearDownClass()
+
+    def test_calls_run_concurrently(self):
+        start = time.monotonic()
+        stories, stats, rank = self.client.fanout(
+            Call('stories', '/stories'),
+            Call('stats', '/stats/1'),
+            Call('rank', '/rank/1')
+        )
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertIn('stories', stories.json())
+        self.assertEqual(stats.json()['score'], 4.2)
+
+    def test_accepted_statuses(self):
+        r, = self.client.fanout(Call('stories', '/missing', ok=(200, 404)))
+        self.assertEqual(r.status_code, 404)
+
+    def test_failed_call_raises(self):
+        with self.assertRaises(FanoutError) as e:
+            self.client.fanout(Call('stats', '/stats/1'), Call('stories', '/missing'))
+        self.assertEqual(e.exception.call.path, '/missing')
+
+    def test_deadline(self):
+        start = time.monotonic()
+        with self.assertRaises(FanoutError):
+            self.client.fanout(Call('stats', '/stats/1'), deadline=0.05)
+        self.assertLess(time.monotonic() - start, 0.15)
+
+    def test_optional_call_failing(self):
+        start = time.monotonic()
+        stats, = self.client.fanout(Call('stats', '/stats/3', required=False, budget=0.05))
+        self.assertLess(time.monotonic() - start, 0.15)
+        self.assertIsNone(stats)
+
+        missing, = self.client.fanout(Call('stories', '/missing', required=False))
+        self.assertIsNone(missing)
+
+    def test_optional_call_last_good_reply(self):
+        client = BackendClient(self.cluster.urls)
+        first, = client.fanout(Call('stats', '/stats/2', required=False))
+        again, = client.fanout(Call('stats', '/stats/2', required=False, budget=0.05))
+        self.assertIs(again, first)
+        client.close()
+
+    def test_required_failure_with_optional_pending(self):
+        with self.assertRaises(FanoutError) as e:
+            self.client.fanout(Call('stats', '/stats/1', required=False), Call('stories', '/missing'))
+        self.assertEqual(e.exception.call.path, '/missing')
+
+    def test_page_degrades_or_fails(self):
+        dead = 'http://127.0.0.1:1'
+        client = self.logged(self.gateway({'stats': dead}))
+        reply = client.get('/my_wall')
+        self.assertEqual(reply.status_code, 200)
+        self.assertNotIn(b'Score:', reply.data)
+
+        client = self.logged(self.gateway({'stories': dead}))
+        self.assertEqual(client.get('/my_wall').status_code, 500)
@@ -0,0 +1,42 @@
+import time
+import unittest
+
+from gateway.backend import BackendClient, Hedging
+from gateway.bench.stubs import StubCluster
+
+
+class TestHedging(unittest.TestCase):
+
+    def test_delay_is_the_percentile(self):
+        hedging = Hedging(percentile=90, window=10, min_calls=5)
+        for _ in range(4):
+            hedging.record('stories', '/story/<id>', 0.01)
+        self.assertIsNone(hedging.delay('stories', '/story/<id>'))
+        for seconds in (0.02, 0.03, 0.04, 0.05, 0.5, 0.06):
+            hedging.record('stories', '/story/<id>', seconds)
+        self.assertEqual(hedging.delay('stories', '/story/<id>'), 0.5)
+        self.assertIsNone(hedging.delay('stories', '/stories'))
+
+    def test_slow_instance_is_hedged(self):
+        slow, fast = StubCluster(services=('stories',)), StubCluster(services=('stories',))
+        try:
+            client = BackendClient({'stories': slow.urls['stories'] + ',' + fast.urls['stories']},
+                                   balancing={'balancer': 'round_robin', 'check_interval': 0},
+                                   hedging={'min_calls': 10})
+            for _ in range(10):
+                client.get('stories', '/story/1/1', hedge=True)
+            slow.apps['stories'].settings['latency'] = 0.6
+            for _ in range(4):
+                started = time.monotonic()
+                r = client.get('stories', '/story/1/1', hedge=True)
+                self.assertEqual(r.status_code, 200)
+                self.assertLess(time.monotonic() - started, 0.4)
+            self.assertGreaterEqual(client.hedging.stats()['won'], 2)
+            # Calls not asking for it are not hedged.
+            started = time.monotonic()
+            client.get('stories', '/story/1/1')
+            client.get('stories', '/story/1/1')
+            self.assertGreater(time.monotonic() - started, 0.5)
+        finally:
+            slow.shutdown()
+            fast.shutdown()
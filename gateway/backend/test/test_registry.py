@@ -0,0 +1,84 @@
+import unittest
+
+from gateway.backend import BackendClient, ServiceRegistry
+from gateway.backend.registry import LEAST_OUTSTANDING, ServicePool
+from gateway.bench.stubs import StubCluster
+
+
+class TestServicePool(unittest.TestCase):
+
+    def test_round_robin(self):
+        pool = ServicePool('stories', ['http://a', 'http://b', 'http://c'])
+        picked = [pool.pick().url for _ in range(6)]
+        self.assertEqual(sorted(picked), ['http://a', 'http://a', 'http://b', 'http://b', 'http://c', 'http://c'])
+
+    def test_least_outstanding(self):
+        pool = ServicePool('stories', ['http://a', 'http://b', 'http://c'], LEAST_OUTSTANDING)
+        a, b, c = pool.instances
+        a.started()
+        a.started()
+        c.started()
+        self.assertIs(pool.pick(), b)
+        b.started()
+        b.started()
+        self.assertIs(pool.pick(), c)
+
+    def test_ejection(self):
+        pool = ServicePool('stories', ['http://a', 'http://b'], eject_after=2, eject_for=60)
+        a, b = pool.instances
+        for _ in range(2):
+            a.started()
+            a.finished(False)
+        self.assertEqual(set(pool.pick() for _ in range(4)), {b})
+        for _ in range(2):
+            b.started()
+            b.finished(False)
+        # Everything ejected: calls go to all rather than to none.
+        self.assertEqual(set(pool.pick() for _ in range(4)), {a, b})
+        a.revive()
+        self.assertEqual(set(pool.pick() for _ in range(4)), {a})
+
+    def test_urls(self):
+        registry = ServiceRegistry({'auth': 'http://a:5000, http://b:5000/', 'stories': ['http://c']})
+        self.assertEqual([i.url for i in registry.instances('auth')], ['http://a:5000', 'http://b:5000'])
+        self.assertEqual(len(registry.instances('stories')), 1)
+        self.assertRaises(ValueError, ServiceRegistry, {'auth': 'http://a'}, balancer='random')
+
+
+class TestBalancedClient(unittest.TestCase):
+
+    def setUp(self):
+        self.clusters = [StubCluster(services=('stories',)) for _ in range(2)]
+        urls = [cluster.urls['stories'] for cluster in self.clusters]
+        self.client = BackendClient({'stories': urls},
+                                    balancing={'eject_after': 2, 'eject_for': 60, 'check_interval': 0})
+
+    def tearDown(self):
+        self.client.close()
+        for cluster in self.clusters:
+            cluster.shutdown()
+
+    def test_spread(self):
+        for _ in range(10):
+            self.assertEqual(self.client.get('stories', '/stories').status_code, 200)
+        self.assertEqual([cluster.hits('stories') for cluster in self.clusters], [5, 5])
+
+    def test_dead_instance_ejected(self):
+        self.clusters[0].shutdown()
+        statuses = []
+        for _ in range(10):
+            try:
+                statuses.append(self.client.get('stories', '/stories').status_code)
+            except Exception:
+                statuses.append(None)
+        self.assertEqual(statuses.count(None), 2)
+        self.assertEqual(statuses[-6:], [200] * 6)
+
+    def test_health_check(self):
+        self.clusters[0].shutdown()
+        self.client.services.check()
+        dead, alive = self.client.services.instances('stories')
+        self.assertTrue(dead.stats()['ejected'])
+        self.assertFalse(alive.stats()['ejected'])
+        for _ in range(4):
+            self.assertEqual(self.client.get('stories', '/stories').status_code, 200)
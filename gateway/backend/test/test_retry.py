@@ -0,0 +1,93 @@
+import time
+import unittest
+
+import requests
+
+from gateway.backend import BackendClient, DeadlineExceeded, RetryBudget
+from gateway.backend.deadline import current_deadline, deadline_of
+from gateway.bench.stubs import StubCluster
+
+
+class TestRetryBudget(unittest.TestCase):
+
+    def test_spends_what_calls_earn(self):
+        budget = RetryBudget(ratio=0.5, min_per_second=0)
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertEqual(budget.stats(), {'retries': 2, 'refused': 1, 'balance': 0})
+
+    def test_earns_a_minimum_per_second(self):
+        budget = RetryBudget(ratio=0, min_per_second=100, window=1)
+        for _ in range(100):
+            self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        time.sleep(0.05)
+        self.assertTrue(budget.withdraw())
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_deadline_of(self):
+        now = time.monotonic()
+        self.assertIsNone(deadline_of(0))
+        self.assertAlmostEqual(deadline_of(2) - now, 2, places=1)
+        self.assertAlmostEqual(deadline_of(2, '500') - now, 0.5, places=1)
+        self.assertAlmostEqual(deadline_of(2, '5000') - now, 2, places=1)
+        self.assertAlmostEqual(deadline_of(0, '500') - now, 0.5, places=1)
+        self.assertAlmostEqual(deadline_of(2, 'soon') - now, 2, places=1)
+        self.assertAlmostEqual(deadline_of(2, '0') - now, 2, places=1)
+        self.assertAlmostEqual(deadline_of(2, '-1000') - now, 2, places=1)
+        self.assertIsNone(deadline_of(0, '-1000'))
+
+
+class TestRetries(unittest.TestCase):
+
+    def setUp(self):
+        self.cluster = StubCluster(services=('stories', 'reactions'))
+
+    def tearDown(self):
+        self.cluster.shutdown()
+
+    def test_failed_gets_are_retried(self):
+        client = BackendClient(self.cluster.urls, retries={'attempts': 3})
+        self.cluster.apps['stories'].settings['error_rate'] = 1
+        r = client.get('stories', '/story/1/1')
+        self.assertEqual(r.status_code, 500)
+        self.assertEqual(self.cluster.hits('stories'), 3)
+        self.assertEqual(client.retry_budgets['stories'].retries, 2)
+
+    def test_other_methods_are_not_retried(self):
+        client = BackendClient(self.cluster.urls, retries={'attempts': 3})
+        self.cluster.apps['reactions'].settings['error_rate'] = 1
+        client.post('reactions', '/react', json={'user_id': 1, 'story_id': 1})
+        self.assertEqual(self.cluster.hits('reactions'), 1)
+
+    def test_budget_stops_a_retry_storm(self):
+        client = BackendClient(self.cluster.urls, retries={'attempts': 3, 'ratio': 0.1, 'min_per_second': 0},
+                               breaker={'min_calls': 100})
+        self.cluster.apps['stories'].settings['error_rate'] = 1
+        for _ in range(20):
+            client.get('stories', '/story/1/1')
+        # One retry saved up at start, then one for every ten calls.
+        self.assertLessEqual(self.cluster.hits('stories'), 20 + 1 + 2)
+        self.assertGreater(client.retry_budgets['stories'].refused, 15)
+
+    def test_calls_stop_at_the_deadline(self):
+        client = BackendClient(self.cluster.urls, timeout=5)
+        self.cluster.apps['stories'].settings['latency'] = 0.5
+        token = current_deadline.set(time.monotonic() + 0.2)
+        try:
+            started = time.monotonic()
+            with self.assertRaises(requests.exceptions.Timeout):
+                client.get('stories', '/story/1/1')
+            self.assertLess(time.monotonic() - started, 0.45)
+            hits = self.cluster.hits('stories')
+            time.sleep(0.2)
+            with self.assertRaises(DeadlineExceeded):
+                client.get('stories', '/story/1/1')
+            self.assertEqual(self.cluster.hits('stories'), hits)
+        finally:
+            current_deadline.reset(token)
@@ -0,0 +1,78 @@
+import threading
+import time
+import unittest
+
+from gateway.backend import BackendClient
+from gateway.backend.singleflight import SingleFlight
+from gateway.views.test.TestHelper import StubTestCase
+
+
+def _herd(count, fn):
+    barrier = threading.Barrier(count)
+    results = []
+
+    def run():
+        barrier.wait()
+        try:
+            results.append(fn())
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_are_merged(self):
+        flights = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'reply'
+
+        results = _herd(20, lambda: flights.do('key', slow))
+        self.assertEqual(results, ['reply'] * 20)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flights.stats(), {'leaders': 1, 'followers': 19, 'in_flight': 0})
+
+    def test_errors_are_shared(self):
+        flights = SingleFlight()
+
+        def failing():
+            time.sleep(0.1)
+            raise ValueError('down')
+
+        results = _herd(5, lambda: flights.do('key', failing))
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    def test_later_calls_run_again(self):
+        flights = SingleFlight()
+        self.assertEqual(flights.do('key', lambda: 1), 1)
+        self.assertEqual(flights.do('key', lambda: 2), 2)
+
+
+class TestThunderingHerd(StubTestCase):
+    services = ('stories',)
+    stubs = {'latency': 0.1}
+
+    def _upstream_calls(self, coalescing, scopes=(None,)):
+        client = BackendClient(self.cluster.urls, coalescing=coalescing, pool_size=50)
+        before = self.cluster.hits('stories')
+        results = _herd(50, lambda: [client.get('stories', '/stories', scope=scope) for scope in scopes])
+        self.assertTrue(all(r.status_code == 200 for replies in results for r in replies))
+        return self.cluster.hits('stories') - before
+
+    def test_upstream_volume_drops(self):
+        self.assertEqual(self._upstream_calls(coalescing=False), 50)
+        self.assertLessEqual(self._upstream_calls(coalescing=True), 2)
+
+    def test_scopes_are_not_merged(self):
+        self.assertLessEqual(self._upstream_calls(coalescing=True, scopes=(1, 2)), 4)
+        self.assertGreaterEqual(self._upstream_calls(coalescing=True, scopes=(1, 2)), 2)
@@ -0,0 +1,55 @@
+import contextvars
+import os
+import re
+
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+class Trace:
+    """
+    The w3c trace context of the request being served, and the backend calls
+    it made so far as (service, route, status, seconds).
+    """
+    __slots__ = ('trace_id', 'parent_id', 'flags', 'calls')
+
+    def __init__(self, trace_id=None, parent_id=None, flags='01'):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.parent_id = parent_id
+        self.flags = flags
+        self.calls = []
+
+    @classmethod
+    def from_header(cls, traceparent):
+        """
+        Continue the trace of an incoming `traceparent` header, or start a new
+        one if there is none or it is malformed.
+        """
+        match = _TRACEPARENT.match((traceparent or '').strip().lower())
+        if match is None or match.group(1) == '0' * 32:
+            return cls()
+        return cls(*match.groups())
+
+    def child_header(self):
+        """
+        The traceparent of a new span, for a call to a backend.
+        """
+        return '00-%s-%s-%s' % (self.trace_id, os.urandom(8).hex(), self.flags)
+
+
+def route_of(path):
+    """
+    The route template of a backend path: no query and ids replaced, so that
+    /story/12/3?x=1 and /story/7/1 are measured together.
+    """
+    return '/'.join('<id>' if part.isdigit() else part for part in path.split('?', 1)[0].split('/'))
+
+
+def in_context(executor, fn, *args, **kwargs):
+    """
+    Submit `fn` to `executor`, running it in a copy of the current context
+    so that it belongs to the same trace.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
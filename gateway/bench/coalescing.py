@@ -0,0 +1,59 @@
+"""
+Thundering herd: many users open the same pages at once. Counts the calls
+that reach the stub backends with and without request coalescing.
+
+    python -m gateway.bench.coalescing [--users U] [--rounds R] [--latency L]
+"""
+import argparse
+import threading
+
+from gateway.app import create_app
+from gateway.bench.stubs import StubCluster
+
+
+PAGES = ['/explore', '/users', '/story/1']
+
+
+def herd(app, users, rounds):
+    clients = []
+    for _ in range(users):
+        client = app.test_client()
+        client.post('/login', data={'email': 'example@example.com', 'password': 'admin'})
+        clients.append(client)
+
+    for page in PAGES * rounds:
+        barrier = threading.Barrier(users)
+
+        def open_page(client):
+            barrier.wait()
+            assert client.get(page).status_code == 200
+
+        threads = [threading.Thread(target=open_page, args=(c,)) for c in clients]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubCluster(latency=args.latency) as cluster:
+        for coalescing in (False, True):
+            # No response cache here, only concurrent identical calls are merged.
+            app = create_app(test=True, config={'BACKEND_SERVICES': cluster.urls,
+                                                'BACKEND_COALESCING': coalescing,
+                                                'BACKEND_CACHE_TTLS': {}})
+            before = cluster.hits('stories')
+            herd(app, args.users, args.rounds)
+            calls = cluster.hits('stories') - before
+            print('coalescing=%-5s page_loads=%d upstream_calls=%d' %
+                  (coalescing, args.users * args.rounds * len(PAGES), calls))
+
+
+if __name__ == '__main__':
+    main()
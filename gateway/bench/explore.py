@@ -0,0 +1,71 @@
+"""
+/explore as the social network grows: time to first byte, time to the last
+byte and peak memory of the gateway with one page of stories streamed and
+with the whole list rendered at once.
+
+    python -m gateway.bench.explore [--stories 1000 10000 100000] [--page-size P]
+
+The stub backends run in a child process so that the memory they use to
+build their replies is not counted.
+"""
+import argparse
+import multiprocessing
+import time
+import tracemalloc
+
+from gateway.app import create_app
+from gateway.bench.stubs import StubCluster
+
+
+def serve_stubs(stories, pipe):
+    with StubCluster(services=('auth', 'stories'), stories=stories) as cluster:
+        pipe.send(cluster.urls)
+        pipe.recv()
+
+
+def explore(app):
+    client = app.test_client()
+    client.post('/login', data={'email': 'example@example.com', 'password': 'admin'})
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    reply = client.get('/explore', buffered=False)
+    chunks = iter(reply.response)
+    size = len(next(chunks))
+    first_byte = time.perf_counter() - started
+    for chunk in chunks:
+        size += len(chunk)
+    last_byte = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    reply.close()
+    return first_byte, last_byte, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--stories', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+
+    for stories in args.stories:
+        pipe, child_pipe = multiprocessing.Pipe()
+        stubs = multiprocessing.Process(target=serve_stubs, args=(stories, child_pipe))
+        stubs.start()
+        urls = pipe.recv()
+        try:
+            for page_size in (0, args.page_size):
+                app = create_app(test=True, config={'BACKEND_SERVICES': urls,
+                                                    'BACKEND_CACHE_TTLS': {},
+                                                    'EXPLORE_PAGE_SIZE': page_size})
+                first_byte, last_byte, peak, size = explore(app)
+                print('stories=%-6d page_size=%-4s ttfb=%7.1fms total=%7.1fms peak=%8.1fKiB body=%dKiB' %
+                      (stories, page_size or 'all', first_byte * 1000, last_byte * 1000,
+                       peak / 1024, size // 1024))
+        finally:
+            pipe.send('stop')
+            stubs.join()
+
+
+if __name__ == '__main__':
+    main()
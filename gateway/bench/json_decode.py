@@ -0,0 +1,66 @@
+"""
+CPU spent decoding backend replies per request: the stdlib json with the
+nested rolls outcome decoded again by the view, against the configured
+codec with typed stories decoding it only when shown.
+
+    python -m gateway.bench.json_decode [--stories 1000 10000] [--repeat R]
+"""
+import argparse
+import json
+import time
+
+from gateway.backend import BackendResponse, JsonCodec, get_codec
+from gateway.bench.stubs import make_story
+
+
+def per_call(fn, repeat, rounds=5):
+    """
+    Best cpu time of `rounds` runs of `repeat` calls, per call.
+    """
+    fn()
+    best = float('inf')
+    for _ in range(rounds):
+        started = time.process_time()
+        for _ in range(repeat):
+            fn()
+        best = min(best, time.process_time() - started)
+    return best / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--stories', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    codec = get_codec('auto')
+
+    story = json.dumps(make_story(1)).encode()
+    cases = [
+        ('story', story,
+         lambda r: json.loads(r.json()['rolls_outcome']),
+         lambda r: r.story().rolls_outcome),
+    ]
+    for count in args.stories:
+        # The last story of each writer, with ten stories per writer.
+        payloads = {
+            'stories': [make_story(i + 1) for i in range(count)],
+            'writers-last-stories': [make_story(i + 1, author_id=i + 1) for i in range(count // 10)],
+        }
+        for page, stories in payloads.items():
+            cases.append(('%s/%d' % (page, len(stories)), json.dumps({'stories': stories}).encode(),
+                          lambda r: [s['title'] for s in r.json()['stories']],
+                          lambda r: [s['title'] for s in r.stories()]))
+
+    for name, content, before, after in cases:
+        old = BackendResponse(200, content, {}, 0, JsonCodec)
+        new = BackendResponse(200, content, {}, 0, codec)
+        repeat = args.repeat if len(content) > 100000 else args.repeat * 500
+        old_time = per_call(lambda: before(old), repeat)
+        new_time = per_call(lambda: after(new), repeat)
+        print('%-28s %8dB json=%9.1fus %s=%9.1fus saved=%9.1fus (%.1fx)' %
+              (name, len(content), old_time * 1e6, codec.name, new_time * 1e6,
+               (old_time - new_time) * 1e6, old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Cost of one `load_user` call, the lookup Flask-Login runs on every
+authenticated request, for each identity mode and user store.
+
+    python -m gateway.bench.load_user [--number N]
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+from gateway.app import create_app
+from gateway.auth import load_user, remember_user
+from gateway.classes.user import User
+
+
+def measure(config, number):
+    app = create_app(test=True, config=config)
+    with app.test_request_context():
+        user = User(1, 'Admin')
+        remember_user(user)
+        assert load_user('1') is not None
+        return timeit.timeit(lambda: load_user('1'), number=number) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'users.sqlite')
+    modes = [
+        ('store/memory', {'IDENTITY': 'store', 'USER_STORE': 'memory'}),
+        ('store/sqlite', {'IDENTITY': 'store', 'USER_STORE': 'sqlite', 'USER_STORE_URL': path}),
+        ('token/memory', {'IDENTITY': 'token', 'IDENTITY_DENYLIST': 'memory'}),
+        ('token/sqlite', {'IDENTITY': 'token', 'IDENTITY_DENYLIST': 'sqlite', 'IDENTITY_DENYLIST_URL': path}),
+    ]
+    for name, config in modes:
+        print('%-14s %.2fus' % (name, 1e6 * measure(config, args.number)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Load test of the sync (threaded) and async (gevent) serving modes of
+`gateway.serve`, run as real servers in front of slow local stub backends.
+
+    python -m gateway.bench.modes [--clients C] [--duration S] [--latency L]
+"""
+import argparse
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from gateway.bench.stubs import StubCluster
+
+
+PAGES = ['/', '/explore', '/my_wall', '/users', '/story/1']
+CSRF = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def start_gateway(urls, port, env=None, args=('-m', 'gateway.serve')):
+    # Every benchmark client logs in from this address: no rate limits, and
+    # no shedding of the load the benchmark is measuring.
+    env = dict(os.environ, GATEWAY_HOST='127.0.0.1', GATEWAY_PORT=str(port), GATEWAY_RATE_LIMITS='0',
+               GATEWAY_ADMISSION='0', **(env or {}))
+    for service, url in urls.items():
+        env['GATEWAY_' + service.upper() + '_URL'] = url
+    process = subprocess.Popen([sys.executable] + list(args), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = 'http://127.0.0.1:' + str(port)
+    for _ in range(100):
+        try:
+            requests.get(base + '/login', timeout=1)
+            return process, base
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('gateway did not start')
+
+
+def login(session, base):
+    """
+    Log `session` in as the example user. The reply is a 302 if it worked,
+    else the failed reply of the login form or of its page.
+    """
+    page = session.get(base + '/login')
+    if page.status_code != 200:
+        return page
+    token = CSRF.search(page.text).group(1)
+    return session.post(base + '/login', allow_redirects=False, data={
+        'csrf_token': token, 'email': 'example@example.com', 'password': 'admin'})
+
+
+def _client(base, stop, latencies, errors, pages):
+    session = requests.Session()
+    while not stop.is_set():
+        try:
+            status = login(session, base).status_code
+        except requests.exceptions.RequestException:
+            status = None
+        if status == 302:
+            break
+        errors.append(status)
+    # Clients start at different pages, not all asking the same one at once.
+    i = random.randrange(len(pages))
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            status = session.get(base + pages[i % len(pages)], timeout=30).status_code
+        except requests.exceptions.RequestException:
+            status = None
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(status)
+        i += 1
+
+
+def summary(latencies, errors, duration):
+    """
+    Throughput and nearest-rank latency percentiles of a load run.
+    """
+    latencies = sorted(latencies)
+    result = {'rps': len(latencies) / duration, 'errors': errors}
+    for percentile in (50, 95, 99):
+        rank = max(0, -(-len(latencies) * percentile // 100) - 1)
+        result['p%d_ms' % percentile] = 1000 * latencies[rank] if latencies else 0
+    return result
+
+
+def load(base, clients, duration, pages=PAGES, client=_client):
+    stop = threading.Event()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=client, args=(base, stop, latencies, errors, pages))
+               for _ in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    result = summary(latencies, len(errors), duration)
+    # Logged in clients sent back to login: the session was lost.
+    result['unauthorized'] = errors.count(401)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubCluster(latency=args.latency) as cluster:
+        for mode in ('sync', 'async'):
+            process, base = start_gateway(cluster.urls, free_port(), {'GATEWAY_MODE': mode})
+            try:
+                result = load(base, args.clients, args.duration)
+            finally:
+                process.terminate()
+                process.wait()
+            result['mode'] = mode
+            print('mode=%(mode)-5s rps=%(rps).1f p50=%(p50_ms).1fms '
+                  'p99=%(p99_ms).1fms errors=%(errors)d' % result)
+
+
+if __name__ == '__main__':
+    main()
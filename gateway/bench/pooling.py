@@ -0,0 +1,65 @@
+"""
+Page latency and throughput of the gateway with and without keep-alive
+pooling of the backend connections, against local stub backends.
+
+    python -m gateway.bench.pooling [--requests N] [--threads T]
+"""
+import argparse
+import threading
+import time
+
+from gateway.app import create_app
+from gateway.bench.stubs import StubCluster
+
+
+PAGES = ['/', '/explore', '/my_wall', '/users', '/story/1']
+
+
+def _worker(app, count, latencies):
+    client = app.test_client()
+    client.post('/login', data={'email': 'example@example.com', 'password': 'admin'})
+    for i in range(count):
+        page = PAGES[i % len(PAGES)]
+        start = time.perf_counter()
+        reply = client.get(page)
+        latencies.append(time.perf_counter() - start)
+        assert reply.status_code == 200, page
+
+
+def run(urls, pooling, requests, threads):
+    app = create_app(test=True, config={'BACKEND_SERVICES': urls, 'BACKEND_POOLING': pooling})
+    latencies = []
+    workers = [threading.Thread(target=_worker, args=(app, requests // threads, latencies))
+               for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    app.backend.close()
+    latencies.sort()
+    return {
+        'pooling': pooling,
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+        'p99_ms': 1000 * latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    with StubCluster() as cluster:
+        for pooling in (False, True):
+            result = run(cluster.urls, pooling, args.requests, args.threads)
+            print('pooling=%(pooling)-5s requests=%(requests)d rps=%(rps).1f '
+                  'mean=%(mean_ms).2fms p99=%(p99_ms).2fms' % result)
+
+
+if __name__ == '__main__':
+    main()
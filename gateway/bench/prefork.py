@@ -0,0 +1,67 @@
+"""
+Throughput of the Werkzeug development server against the pre-fork
+production server (gunicorn with gateway/gunicorn_conf.py).
+
+    python -m gateway.bench.prefork [--clients C] [--duration S] [--workers W]
+
+A login must hold on every worker: the benchmark fails if a logged client
+is answered 401, be it during the load or on fresh connections.
+"""
+import argparse
+import os
+import sys
+
+import requests
+
+from gateway.bench.modes import free_port, load, login, start_gateway
+from gateway.bench.stubs import StubCluster
+
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn_conf.py')
+
+SERVERS = [
+    ('dev', ('-m', 'gateway.serve')),
+    ('prefork', ('-m', 'gunicorn', '-c', CONF, 'gateway.wsgi:app')),
+]
+
+
+def unauthorized(base, calls=40):
+    """
+    Log in once, then count the 401s of `calls` on new connections, which
+    the server may give to any of its workers.
+    """
+    session = requests.Session()
+    if login(session, base).status_code != 302:
+        return calls
+    return sum(requests.get(base + '/my_wall', cookies=session.cookies, headers={'Connection': 'close'},
+                            allow_redirects=False, timeout=30).status_code == 401
+               for _ in range(calls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() * 2 + 1)
+    args = parser.parse_args()
+
+    env = {'GATEWAY_WORKERS': str(args.workers)}
+    with StubCluster(latency=args.latency) as cluster:
+        for name, command in SERVERS:
+            process, base = start_gateway(cluster.urls, free_port(), env, command)
+            try:
+                result = load(base, args.clients, args.duration)
+                result['unauthorized'] += unauthorized(base)
+            finally:
+                process.terminate()
+                process.wait()
+            result['server'] = name
+            print('server=%(server)-7s rps=%(rps).1f p50=%(p50_ms).1fms '
+                  'p99=%(p99_ms).1fms errors=%(errors)d unauthorized=%(unauthorized)d' % result)
+            if result['unauthorized']:
+                sys.exit('%s: logged clients were answered 401, logins are not shared by the workers' % name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Gateway throughput as backend instances are added: every service runs as 1,
+2 then 4 stub instances, each serving a few requests at a time, and the
+gateway balances its calls over them. Story pages are loaded, as they are
+not cached by the gateway and so always reach the stories service.
+
+    python -m gateway.bench.replicas [--replicas 1 2 4] [--concurrency N] [--clients C]
+"""
+import argparse
+
+from gateway.bench.modes import free_port, load, start_gateway
+from gateway.bench.prefork import SERVERS
+from gateway.bench.stubs import StubCluster
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--replicas', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--concurrency', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--balancer', default='least_outstanding')
+    args = parser.parse_args()
+
+    for replicas in args.replicas:
+        clusters = [StubCluster(latency=args.latency, concurrency=args.concurrency) for _ in range(replicas)]
+        urls = {service: ','.join(cluster.urls[service] for cluster in clusters) for service in clusters[0].urls}
+        process, base = start_gateway(urls, free_port(), {'GATEWAY_BALANCER': args.balancer},
+                                      dict(SERVERS)['prefork'])
+        try:
+            result = load(base, args.clients, args.duration, pages=['/story/%d' % i for i in range(1, 1001)])
+        finally:
+            process.terminate()
+            process.wait()
+            for cluster in clusters:
+                cluster.shutdown()
+        result['replicas'] = replicas
+        print('replicas=%(replicas)d rps=%(rps).1f p50=%(p50_ms).1fms p95=%(p95_ms).1fms '
+              'p99=%(p99_ms).1fms errors=%(errors)d' % result)
+
+
+if __name__ == '__main__':
+    main()
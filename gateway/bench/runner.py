@@ -0,0 +1,109 @@
+"""
+Benchmark suite: runs a gateway server in front of the stub backends and
+drives its main routes one at a time, reporting for each the throughput and
+the p50, p95 and p99 latency. Append the results to a file with --output to
+follow them from one commit to the next.
+
+    python -m gateway.bench.runner [--server dev|prefork] [--clients C] [--duration S]
+                                   [--latency L] [--error-rate E] [--text-size N]
+                                   [--routes R ...] [--output FILE]
+"""
+import argparse
+import datetime
+import json
+import subprocess
+import time
+
+import requests
+
+from gateway.bench.modes import free_port, load, login, start_gateway
+from gateway.bench.prefork import SERVERS
+from gateway.bench.stubs import StubCluster
+
+
+ROUTES = ['/', '/explore', '/story/1', '/my_wall', '/users', '/login']
+
+
+def _login_client(base, stop, latencies, errors, pages):
+    # A whole login each time: the form, then posting it.
+    while not stop.is_set():
+        session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = login(session, base).status_code == 302
+        except requests.exceptions.RequestException:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(1)
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(server, routes, clients, duration, stubs):
+    """
+    Load each of `routes` in turn and return their results.
+    """
+    results = []
+    with StubCluster(**stubs) as cluster:
+        process, base = start_gateway(cluster.urls, free_port(), args=dict(SERVERS)[server])
+        try:
+            for route in routes:
+                if route == '/login':
+                    result = load(base, clients, duration, client=_login_client)
+                else:
+                    result = load(base, clients, duration, pages=[route])
+                result['route'] = route
+                results.append(result)
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=[name for name, _ in SERVERS], default='prefork')
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--text-size', type=int, default=0)
+    parser.add_argument('--stories', type=int, default=50)
+    parser.add_argument('--routes', nargs='+', default=ROUTES)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    stubs = {'stories': args.stories, 'latency': args.latency, 'error_rate': args.error_rate,
+             'text_size': args.text_size}
+    results = run(args.server, args.routes, args.clients, args.duration, stubs)
+
+    print('%-10s %9s %9s %9s %9s %7s' % ('route', 'rps', 'p50', 'p95', 'p99', 'errors'))
+    for result in results:
+        print('%-10s %9.1f %7.1fms %7.1fms %7.1fms %7d' %
+              (result['route'], result['rps'], result['p50_ms'], result['p95_ms'], result['p99_ms'],
+               result['errors']))
+
+    if args.output:
+        run_info = {
+            'time': datetime.datetime.utcnow().isoformat() + 'Z',
+            'commit': _commit(),
+            'server': args.server,
+            'clients': args.clients,
+            'duration': args.duration,
+            'stubs': stubs,
+        }
+        with open(args.output, 'a') as f:
+            for result in results:
+                f.write(json.dumps(dict(run_info, **result), sort_keys=True) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Memory held per logged user by the in-memory user store, for the slotted
+User against the former plain class with a per-instance __dict__.
+
+    python -m gateway.bench.sessions_memory [--sessions N]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from gateway.classes.user import User
+from gateway.user_store import MemoryUserStore
+
+
+class DictUser:
+    def __init__(self, user_id, firstname):
+        self.user_id = user_id
+        self.firstname = firstname
+        self.is_anonymous = False
+        self.is_active = True
+        self.is_authenticated = False
+        self.is_admin = False
+
+
+def bytes_per_session(user_class, sessions):
+    gc.collect()
+    tracemalloc.start()
+    store = MemoryUserStore(max_size=sessions)
+    # Keys and names are built beforehand, only the store itself is measured.
+    keys = [str(i) for i in range(sessions)]
+    names = ['Writer' + key for key in keys]
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(sessions):
+        store[keys[i]] = user_class(i, names[i])
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sessions', type=int, default=100000)
+    args = parser.parse_args()
+
+    for user_class in (DictUser, User):
+        print('%-8s %.1f bytes/session' % (user_class.__name__, bytes_per_session(user_class, args.sessions)))
+
+
+if __name__ == '__main__':
+    main()
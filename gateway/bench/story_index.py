@@ -0,0 +1,59 @@
+"""
+Date filter of /explore answered by the stories service and by the story
+index of the gateway.
+
+    python -m gateway.bench.story_index [--stories N] [--queries Q]
+"""
+import argparse
+import datetime
+import random
+import time
+from urllib.parse import urlencode
+
+from gateway.backend import BackendClient
+from gateway.bench.stubs import FIRST_DAY, StubCluster
+from gateway.story_index import StoryIndex
+
+
+def ranges(stories, queries, days=10):
+    """
+    Narrow ranges, like a user picking a week or two.
+    """
+    for _ in range(queries):
+        start = FIRST_DAY + datetime.timedelta(days=random.randrange(stories))
+        yield str(start), str(start + datetime.timedelta(days=days))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--stories', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=20)
+    args = parser.parse_args()
+    queries = list(ranges(args.stories, args.queries))
+
+    with StubCluster(services=('stories',), stories=args.stories) as cluster:
+        client = BackendClient(cluster.urls, timeout=30)
+
+        started = time.perf_counter()
+        for start, end in queries:
+            client.get('stories', '/stories?' + urlencode({'start': start, 'end': end})).json()
+        backend = (time.perf_counter() - started) / len(queries)
+
+        index = StoryIndex(client)
+        started = time.perf_counter()
+        while index.between() is None:
+            time.sleep(0.001)
+        load = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for start, end in queries * 100:
+            index.between(start, end)
+        indexed = (time.perf_counter() - started) / (len(queries) * 100)
+
+        print('stories=%d backend=%.2fms index_load=%.0fms index_query=%.1fus' %
+              (args.stories, backend * 1000, load * 1000, indexed * 1e6))
+        client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+"""
+Stand-ins for the six backend microservices, serving fixed data on local
+ports. Used in process by the tests and benchmarks, or on their own to
+point a gateway (or the view tests) at them:
+
+    python -m gateway.bench.stubs [--latency L] [--error-rate E] [--text-size N]
+"""
+import argparse
+import datetime
+import json
+import random
+import socket
+import threading
+import time
+
+from flask import Blueprint, Flask, jsonify, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+SERVICES = ('auth', 'stories', 'rank', 'reactions', 'stats', 'follows')
+
+FACES = [
+    ['bag', 'static/Mountain/bag.PNG'],
+    ['bike', 'static/Mountain/bike.PNG'],
+    ['bird', 'static/Mountain/bird.PNG'],
+]
+
+
+FIRST_DAY = datetime.date(2019, 1, 1)
+
+# The accounts every stub starts with, by email: the admin of the old test
+# database, author of all the stories.
+USERS = {'example@example.com': {'user_id': 1, 'firstname': 'Admin', 'password': 'admin'}}
+
+
+def make_story(story_id, author_id=1, published=True, text_size=0):
+    # One story a day, story 1 on FIRST_DAY.
+    text = 'bag bike bird'
+    if text_size > len(text):
+        text = (text + ' ') * (text_size // (len(text) + 1)) + text
+    return {
+        'id': story_id,
+        'title': 'Story ' + str(story_id),
+        'text': text,
+        'author_id': author_id,
+        'author_name': 'Writer ' + str(author_id),
+        'likes': 0,
+        'dislikes': 0,
+        'date': str(FIRST_DAY + datetime.timedelta(days=story_id - 1)),
+        'theme': 'Mountain',
+        'published': published,
+        'rolls_outcome': json.dumps(FACES)
+    }
+
+
+def _stories_list(config):
+    return [make_story(i + 1, text_size=config['text_size']) for i in range(config['stories'])]
+
+
+def _auth(config):
+    bp = Blueprint('auth', __name__)
+    users = {email: dict(user) for email, user in USERS.items()}
+    lock = threading.Lock()
+
+    @bp.route('/login', methods=['POST'])
+    def login():
+        user = users.get(request.json['email'])
+        if user is None or user['password'] != request.json['password']:
+            return jsonify(description='Wrong credentials'), 401
+        return jsonify(user_id=user['user_id'], firstname=user['firstname'])
+
+    @bp.route('/signup', methods=['POST'])
+    def signup():
+        with lock:
+            if request.json['email'] in users:
+                return jsonify(description='Email already used'), 409
+            user = {'user_id': len(users) + 1, 'firstname': request.json['firstname'],
+                    'password': request.json['password']}
+            users[request.json['email']] = user
+        return jsonify(user_id=user['user_id'], firstname=user['firstname'])
+
+    @bp.route('/user-exists/<int:user_id>')
+    def user_exists(user_id):
+        if not any(user['user_id'] == user_id for user in list(users.values())):
+            return jsonify(description='User not found'), 404
+        return jsonify(author_name='Writer ' + str(user_id))
+
+    return bp
+
+
+def _stories(config):
+    bp = Blueprint('stories', __name__)
+
+    @bp.route('/stories')
+    def stories():
+        if 'start' in request.args:
+            first = (datetime.date.fromisoformat(request.args['start']) - FIRST_DAY).days + 1
+            last = (datetime.date.fromisoformat(request.args['end']) - FIRST_DAY).days + 1
+            ids = range(max(first, 1), min(last, config['stories']) + 1)
+            return jsonify(stories=[make_story(i, text_size=config['text_size']) for i in ids])
+        # The cursor is the offset of the page, opaque to the gateway.
+        if 'limit' not in request.args:
+            return jsonify(stories=_stories_list(config))
+        start = int(request.args.get('cursor', 0))
+        end = min(start + int(request.args['limit']), config['stories'])
+        page = [make_story(i + 1, text_size=config['text_size']) for i in range(start, end)]
+        next_cursor = str(end) if end < config['stories'] else None
+        return jsonify(stories=page, next_cursor=next_cursor)
+
+    @bp.route('/following-stories/<int:user_id>')
+    def following_stories(user_id):
+        return jsonify(stories=_stories_list(config))
+
+    @bp.route('/writers-last-stories')
+    def writers_last_stories():
+        return jsonify(stories=_stories_list(config))
+
+    @bp.route('/story/<int:story_id>/<int:user_id>', methods=['GET', 'DELETE'])
+    def story(story_id, user_id):
+        if not 1 <= story_id <= config['stories']:
+            return jsonify(description='Story not found'), 404
+        story = make_story(story_id, text_size=config['text_size'])
+        if request.method == 'DELETE':
+            if story['author_id'] != user_id:
+                return jsonify(description='Not the author'), 401
+            return jsonify(description='Story deleted')
+        return jsonify(story)
+
+    @bp.route('/random-story/<int:user_id>')
+    def random_story(user_id):
+        # A story of another writer: the admin wrote them all.
+        story = make_story(1, text_size=config['text_size'])
+        if not config['stories'] or story['author_id'] == user_id:
+            return jsonify(description='No story found'), 404
+        return jsonify(story)
+
+    @bp.route('/retrieve-set-themes')
+    def retrieve_set_themes():
+        return jsonify(themes=['Late night', 'Mountain', 'Travelers', 'Youth'], dice_number=6)
+
+    @bp.route('/new-draft', methods=['POST'])
+    def new_draft():
+        return jsonify(story_id=1)
+
+    @bp.route('/write-story', methods=['PUT'])
+    def write_story():
+        return jsonify(description='Story written')
+
+    return bp
+
+
+def _rank(config):
+    bp = Blueprint('rank', __name__)
+
+    @bp.route('/rank/<int:user_id>')
+    def rank(user_id):
+        return jsonify(stories=_stories_list(config))
+
+    return bp
+
+
+def _reactions(config):
+    bp = Blueprint('reactions', __name__)
+
+    @bp.route('/like', methods=['POST', 'DELETE'])
+    @bp.route('/dislike', methods=['POST', 'DELETE'])
+    def react():
+        return jsonify(description='Reaction registered')
+
+    return bp
+
+
+def _stats(config):
+    bp = Blueprint('stats', __name__)
+
+    @bp.route('/stats/<int:user_id>')
+    def stats(user_id):
+        return jsonify(score=4.2)
+
+    return bp
+
+
+def _follows(config):
+    bp = Blueprint('follows', __name__)
+    # Users signed up on the auth stub are not known here.
+    known = {user['user_id'] for user in USERS.values()}
+    following = set()
+    lock = threading.Lock()
+
+    @bp.route('/follow', methods=['POST', 'DELETE'])
+    def follow():
+        user_id, followee_id = int(request.json['user_id']), int(request.json['followee_id'])
+        if followee_id == user_id:
+            return jsonify(description='Cannot follow yourself'), 401
+        if followee_id not in known:
+            return jsonify(description='User not found'), 404
+        pair = (user_id, followee_id)
+        with lock:
+            if request.method == 'POST':
+                if pair in following:
+                    return jsonify(description='Already following'), 409
+                following.add(pair)
+                return jsonify(description='Following')
+            if pair not in following:
+                return jsonify(description='Not following'), 409
+            following.discard(pair)
+            return jsonify(description='Unfollowed')
+
+    @bp.route('/followers-list/<int:user_id>')
+    def followers_list(user_id):
+        return jsonify(followers=[{'follower_id': 2, 'follower_name': 'Follower'}])
+
+    return bp
+
+
+_blueprints = {
+    'auth': _auth,
+    'stories': _stories,
+    'rank': _rank,
+    'reactions': _reactions,
+    'stats': _stats,
+    'follows': _follows,
+}
+
+
+def make_stub(service, stories=10, latency=0, error_rate=0, text_size=0, seed=None, concurrency=0):
+    """
+    Build a Flask app answering the routes of `service` that the gateway uses,
+    each reply delayed by `latency` seconds. A share `error_rate` of the
+    requests fail with a 500, and stories carry `text_size` characters of
+    text to make the replies as large as needed. With a `concurrency` the
+    stub serves at most that many requests at once, like a real instance
+    with a fixed number of workers.
+    """
+    config = {'stories': stories, 'latency': latency, 'error_rate': error_rate, 'text_size': text_size}
+    errors = random.Random(seed)
+    app = Flask('stub-' + service)
+    app.register_blueprint(_blueprints[service](config))
+    # Changed by tests and benchmarks to grow the data set or slow down while
+    # serving.
+    app.settings = config
+    app.hits = 0
+    app.last_traceparent = None
+    app.last_deadline = None
+    lock = threading.Lock()
+
+    workers = threading.BoundedSemaphore(concurrency) if concurrency else None
+
+    @app.before_request
+    def count_hit():
+        # Drain the body, the connection is reused for the next request.
+        request.get_data()
+        if workers is not None:
+            workers.acquire()
+        with lock:
+            app.hits += 1
+            app.last_traceparent = request.headers.get('traceparent')
+            app.last_deadline = request.headers.get('X-Request-Timeout-Ms')
+        if config['latency']:
+            time.sleep(config['latency'])
+        if config['error_rate'] and errors.random() < config['error_rate']:
+            return jsonify(description='Stub failure'), 500
+
+    if workers is not None:
+        @app.teardown_request
+        def release_worker(exc):
+            workers.release()
+
+    return app
+
+
+class _KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        WSGIRequestHandler.setup(self)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class StubCluster:
+    """
+    The six backend services, each served on its own local port by a
+    threaded http/1.1 server so that clients can keep connections alive.
+    """
+    def __init__(self, services=SERVICES, **kwargs):
+        self.apps = {}
+        self.urls = {}
+        self._servers = {}
+        for service in services:
+            app = make_stub(service, **kwargs)
+            server = make_server('127.0.0.1', 0, app, threaded=True,
+                                 request_handler=_KeepAliveHandler)
+            server.connections = 0
+            thread = threading.Thread(target=server.serve_forever)
+            thread.daemon = True
+            thread.start()
+            self.apps[service] = app
+            self.urls[service] = 'http://127.0.0.1:' + str(server.server_port)
+            self._servers[service] = server
+
+    def hits(self, service):
+        return self.apps[service].hits
+
+    def connections(self, service):
+        return self._servers[service].connections
+
+    def shutdown(self):
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--stories', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--text-size', type=int, default=0)
+    args = parser.parse_args()
+
+    with StubCluster(stories=args.stories, latency=args.latency, error_rate=args.error_rate,
+                     text_size=args.text_size) as cluster:
+        for service, url in cluster.urls.items():
+            print('export GATEWAY_%s_URL=%s' % (service.upper(), url), flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,48 @@
 class User:
-    def __init__(self, user_id, firstname):
-        self.user_id = user_id
-        self.firstname = firstname
-        self.is_anonymous = False
-        self.is_active = True
-        self.is_authenticated = False
-        self.is_admin = False
+    """
+    A logged user as kept by the gateway between requests. Instances are
+    shared by concurrent requests, so they are immutable.
+    """
+    __slots__ = ('user_id', 'firstname', 'is_admin')
+    is_anonymous = False
+    is_active = True
+    is_authenticated = False
+
+    def __init__(self, user_id, firstname, is_admin=False):
+        object.__setattr__(self, 'user_id', user_id)
+        object.__setattr__(self, 'firstname', firstname)
+        object.__setattr__(self, 'is_admin', is_admin)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('User is immutable')
 
     def get_id(self):
         return self.user_id
+
+
+class SessionUser:
+    """
+    The user authenticated for the current request, wrapping the shared User.
+    """
+    __slots__ = ('user',)
+    is_anonymous = False
+    is_active = True
+    is_authenticated = True
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def user_id(self):
+        return self.user.user_id
+
+    @property
+    def firstname(self):
+        return self.user.firstname
+
+    @property
+    def is_admin(self):
+        return self.user.is_admin
+
+    def get_id(self):
+        return self.user.user_id
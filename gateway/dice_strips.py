@@ -0,0 +1,147 @@
+import os
+import tempfile
+import threading
+from urllib.parse import quote
+
+
+FORMATS = {'png': 'PNG', 'webp': 'WEBP'}
+
+
+class DiceStrips:
+    """
+    One image holding all the faces of a roll outcome, cut from the sprite
+    sheet of its theme, so that a story shows its dice with one request.
+    Strips are made on first request and kept in `directory`; past
+    `max_files` the least recently served are removed. A roll has at most
+    `max_cells` dice. Needs the optional Pillow package and built sprites,
+    without them `url` returns None.
+    """
+    def __init__(self, assets, directory, max_files=10000, url_prefix='/dice/', max_cells=6):
+        self.assets = assets
+        self.directory = directory
+        self.max_files = max_files
+        self.max_cells = max_cells
+        self.url_prefix = url_prefix
+        self.made = 0
+        self.evicted = 0
+        self._sheets = {}
+        self._files = None
+        self._lock = threading.Lock()
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+        self._image = Image
+
+    def _outcome(self, faces):
+        """
+        (theme, sprite, cells) of a roll outcome, or None if its faces are not
+        all in the sprite of one theme.
+        """
+        paths = [self.assets.key(face[1]) for face in faces]
+        themes = set(path.split('/')[0] for path in paths if '/' in path)
+        if len(themes) != 1 or not 0 < len(paths) <= self.max_cells:
+            return None
+        theme = themes.pop()
+        sprite = self.assets.sprites.get(theme)
+        if sprite is None or not all(path in sprite['faces'] for path in paths):
+            return None
+        return theme, sprite, [sprite['faces'][path] for path in paths]
+
+    @staticmethod
+    def _version(sprite):
+        # The fingerprint of the sprite, so strips change when it does.
+        return sprite['url'].rsplit('.', 2)[1]
+
+    def url(self, faces, kind='png'):
+        outcome = self._outcome(faces) if self._image is not None else None
+        if outcome is None:
+            return None
+        theme, sprite, cells = outcome
+        return '%s%s/%s/%s.%s' % (self.url_prefix, quote(theme), self._version(sprite),
+                                  '-'.join(str(cell) for cell in cells), kind)
+
+    def path(self, theme, version, cells, kind):
+        """
+        The file of a strip, made now if needed; None if the strip does not
+        exist, e.g. it was asked for an older sprite or for more dice than a
+        roll has.
+        """
+        sprite = self.assets.sprites.get(theme)
+        if self._image is None or sprite is None or self._version(sprite) != version or kind not in FORMATS:
+            return None
+        if cells.count('-') >= self.max_cells:
+            return None
+        try:
+            cells = [int(cell) for cell in cells.split('-')]
+        except ValueError:
+            return None
+        if not cells or not all(0 <= cell < len(sprite['faces']) for cell in cells):
+            return None
+
+        path = os.path.join(self.directory, theme, version, '-'.join(map(str, cells)) + '.' + kind)
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        self._make(path, sprite, cells, kind)
+        return path
+
+    def _sheet(self, sprite):
+        sheet = self._sheets.get(sprite['url'])
+        if sheet is None:
+            sheet = self._image.open(os.path.join(self.assets.directory, sprite['url']))
+            sheet.load()
+            self._sheets[sprite['url']] = sheet
+        return sheet
+
+    def _make(self, path, sprite, cells, kind):
+        cell = sprite['cell']
+        sheet = self._sheet(sprite)
+        strip = self._image.new('RGBA', (cell * len(cells), cell))
+        for index, face in enumerate(cells):
+            strip.paste(sheet.crop((face * cell, 0, (face + 1) * cell, cell)), (index * cell, 0))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside then renamed, other workers may be making it too.
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                strip.save(f, FORMATS[kind], **({'quality': 85} if kind == 'webp' else {'optimize': True}))
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        with self._lock:
+            self.made += 1
+            if self._files is not None:
+                self._files += 1
+            if self._files is None or self._files > self.max_files:
+                self._evict()
+
+    def _evict(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    files.append((os.stat(path).st_mtime, path))
+                except FileNotFoundError:
+                    continue
+        self._files = len(files)
+        if len(files) <= self.max_files:
+            return
+        # Make room for a tenth more, so that the directory is not walked on
+        # every new strip.
+        files.sort()
+        for _, path in files[:len(files) - self.max_files * 9 // 10]:
+            try:
+                os.remove(path)
+                self.evicted += 1
+                self._files -= 1
+            except FileNotFoundError:
+                continue
+
+    def stats(self):
+        return {'made': self.made, 'evicted': self.evicted, 'files': self._files, 'max_files': self.max_files}
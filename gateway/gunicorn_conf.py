@@ -0,0 +1,55 @@
+"""
+Production server settings, read from the environment.
+
+    gunicorn -c gateway/gunicorn_conf.py gateway.wsgi:app
+
+The app is created once in the master (preload_app) and the workers are
+forked from it, sharing the logged users through the sqlite user store by
+default. SIGHUP replaces the workers gracefully with new ones,
+SIGTERM stops accepting connections and lets in-flight requests drain for
+up to GATEWAY_GRACEFUL_TIMEOUT seconds.
+"""
+import multiprocessing
+import os
+
+
+# Logged users must be seen by every worker: unless told otherwise they are
+# kept in a sqlite file of the node instead of the memory of one worker.
+os.environ.setdefault('GATEWAY_USER_STORE', 'sqlite')
+
+bind = os.environ.get('GATEWAY_HOST', '0.0.0.0') + ':' + os.environ.get('GATEWAY_PORT', '5000')
+preload_app = True
+
+workers = int(os.environ.get('GATEWAY_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GATEWAY_THREADS', 4))
+if os.environ.get('GATEWAY_MODE', 'sync') == 'async':
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GATEWAY_ASYNC_CONNECTIONS', 1000))
+else:
+    worker_class = 'gthread'
+
+# Recycle workers after a number of requests, jittered so that they do not
+# all restart at once.
+max_requests = int(os.environ.get('GATEWAY_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GATEWAY_MAX_REQUESTS_JITTER', max_requests // 10))
+
+timeout = int(os.environ.get('GATEWAY_WORKER_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GATEWAY_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GATEWAY_KEEPALIVE', 5))
+
+
+def on_starting(server):
+    config = server.app.wsgi().config
+    if server.cfg.workers < 2:
+        return
+    if config['IDENTITY'] == 'store' and config['USER_STORE'] == 'memory':
+        raise RuntimeError('GATEWAY_USER_STORE=memory keeps logged users in one worker, '
+                           'use sqlite or redis, or GATEWAY_IDENTITY=token, with several workers')
+    if config['IDENTITY'] == 'token' and config['IDENTITY_DENYLIST'] == 'memory':
+        raise RuntimeError('GATEWAY_IDENTITY_DENYLIST=memory revokes tokens in one worker, '
+                           'use sqlite or redis with several workers')
+
+
+def post_fork(server, worker):
+    # Sockets and threads of the preloaded app belong to the master.
+    server.app.wsgi().backend.reset()
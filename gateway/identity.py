@@ -0,0 +1,224 @@
+import base64
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SecureCookieSessionInterface, total_seconds
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from gateway.classes.user import User
+from gateway.user_store import sqlite_connection
+
+
+class Denylist:
+    """
+    Ids of revoked tokens, kept until the tokens would have expired anyway.
+    It is bounded: past `max_size` the oldest revocations are forgotten.
+    Revocations only hold in this process.
+    """
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._revoked = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, token_id):
+        now = time.monotonic()
+        with self._lock:
+            self._revoked[token_id] = now + self.ttl
+            while self._revoked:
+                oldest, expires = next(iter(self._revoked.items()))
+                if expires > now and len(self._revoked) <= self.max_size:
+                    break
+                del self._revoked[oldest]
+
+    def __contains__(self, token_id):
+        return token_id in self._revoked
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+class SqliteDenylist:
+    """
+    Ids of revoked tokens shared by all the worker processes of a node
+    through a local sqlite file.
+    """
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._connection().execute('CREATE TABLE IF NOT EXISTS revoked_tokens ('
+                                   'token_id TEXT PRIMARY KEY, expires REAL)')
+
+    def _connection(self):
+        return sqlite_connection(self._local, self.path)
+
+    def add(self, token_id):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('INSERT OR REPLACE INTO revoked_tokens VALUES (?, ?)', (token_id, now + self.ttl))
+        connection.execute('DELETE FROM revoked_tokens WHERE expires <= ?', (now,))
+
+    def __contains__(self, token_id):
+        return self._connection().execute('SELECT 1 FROM revoked_tokens WHERE token_id = ? AND expires > ?',
+                                          (token_id, time.time())).fetchone() is not None
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM revoked_tokens WHERE expires > ?',
+                                          (time.time(),)).fetchone()[0]
+
+    def ids(self):
+        return {row[0] for row in self._connection().execute(
+            'SELECT token_id FROM revoked_tokens WHERE expires > ?', (time.time(),))}
+
+
+class RedisDenylist:
+    """
+    Ids of revoked tokens shared by every gateway node through a redis
+    server. Needs the optional `redis` package.
+    """
+    def __init__(self, url, ttl, prefix='gateway:revoked:'):
+        import redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def add(self, token_id):
+        self._redis.setex(self.prefix + token_id, self.ttl, 1)
+
+    def __contains__(self, token_id):
+        return self._redis.exists(self.prefix + token_id) > 0
+
+    def __len__(self):
+        return sum(1 for _ in self._redis.scan_iter(self.prefix + '*'))
+
+    def ids(self):
+        return {key.decode()[len(self.prefix):] for key in self._redis.scan_iter(self.prefix + '*')}
+
+
+class CachedDenylist:
+    """
+    This process's copy of a `shared` denylist, so that checking a token
+    does no I/O. The copy is loaded again in the background once it is
+    `refresh` seconds old: revocations by other processes are seen within
+    that time, those of this process at once.
+    """
+    def __init__(self, shared, refresh=5):
+        self.shared = shared
+        self.refresh = refresh
+        self._revoked = frozenset()
+        # Revoked here since the last load started, in case it missed them.
+        self._added = set()
+        self._refreshed_at = None
+        self._refreshing = True
+        self._lock = threading.Lock()
+        self._load()
+
+    def add(self, token_id):
+        self.shared.add(token_id)
+        with self._lock:
+            self._added.add(token_id)
+            self._revoked = self._revoked | {token_id}
+
+    def __contains__(self, token_id):
+        if time.monotonic() - self._refreshed_at >= self.refresh:
+            with self._lock:
+                started = not self._refreshing
+                self._refreshing = True
+            if started:
+                threading.Thread(target=self._load, daemon=True).start()
+        return token_id in self._revoked
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def _load(self):
+        with self._lock:
+            added, self._added = self._added, set()
+        try:
+            revoked = frozenset(self.shared.ids())
+        except Exception:
+            # Kept as it is until the next try.
+            revoked = None
+        with self._lock:
+            if revoked is not None:
+                self._revoked = revoked | added | self._added
+            else:
+                self._added |= added
+            self._refreshed_at = time.monotonic()
+            self._refreshing = False
+
+
+def make_denylist(config, ttl):
+    kind = config.get('IDENTITY_DENYLIST', 'memory')
+    if kind == 'memory':
+        return Denylist(ttl)
+    elif kind == 'sqlite':
+        shared = SqliteDenylist(config['IDENTITY_DENYLIST_URL'], ttl)
+    elif kind == 'redis':
+        shared = RedisDenylist(config['IDENTITY_DENYLIST_URL'], ttl)
+    else:
+        raise ValueError('Unknown identity denylist: ' + kind)
+    return CachedDenylist(shared, config.get('IDENTITY_DENYLIST_REFRESH', 5))
+
+
+class RotatingSessionInterface(SecureCookieSessionInterface):
+    """
+    The signed session cookie of Flask, signed with the first of `keys` and
+    accepted if signed by any of them, so keys can be rotated by prepending
+    a new one.
+    """
+    def __init__(self, keys):
+        signer_kwargs = {'key_derivation': self.key_derivation, 'digest_method': self.digest_method}
+        self._serializers = [URLSafeTimedSerializer(key, salt=self.salt, serializer=self.serializer,
+                                                    signer_kwargs=signer_kwargs) for key in keys]
+
+    def get_signing_serializer(self, app):
+        return self._serializers[0]
+
+    def open_session(self, app, request):
+        value = request.cookies.get(app.session_cookie_name)
+        if not value:
+            return self.session_class()
+        max_age = total_seconds(app.permanent_session_lifetime)
+        for serializer in self._serializers:
+            try:
+                return self.session_class(serializer.loads(value, max_age=max_age))
+            except BadSignature:
+                continue
+        return self.session_class()
+
+
+class Identity:
+    """
+    Carries the logged user in the session cookie, which Flask signs, with
+    the time of the login, so that it is rebuilt on every request without
+    any lookup. Logins older than `max_age` seconds are refused, and so are
+    those revoked in the `denylist` by a logout.
+    """
+    def __init__(self, max_age=86400, denylist=None):
+        self.max_age = max_age
+        self.denylist = denylist if denylist is not None else Denylist(max_age)
+
+    @classmethod
+    def from_config(cls, config):
+        max_age = config.get('IDENTITY_MAX_AGE', 86400)
+        return cls(max_age, make_denylist(config, max_age))
+
+    def dumps(self, user):
+        token_id = base64.urlsafe_b64encode(os.urandom(6)).decode()
+        return [user.user_id, user.firstname, int(user.is_admin), token_id, int(time.time())]
+
+    def loads(self, identity):
+        if not isinstance(identity, list) or len(identity) != 5:
+            return None
+        user_id, firstname, is_admin, token_id, logged_at = identity
+        if time.time() - logged_at > self.max_age or token_id in self.denylist:
+            return None
+        return User(user_id, firstname, bool(is_admin))
+
+    def revoke(self, identity):
+        if isinstance(identity, list) and len(identity) == 5:
+            self.denylist.add(identity[3])
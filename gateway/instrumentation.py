@@ -0,0 +1,134 @@
+import time
+
+from flask import current_app as app
+from flask import g, request
+
+from gateway.backend.deadline import DEADLINE_HEADER, current_deadline, deadline_of
+from gateway.backend.histogram import Histogram, format_labels
+from gateway.backend.tracing import Trace, current_trace
+
+
+def _request_started():
+    g.request_started = time.perf_counter()
+    g.trace = Trace.from_header(request.headers.get('traceparent'))
+    g.trace_token = current_trace.set(g.trace)
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    seconds = app.config.get('REQUEST_DEADLINES', {}).get(rule, app.config.get('REQUEST_DEADLINE'))
+    g.deadline_token = current_deadline.set(deadline_of(seconds, request.headers.get(DEADLINE_HEADER)))
+
+
+def _request_finished(response):
+    if 'trace' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    app.request_latency.observe(elapsed, request.method, route, str(response.status_code))
+
+    # Time spent in each backend, for the browser tools and the slow log.
+    backends = {}
+    for service, _, _, seconds in g.trace.calls:
+        backends[service] = backends.get(service, 0) + seconds
+    timings = ['%s;dur=%.1f' % (service, seconds * 1000) for service, seconds in sorted(backends.items())]
+    response.headers['Server-Timing'] = ', '.join(timings + ['total;dur=%.1f' % (elapsed * 1000)])
+
+    slow = app.config.get('SLOW_REQUEST')
+    if slow and elapsed >= slow:
+        app.logger.warning('slow request %s %s %.3fs trace=%s calls=%s', request.method, request.path, elapsed,
+                           g.trace.trace_id, ' '.join('%s%s:%s:%.3fs' % call for call in g.trace.calls))
+    return response
+
+
+def _request_teardown(exc):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        current_trace.reset(token)
+    token = g.pop('deadline_token', None)
+    if token is not None:
+        current_deadline.reset(token)
+
+
+def init_instrumentation(app):
+    """
+    Time every request and start its trace and deadline, which the backend
+    client passes on to the microservices.
+    """
+    app.request_latency = Histogram('gateway_request_seconds', 'Requests served by the gateway.',
+                                    ('method', 'route', 'status'))
+    app.before_request(_request_started)
+    app.after_request(_request_finished)
+    app.teardown_request(_request_teardown)
+
+
+def _samples(name, kind, documentation, samples):
+    lines = ['# HELP %s %s' % (name, documentation), '# TYPE %s %s' % (name, kind)]
+    for labels, value in samples:
+        lines.append('%s%s %s' % (name, format_labels(*zip(*labels.items())) if labels else '', value))
+    return lines
+
+
+def prometheus(app):
+    """
+    Every metric of the gateway in the prometheus text format.
+    """
+    backend = app.backend
+    lines = app.request_latency.expose() + backend.latency.expose() + app.render_stats.histogram.expose()
+
+    cache = backend.cache.stats()
+    lines += _samples('gateway_cache_lookups_total', 'counter', 'Response cache lookups by outcome.',
+                      [({'outcome': outcome}, cache[key])
+                       for outcome, key in (('hit', 'hits'), ('stale', 'stale_hits'), ('miss', 'misses'))])
+    lines += _samples('gateway_cache_entries', 'gauge', 'Replies in the response cache.', [({}, cache['size'])])
+
+    flights = backend.flights.stats()
+    lines += _samples('gateway_coalesced_calls_total', 'counter', 'GETs merged into an identical call in flight.',
+                      [({'role': 'leader'}, flights['leaders']), ({'role': 'follower'}, flights['followers'])])
+
+    breakers = {service: breaker.stats() for service, breaker in backend.breakers.items()}
+    lines += _samples('gateway_breaker_open', 'gauge', '1 when the circuit of the service is not closed.',
+                      [({'service': service}, int(stats['state'] != 'closed'))
+                       for service, stats in sorted(breakers.items())])
+    lines += _samples('gateway_breaker_rejected_total', 'counter', 'Calls refused by an open circuit.',
+                      [({'service': service}, stats['rejected']) for service, stats in sorted(breakers.items())])
+
+    budgets = sorted((service, budget.stats()) for service, budget in backend.retry_budgets.items())
+    lines += _samples('gateway_backend_retries_total', 'counter', 'Failed GETs tried again, hedges included.',
+                      [({'service': service}, stats['retries']) for service, stats in budgets])
+    lines += _samples('gateway_backend_retries_refused_total', 'counter', 'Retries refused by the retry budget.',
+                      [({'service': service}, stats['refused']) for service, stats in budgets])
+    if backend.hedging is not None:
+        hedging = backend.hedging.stats()
+        lines += _samples('gateway_backend_hedges_total', 'counter', 'Hedged requests by outcome.',
+                          [({'outcome': 'won'}, hedging['won']),
+                           ({'outcome': 'lost'}, hedging['hedged'] - hedging['won'])])
+
+    instances = [(service, url, stats) for service, urls in sorted(backend.services.stats().items())
+                 for url, stats in sorted(urls.items())]
+    lines += _samples('gateway_backend_instance_up', 'gauge', '0 while the instance is ejected.',
+                      [({'service': service, 'instance': url}, int(not stats['ejected']))
+                       for service, url, stats in instances])
+    lines += _samples('gateway_backend_instance_outstanding', 'gauge', 'Calls in flight to the instance.',
+                      [({'service': service, 'instance': url}, stats['outstanding'])
+                       for service, url, stats in instances])
+
+    limited = app.rate_limiter.stats()['limited']
+    lines += _samples('gateway_rate_limited_total', 'counter', 'Requests refused with a 429 by route.',
+                      [({'route': route}, count) for route, count in sorted(limited.items())])
+
+    logins = app.login_throttle.stats()
+    lines += _samples('gateway_logins_refused_total', 'counter', 'Logins refused by the gateway itself by reason.',
+                      [({'reason': 'throttled'}, logins['refused']), ({'reason': 'known_bad'}, logins['known_bad'])])
+
+    admission = sorted(app.admission.stats().items())
+    lines += _samples('gateway_admission_limit', 'gauge', 'Adaptive concurrency limit by class of routes.',
+                      [({'class': name}, stats['limit']) for name, stats in admission])
+    lines += _samples('gateway_admission_inflight', 'gauge', 'Requests being served by class of routes.',
+                      [({'class': name}, stats['inflight']) for name, stats in admission])
+    lines += _samples('gateway_shed_total', 'counter', 'Requests refused with a 503 by class of routes.',
+                      [({'class': name}, stats['shed']) for name, stats in admission])
+
+    fragments = app.fragments.stats()
+    lines += _samples('gateway_fragment_lookups_total', 'counter', 'Template fragment cache lookups by outcome.',
+                      [({'outcome': 'hit'}, fragments['hits']), ({'outcome': 'miss'}, fragments['misses'])])
+    lines += _samples('gateway_dice_strips_made_total', 'counter', 'Dice strip images made.',
+                      [({}, app.dice_strips.made)])
+    return '\n'.join(lines) + '\n'
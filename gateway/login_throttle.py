@@ -0,0 +1,126 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+
+# Refused passwords remembered per email, enough for the retries of a user
+# who mistyped without letting an attacker grow the cache without end.
+MAX_REFUSED_PASSWORDS = 20
+
+
+class LoginThrottle:
+    """
+    Failed logins of this process, so that the auth service, which hashes
+    every password it checks, only sees plausible attempts.
+
+    Failures are counted per email and per client address. Past
+    `email_threshold` (or `ip_threshold`) failures in a row the login is
+    refused locally for `base_delay` seconds, doubling with each further
+    failure up to `max_delay`; counts are forgotten `forget_after` seconds
+    after the last failure. The email and password pairs refused by the
+    auth service are remembered for `negative_ttl` seconds and refused
+    again without asking it; only a keyed digest of the password is kept.
+    At most `max_size` emails and addresses are tracked, least recently
+    failed first out.
+    """
+    def __init__(self, secret, max_size=100000, email_threshold=5, ip_threshold=20, base_delay=1,
+                 max_delay=900, forget_after=900, negative_ttl=300):
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.max_size = max_size
+        self.thresholds = {'email': email_threshold, 'ip': ip_threshold}
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.forget_after = forget_after
+        self.negative_ttl = negative_ttl
+        self.refused = 0
+        self.known_bad_hits = 0
+        # (kind, value) -> (failures, last failure)
+        self._failures = OrderedDict()
+        # email -> (expires, digests of the refused passwords)
+        self._refused_pairs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['SECRET_KEY'], **config.get('LOGIN_THROTTLE', {}))
+
+    def _digest(self, password):
+        return hmac.new(self.secret, password.encode(), hashlib.sha256).digest()
+
+    def blocked(self, email, address):
+        """
+        Seconds before a login for `email` from `address` may be tried, 0 if
+        it may be tried now.
+        """
+        now = time.monotonic()
+        wait = 0
+        with self._lock:
+            for key in (('email', email.lower()), ('ip', address)):
+                entry = self._failures.get(key)
+                if entry is None:
+                    continue
+                failures, last = entry
+                if now - last >= self.forget_after:
+                    del self._failures[key]
+                    continue
+                over = failures - self.thresholds[key[0]]
+                if over >= 0:
+                    wait = max(wait, last + min(self.base_delay * 2 ** over, self.max_delay) - now)
+            if wait > 0:
+                self.refused += 1
+        return max(wait, 0)
+
+    def known_bad(self, email, password):
+        """
+        Whether the auth service refused this email and password lately.
+        """
+        with self._lock:
+            entry = self._refused_pairs.get(email.lower())
+            if entry is None or entry[0] < time.monotonic():
+                return False
+            if self._digest(password) not in entry[1]:
+                return False
+            self.known_bad_hits += 1
+            return True
+
+    def failed(self, email, password, address):
+        now = time.monotonic()
+        email = email.lower()
+        with self._lock:
+            for key in (('email', email), ('ip', address)):
+                failures, last = self._failures.pop(key, (0, now))
+                if now - last >= self.forget_after:
+                    failures = 0
+                self._failures[key] = (failures + 1, now)
+            expires, digests = self._refused_pairs.pop(email, (0, set()))
+            if expires < now:
+                digests = set()
+            if len(digests) < MAX_REFUSED_PASSWORDS:
+                digests.add(self._digest(password))
+            self._refused_pairs[email] = (now + self.negative_ttl, digests)
+            while len(self._failures) > self.max_size:
+                self._failures.popitem(last=False)
+            while len(self._refused_pairs) > self.max_size:
+                self._refused_pairs.popitem(last=False)
+
+    def succeeded(self, email):
+        with self._lock:
+            self._failures.pop(('email', email.lower()), None)
+
+    def forget(self, email):
+        """
+        Drop what is known of `email`, e.g. once an account is made for it.
+        """
+        with self._lock:
+            self._failures.pop(('email', email.lower()), None)
+            self._refused_pairs.pop(email.lower(), None)
+
+    def stats(self):
+        return {
+            'refused': self.refused,
+            'known_bad': self.known_bad_hits,
+            'tracked': len(self._failures),
+            'refused_pairs': len(self._refused_pairs),
+        }
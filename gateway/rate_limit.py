@@ -0,0 +1,154 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app as app
+from flask import render_template, request
+from flask_login import current_user
+
+
+class MemoryBuckets:
+    """
+    Token buckets of this process. A bucket that filled up again is the
+    same as no bucket: the least recently used one is dropped once full,
+    and at most `max_size` buckets are kept.
+    """
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        # key -> (tokens, at, full again at), least recently used first.
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """
+        Take a token from the bucket `key`, refilled with `rate` tokens per
+        second up to `burst`. Return 0 on success, else the seconds until a
+        token is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.pop(key, None)
+            tokens = burst if entry is None else min(burst, entry[0] + (now - entry[1]) * rate)
+            wait = 0
+            if tokens < 1:
+                wait = (1 - tokens) / rate
+            else:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            oldest = next(iter(self._buckets.values()))
+            if oldest[2] <= now or len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Same bucket as MemoryBuckets.take, run atomically by redis. Buckets expire
+# once they are full again.
+_TAKE = """
+local entry = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = burst
+if entry[1] then
+    tokens = math.min(burst, tonumber(entry[1]) + (now - tonumber(entry[2])) * rate)
+end
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'at', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """
+    Token buckets shared by every gateway process through a redis server,
+    so that a limit holds for the whole deployment. Needs the optional
+    `redis` package.
+    """
+    def __init__(self, url, prefix='gateway:rate:'):
+        import redis
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(_TAKE)
+
+    def take(self, key, rate, burst):
+        return float(self._take(keys=[self.prefix + key], args=[rate, burst, time.time()]))
+
+    def __len__(self):
+        return sum(1 for _ in self._redis.scan_iter(self.prefix + '*'))
+
+
+def make_buckets(config):
+    kind = config.get('RATE_LIMIT_STORE', 'memory')
+    if kind == 'memory':
+        return MemoryBuckets(config.get('RATE_LIMIT_SIZE', 100000))
+    elif kind == 'redis':
+        return RedisBuckets(config['RATE_LIMIT_URL'])
+    raise ValueError('Unknown rate limit store: ' + kind)
+
+
+class RateLimiter:
+    """
+    Token bucket limits of the routes, from a dict of route rules to lists
+    of limits. Each limit allows `rate` requests per second with bursts of
+    `burst`, counted `per` 'user' (the client address for anonymous users),
+    'ip' or 'global' (all clients together), optionally only for some
+    `methods`. A request must pass every limit of its route.
+    """
+    def __init__(self, limits, buckets):
+        self.limits = limits
+        self.buckets = buckets
+        self.limited = {}
+
+    def check(self, rule, method, user_id, address):
+        """
+        Seconds the client has to wait before trying again, 0 if the request
+        may go through.
+        """
+        for limit in self.limits.get(rule, ()):
+            if 'methods' in limit and method not in limit['methods']:
+                continue
+            per = limit.get('per', 'user')
+            if per == 'global':
+                client = ''
+            elif per == 'user' and user_id is not None:
+                client = 'user:' + str(user_id)
+            else:
+                client = 'ip:' + str(address)
+            wait = self.buckets.take(rule + '|' + per + '|' + client, limit['rate'], limit['burst'])
+            if wait:
+                self.limited[rule] = self.limited.get(rule, 0) + 1
+                return wait
+        return 0
+
+    def stats(self):
+        return {'limited': dict(self.limited), 'buckets': len(self.buckets)}
+
+
+def _limit_request():
+    if request.url_rule is None or request.url_rule.rule not in app.rate_limiter.limits:
+        return None
+    user_id = current_user.get_id() if current_user.is_authenticated else None
+    wait = app.rate_limiter.check(request.url_rule.rule, request.method, user_id, request.remote_addr)
+    if not wait:
+        return None
+    message = '\\_(-.-)_/ TOO MANY REQUESTS \\_(-.-)_/'
+    response = app.make_response((render_template('message.html', message=message), 429))
+    response.headers['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+def init_rate_limiting(app):
+    """
+    Answer 429 with a Retry-After header to the requests over the limits of
+    their route, before they reach the views and the backends.
+    """
+    app.rate_limiter = RateLimiter(app.config.get('RATE_LIMITS', {}), make_buckets(app.config))
+    app.before_request(_limit_request)
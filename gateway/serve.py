@@ -0,0 +1,57 @@
+"""
+Serve the gateway.
+
+    python -m gateway.serve                      # one thread per request
+    GATEWAY_MODE=async python -m gateway.serve   # cooperative, gevent
+
+In async mode the standard library is patched by gevent before anything
+else is imported, so every blocking backend call made by the views (and by
+the fan-out pool) yields to other requests instead of holding a thread.
+Routes, templates and Flask-Login sessions are the very same in both modes.
+This module runs a single process; production deployments use the
+pre-fork server configured in gateway/gunicorn_conf.py.
+"""
+import os
+
+
+MODE = os.environ.get('GATEWAY_MODE', 'sync')
+HOST = os.environ.get('GATEWAY_HOST', '0.0.0.0')
+PORT = int(os.environ.get('GATEWAY_PORT', 5000))
+# Upper bound of requests served at the same time by one async process.
+ASYNC_CONNECTIONS = int(os.environ.get('GATEWAY_ASYNC_CONNECTIONS', 10000))
+
+
+def serve_sync():
+    from gateway.app import create_app
+
+    app = create_app()
+    app.run(host=HOST, port=PORT, threaded=True)
+
+
+def serve_async():
+    from gevent import monkey
+    monkey.patch_all()
+    # As many requests in flight as connections, unless set otherwise.
+    os.environ.setdefault('GATEWAY_MAX_INFLIGHT', str(ASYNC_CONNECTIONS))
+
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+    from gateway.app import create_app
+
+    app = create_app(config={
+        'BACKEND_POOL_SIZE': int(os.environ.get('GATEWAY_POOL_SIZE', 100)),
+        'BACKEND_FANOUT_WORKERS': int(os.environ.get('GATEWAY_FANOUT_WORKERS', 1000))
+    })
+    server = WSGIServer((HOST, PORT), app, spawn=Pool(ASYNC_CONNECTIONS), log=None)
+    server.serve_forever()
+
+
+def main():
+    if MODE == 'async':
+        serve_async()
+    else:
+        serve_sync()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import os
+
+
+# Backend microservices: the base url of each service, or the urls of its
+# instances separated by commas.
+BACKEND_SERVICES = {
+    'auth': os.environ.get('GATEWAY_AUTH_URL', 'http://auth:5000'),
+    'stories': os.environ.get('GATEWAY_STORIES_URL', 'http://stories:5000'),
+    'rank': os.environ.get('GATEWAY_RANK_URL', 'http://rank:5000'),
+    'reactions': os.environ.get('GATEWAY_REACTIONS_URL', 'http://reactions:5000'),
+    'stats': os.environ.get('GATEWAY_STATS_URL', 'http://stats:5000'),
+    'follows': os.environ.get('GATEWAY_FOLLOWS_URL', 'http://follows:5000'),
+}
+
+# Decoder of the backend replies: 'orjson', 'json' or 'auto' for the fastest
+# one installed.
+BACKEND_JSON = os.environ.get('GATEWAY_JSON', 'auto')
+
+# Calls to a service with several instances go to the next one in turn
+# ('round_robin') or to the one with fewest calls in flight
+# ('least_outstanding'). An instance failing `eject_after` calls in a row is
+# left out for `eject_for` seconds, and all are checked every
+# `check_interval` seconds with a GET of `check_path`.
+BACKEND_BALANCING = {
+    'balancer': os.environ.get('GATEWAY_BALANCER', 'least_outstanding'),
+    'eject_after': int(os.environ.get('GATEWAY_EJECT_AFTER', 5)),
+    'eject_for': float(os.environ.get('GATEWAY_EJECT_FOR', 10)),
+    'check_interval': float(os.environ.get('GATEWAY_HEALTH_CHECK_INTERVAL', 5)),
+    'check_path': os.environ.get('GATEWAY_HEALTH_CHECK_PATH', '/'),
+}
+
+# Keep-alive connection pooling towards the backends.
+BACKEND_POOLING = os.environ.get('GATEWAY_POOLING', '1') == '1'
+BACKEND_POOL_SIZE = int(os.environ.get('GATEWAY_POOL_SIZE', 10))
+BACKEND_POOL_SIZES = {}
+
+# Seconds to wait for a backend reply, overridable per service.
+BACKEND_TIMEOUT = float(os.environ.get('GATEWAY_TIMEOUT', 1))
+BACKEND_TIMEOUTS = {}
+
+# Seconds a request may spend calling the backends, overridable per route:
+# each call waits at most what is left, and tells the backend so in the
+# X-Request-Timeout-Ms header. Callers may ask for less with the same header.
+REQUEST_DEADLINE = float(os.environ.get('GATEWAY_REQUEST_DEADLINE', 3))
+REQUEST_DEADLINES = {}
+
+# GETs failing with an error or a 5xx reply are made up to `attempts` times
+# in all. Retries are kept to a `ratio` of the calls to each service plus
+# `min_per_second`, so that they cannot flood a failing service.
+BACKEND_RETRIES = {
+    'attempts': int(os.environ.get('GATEWAY_RETRY_ATTEMPTS', 2)),
+    'ratio': 0.1,
+    'min_per_second': 10,
+}
+
+# Reads asking for it are sent a second time when the first request is
+# still running after the `percentile` latency of their route, measured over
+# its last `window` calls. Hedges are paid from the retry budget.
+BACKEND_HEDGING = {
+    'percentile': 95,
+    'window': 200,
+    'min_calls': 20,
+}
+
+# Independent backend calls of a page run concurrently within one deadline.
+BACKEND_FANOUT_WORKERS = int(os.environ.get('GATEWAY_FANOUT_WORKERS', 32))
+BACKEND_FANOUT_DEADLINE = float(os.environ.get('GATEWAY_FANOUT_DEADLINE', 1))
+
+# Where logged users live: 'memory' (this process), 'sqlite' (shared by the
+# workers of a node through a file) or 'redis' (shared by every node).
+USER_STORE = os.environ.get('GATEWAY_USER_STORE', 'memory')
+USER_STORE_URL = os.environ.get('GATEWAY_USER_STORE_URL', '/tmp/gateway-users.sqlite')
+USER_STORE_SIZE = int(os.environ.get('GATEWAY_USER_STORE_SIZE', 100000))
+USER_STORE_TTL = int(os.environ.get('GATEWAY_USER_STORE_TTL', 86400))
+
+# How the logged user is found on each request: 'store' looks it up in the
+# user store, 'token' rebuilds it from the signed session cookie.
+IDENTITY = os.environ.get('GATEWAY_IDENTITY', 'store')
+# Signing keys of the session cookie, newest first. Defaults to SECRET_KEY.
+IDENTITY_KEYS = [key for key in os.environ.get('GATEWAY_IDENTITY_KEYS', '').split(',') if key]
+IDENTITY_MAX_AGE = int(os.environ.get('GATEWAY_IDENTITY_MAX_AGE', 86400))
+# Where tokens revoked by a logout are kept, by default next to the logged
+# users: 'memory' only revokes them in the process that served the logout,
+# 'sqlite' in every worker of the node and 'redis' on every node. Workers
+# check a copy of the shared ones loaded again every IDENTITY_DENYLIST_REFRESH
+# seconds, so a logout takes up to that long to reach the other workers.
+IDENTITY_DENYLIST = os.environ.get('GATEWAY_IDENTITY_DENYLIST', USER_STORE)
+IDENTITY_DENYLIST_URL = os.environ.get('GATEWAY_IDENTITY_DENYLIST_URL', USER_STORE_URL)
+IDENTITY_DENYLIST_REFRESH = float(os.environ.get('GATEWAY_IDENTITY_DENYLIST_REFRESH', 5))
+
+# Seconds read-mostly backend replies are cached, per named policy, how many
+# replies are kept and for how long an expired one is still served while it
+# is refreshed in the background.
+BACKEND_CACHE_TTLS = {
+    'themes': int(os.environ.get('GATEWAY_CACHE_THEMES_TTL', 3600)),
+    'writers': int(os.environ.get('GATEWAY_CACHE_WRITERS_TTL', 30)),
+    'stories': int(os.environ.get('GATEWAY_CACHE_STORIES_TTL', 10)),
+    'rank': int(os.environ.get('GATEWAY_CACHE_RANK_TTL', 30)),
+}
+BACKEND_CACHE_SIZE = int(os.environ.get('GATEWAY_CACHE_SIZE', 1000))
+BACKEND_CACHE_STALE = int(os.environ.get('GATEWAY_CACHE_STALE', 60))
+
+# Identical GETs in flight at the same time share one upstream call.
+BACKEND_COALESCING = os.environ.get('GATEWAY_COALESCING', '1') == '1'
+
+# Per service circuit breaker: open after `error_rate` of the last `window`
+# calls failed or took more than `slow_call` seconds, probe after `open_for`.
+BACKEND_BREAKER = {
+    'window': int(os.environ.get('GATEWAY_BREAKER_WINDOW', 20)),
+    'min_calls': int(os.environ.get('GATEWAY_BREAKER_MIN_CALLS', 10)),
+    'error_rate': float(os.environ.get('GATEWAY_BREAKER_ERROR_RATE', 0.5)),
+    'slow_call': float(os.environ.get('GATEWAY_BREAKER_SLOW_CALL', 0.8)),
+    'open_for': float(os.environ.get('GATEWAY_BREAKER_OPEN_FOR', 5)),
+}
+
+# Latency budget of the optional sections of a page, and how long the last
+# good reply of an optional call may stand in for a failed one.
+BACKEND_OPTIONAL_BUDGET = float(os.environ.get('GATEWAY_OPTIONAL_BUDGET', 0.3))
+BACKEND_LAST_GOOD_TTL = int(os.environ.get('GATEWAY_LAST_GOOD_TTL', 3600))
+
+# Stories per page of /explore, 0 asks the stories service for all of them.
+EXPLORE_PAGE_SIZE = int(os.environ.get('GATEWAY_EXPLORE_PAGE_SIZE', 50))
+
+# In memory index of the stories by day answering the /explore date filter:
+# stories published since the newest indexed day are merged in every
+# `refresh` seconds, the whole index is loaded again every `rebuild` seconds
+# in pages of `page size` stories. A failed load is tried again after
+# `retry` seconds, doubled after each further failure.
+STORY_INDEX = os.environ.get('GATEWAY_STORY_INDEX', '1') == '1'
+STORY_INDEX_REFRESH = int(os.environ.get('GATEWAY_STORY_INDEX_REFRESH', 10))
+STORY_INDEX_REBUILD = int(os.environ.get('GATEWAY_STORY_INDEX_REBUILD', 300))
+STORY_INDEX_PAGE_SIZE = int(os.environ.get('GATEWAY_STORY_INDEX_PAGE_SIZE', 1000))
+STORY_INDEX_RETRY = float(os.environ.get('GATEWAY_STORY_INDEX_RETRY', 1))
+
+# Rendered story list items and dice strips kept for reuse across pages.
+TEMPLATE_FRAGMENT_CACHE_SIZE = int(os.environ.get('GATEWAY_FRAGMENT_CACHE_SIZE', 10000))
+
+# Fingerprinted static images built by `python -m gateway.static_assets`,
+# served for `ASSETS_MAX_AGE` seconds as immutable.
+ASSETS_DIR = os.environ.get('GATEWAY_ASSETS_DIR', os.path.join(os.path.dirname(__file__), 'assets'))
+ASSETS_MAX_AGE = int(os.environ.get('GATEWAY_ASSETS_MAX_AGE', 31536000))
+
+# Dice strips, one image per roll outcome, made on demand from the sprites
+# and kept on disk up to `DICE_STRIPS_MAX_FILES` files. Strips of more than
+# `DICE_STRIPS_MAX_CELLS` dice, the largest dice number of a story, are 404s.
+DICE_STRIPS_DIR = os.environ.get('GATEWAY_DICE_STRIPS_DIR', '/tmp/gateway-dice')
+DICE_STRIPS_MAX_FILES = int(os.environ.get('GATEWAY_DICE_STRIPS_MAX_FILES', 10000))
+DICE_STRIPS_MAX_CELLS = int(os.environ.get('GATEWAY_DICE_STRIPS_MAX_CELLS', 6))
+
+# Token bucket limits of the write and reaction routes: `rate` requests per
+# second in bursts of up to `burst`, per 'user' (per address when anonymous),
+# 'ip' or 'global'. Over a limit the gateway answers 429 with Retry-After.
+# Buckets live in this process ('memory', at most RATE_LIMIT_SIZE of them)
+# or in redis ('redis' at RATE_LIMIT_URL) to be shared by every worker.
+# GATEWAY_RATE_LIMITS=0 turns the limits off.
+RATE_LIMIT_STORE = os.environ.get('GATEWAY_RATE_LIMIT_STORE', 'memory')
+RATE_LIMIT_URL = os.environ.get('GATEWAY_RATE_LIMIT_URL', 'redis://localhost:6379/0')
+RATE_LIMIT_SIZE = int(os.environ.get('GATEWAY_RATE_LIMIT_SIZE', 100000))
+_WRITES = [{'per': 'user', 'rate': 1, 'burst': 10, 'methods': ('POST',)},
+           {'per': 'global', 'rate': 200, 'burst': 400, 'methods': ('POST',)}]
+_REACTIONS = [{'per': 'user', 'rate': 2, 'burst': 20},
+              {'per': 'global', 'rate': 500, 'burst': 1000}]
+_CREDENTIALS = [{'per': 'ip', 'rate': 0.2, 'burst': 10, 'methods': ('POST',)}]
+RATE_LIMITS = {} if os.environ.get('GATEWAY_RATE_LIMITS', '1') != '1' else {
+    '/stories/new_story': _WRITES,
+    '/write_story/<story_id>': _WRITES,
+    '/story/<int:story_id>/like': _REACTIONS,
+    '/story/<int:story_id>/dislike': _REACTIONS,
+    '/story/<int:story_id>/remove_like': _REACTIONS,
+    '/story/<int:story_id>/remove_dislike': _REACTIONS,
+    '/wall/<int:author_id>/follow': _REACTIONS,
+    '/wall/<int:author_id>/unfollow': _REACTIONS,
+    # Per batch; each reaction in it also counts against its own page.
+    '/api/batch': _REACTIONS,
+    '/signup': _CREDENTIALS,
+    '/login': _CREDENTIALS,
+}
+
+# Failed logins tracked per email and per address: past the thresholds the
+# gateway refuses logins itself for `base_delay` seconds, doubled on each
+# further failure up to `max_delay`. Email and password pairs refused by the
+# auth service are refused again without it for `negative_ttl` seconds.
+LOGIN_THROTTLE = {
+    'email_threshold': int(os.environ.get('GATEWAY_LOGIN_EMAIL_THRESHOLD', 5)),
+    'ip_threshold': int(os.environ.get('GATEWAY_LOGIN_IP_THRESHOLD', 20)),
+    'base_delay': 1,
+    'max_delay': 900,
+    'forget_after': 900,
+    'negative_ttl': 300,
+    'max_size': 100000,
+}
+
+# Admission control: requests of each class of routes run at most `limit` at
+# a time, a limit raised while they are answered within `target` seconds and
+# cut by `backoff` when they are not. All classes together are limited to
+# `share` of ADMISSION['max_inflight'], so heavy pages are shed before logins.
+# Requests over a limit get a 503 at once. Routes not listed in
+# ADMISSION_ROUTES are 'reads', or 'writes' for POST, PUT and DELETE; those
+# listed with None are never shed. The starting limit of each class is a
+# part of max_inflight unless GATEWAY_ADMISSION_<CLASS>_LIMIT sets it.
+# GATEWAY_ADMISSION=0 turns admission control off.
+ADMISSION_ENABLED = os.environ.get('GATEWAY_ADMISSION', '1') == '1'
+_MAX_INFLIGHT = int(os.environ.get('GATEWAY_MAX_INFLIGHT', 200))
+ADMISSION = {
+    'max_inflight': _MAX_INFLIGHT,
+    'target': float(os.environ.get('GATEWAY_ADMISSION_TARGET', 1)),
+    'backoff': 0.9,
+    'min_limit': 2,
+    'classes': {
+        'auth': {'limit': int(os.environ.get('GATEWAY_ADMISSION_AUTH_LIMIT', _MAX_INFLIGHT // 4)),
+                 'share': 1.0},
+        'writes': {'limit': int(os.environ.get('GATEWAY_ADMISSION_WRITES_LIMIT', _MAX_INFLIGHT // 4)),
+                   'share': 0.9},
+        'reads': {'limit': int(os.environ.get('GATEWAY_ADMISSION_READS_LIMIT', _MAX_INFLIGHT // 2)),
+                  'share': 0.9},
+        'heavy': {'limit': int(os.environ.get('GATEWAY_ADMISSION_HEAVY_LIMIT', _MAX_INFLIGHT // 10)),
+                  'share': 0.5, 'target': 2},
+    },
+}
+ADMISSION_ROUTES = {
+    '/login': 'auth',
+    '/logout': 'auth',
+    '/signup': 'auth',
+    '/explore': 'heavy',
+    '/users': 'heavy',
+    # Strips not built yet are drawn on the request.
+    '/dice/<theme>/<version>/<cells>.<kind>': 'heavy',
+    '/api/batch': 'reads',
+    '/story/<int:story_id>/like': 'writes',
+    '/story/<int:story_id>/dislike': 'writes',
+    '/story/<int:story_id>/remove_like': 'writes',
+    '/story/<int:story_id>/remove_dislike': 'writes',
+    '/story/<story_id>/delete': 'writes',
+    '/wall/<int:author_id>/follow': 'writes',
+    '/wall/<int:author_id>/unfollow': 'writes',
+    '/static/<path:filename>': None,
+    '/assets/<path:filename>': None,
+    '/metrics': None,
+    '/metrics/json': None,
+}
+
+# Requests slower than this many seconds are logged with the time spent in
+# each backend call, 0 disables the log.
+SLOW_REQUEST = float(os.environ.get('GATEWAY_SLOW_REQUEST', 1))
@@ -0,0 +1,154 @@
+"""
+Build step of the static images: every image of gateway/static is copied to
+the assets directory under a name holding a hash of its content, so that it
+can be cached forever, next to a WebP variant and a sprite sheet of the dice
+faces of each theme. A manifest maps the original paths to the built ones.
+
+    python -m gateway.static_assets [--static DIR] [--out DIR]
+
+Optimised PNGs, WebP variants and sprites need the optional Pillow package,
+without it the images are only fingerprinted.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+from urllib.parse import quote
+
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), 'static')
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), 'assets')
+MANIFEST = 'manifest.json'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+# Faces are shown 100px high, sprite cells are twice that for dense screens.
+SPRITE_CELL = 200
+
+
+def _fingerprinted(path, data):
+    stem, extension = os.path.splitext(path)
+    return stem + '.' + hashlib.sha256(data).hexdigest()[:12] + extension
+
+
+def _write(out, path, data):
+    target = os.path.join(out, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def _encode(image, kind, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, kind, **options)
+    return buffer.getvalue()
+
+
+def _sprite(Image, out, theme, faces):
+    """
+    All the faces of `theme` side by side, each in a square cell.
+    """
+    sheet = Image.new('RGBA', (SPRITE_CELL * len(faces), SPRITE_CELL))
+    cells = {}
+    for index, (path, image) in enumerate(faces):
+        image = image.convert('RGBA')
+        image.thumbnail((SPRITE_CELL, SPRITE_CELL))
+        sheet.paste(image, (index * SPRITE_CELL + (SPRITE_CELL - image.width) // 2,
+                            (SPRITE_CELL - image.height) // 2))
+        cells[path] = index
+    data = _encode(sheet, 'PNG', optimize=True)
+    return {
+        'url': _write(out, _fingerprinted(theme + '/sprite.png', data), data),
+        'cell': SPRITE_CELL,
+        'faces': cells,
+    }
+
+
+def build(static=STATIC_DIR, out=ASSETS_DIR):
+    """
+    Build the assets of `static` into `out` and return the manifest.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+
+    files = {}
+    themes = {}
+    for root, _, names in sorted(os.walk(static)):
+        for name in sorted(names):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.relpath(os.path.join(root, name), static).replace(os.sep, '/')
+            with open(os.path.join(root, name), 'rb') as f:
+                data = f.read()
+            entry = {}
+            if Image is not None:
+                image = Image.open(io.BytesIO(data))
+                image.load()
+                optimized = _encode(image, 'PNG', optimize=True)
+                if len(optimized) < len(data):
+                    data = optimized
+                webp = _encode(image, 'WEBP', quality=85, method=6)
+                entry['webp'] = _write(out, _fingerprinted(os.path.splitext(path)[0] + '.webp', webp), webp)
+                if '/' in path:
+                    themes.setdefault(path.split('/')[0], []).append((path, image))
+            entry['url'] = _write(out, _fingerprinted(path, data), data)
+            files[path] = entry
+
+    manifest = {
+        'files': files,
+        'sprites': {theme: _sprite(Image, out, theme, faces) for theme, faces in themes.items()},
+    }
+    with open(os.path.join(out, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+class StaticAssets:
+    """
+    Resolves the path of a static image to the url of its built version, or
+    to the plain static url when the assets were not built.
+    """
+    def __init__(self, directory=ASSETS_DIR, url_prefix='/assets/'):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        self.files = manifest.get('files', {})
+        self.sprites = manifest.get('sprites', {})
+
+    @staticmethod
+    def key(path):
+        # Faces are stored by the stories service as 'static/<theme>/<face>'.
+        path = path.lstrip('/')
+        return path[len('static/'):] if path.startswith('static/') else path
+
+    def url(self, path, variant='url'):
+        """
+        The url of `path`, or of its `variant` ('webp'); None if there is no
+        such variant.
+        """
+        entry = self.files.get(self.key(path))
+        if entry is None:
+            return '/static/' + quote(self.key(path)) if variant == 'url' else None
+        built = entry.get(variant)
+        return None if built is None else self.url_prefix + quote(built)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--static', default=STATIC_DIR)
+    parser.add_argument('--out', default=ASSETS_DIR)
+    args = parser.parse_args()
+    manifest = build(args.static, args.out)
+    print('%d images, %d webp variants, %d sprites in %s' %
+          (len(manifest['files']), sum('webp' in entry for entry in manifest['files'].values()),
+           len(manifest['sprites']), args.out))
+
+
+if __name__ == '__main__':
+    main()
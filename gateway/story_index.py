@@ -0,0 +1,176 @@
+import datetime
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+
+
+SUMMARY_FIELDS = ('id', 'title', 'text', 'author_id', 'author_name', 'likes', 'dislikes', 'date')
+
+
+def story_day(date):
+    """
+    The day of a story date, as an iso string that sorts by time. The
+    stories service sends either iso dates or http dates.
+    """
+    try:
+        return datetime.date.fromisoformat(date[:10]).isoformat()
+    except ValueError:
+        return parsedate_to_datetime(date).date().isoformat()
+
+
+class StoryIndex:
+    """
+    Summaries of all the published stories, sorted by day, so that the date
+    filter of /explore is answered with two binary searches instead of a
+    call to the stories service.
+
+    The index is loaded in the background, a page of `page_size` stories at
+    a time; until then `between` returns None and the caller asks the
+    stories service. Every `refresh` seconds the stories published since
+    the newest indexed day are fetched again and merged in; every `rebuild`
+    seconds the whole index is loaded again, which also picks up deleted
+    stories and reaction counts. After a failed load the next one waits
+    `retry` seconds, twice as long after each further failure, up to
+    `rebuild`. Writers of this gateway call `discard` so that their own
+    deletions are seen at once.
+    """
+    def __init__(self, client, refresh=10, rebuild=300, page_size=1000, retry=1):
+        self.client = client
+        self.refresh = refresh
+        self.rebuild = rebuild
+        self.page_size = page_size
+        self.retry = retry
+        self.loads = 0
+        self.merges = 0
+        self.failures = 0
+        # (day, id) keys and the summaries in the same order, replaced as a
+        # whole so that readers never need the lock.
+        self._snapshot = ([], [])
+        self._days = {}
+        self._rebuilt_at = None
+        self._due = 0
+        self._backoff = retry
+        self._loading = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, client, config):
+        return cls(client, config.get('STORY_INDEX_REFRESH', 10), config.get('STORY_INDEX_REBUILD', 300),
+                   config.get('STORY_INDEX_PAGE_SIZE', 1000), config.get('STORY_INDEX_RETRY', 1))
+
+    def between(self, start=None, end=None):
+        """
+        Summaries of the stories published from day `start` to day `end`
+        included, newest first, or None while the index is not loaded.
+        Either bound may be None.
+        """
+        if not self._ready():
+            return None
+        keys, summaries = self._snapshot
+        low = 0 if start is None else bisect_left(keys, (start,))
+        high = len(keys) if end is None else bisect_right(keys, (end, float('inf')))
+        return summaries[low:high][::-1]
+
+    def discard(self, story_id):
+        with self._lock:
+            day = self._days.pop(story_id, None)
+            if day is None:
+                return
+            keys, summaries = list(self._snapshot[0]), list(self._snapshot[1])
+            position = bisect_left(keys, (day, story_id))
+            del keys[position], summaries[position]
+            self._snapshot = (keys, summaries)
+
+    def __len__(self):
+        return len(self._snapshot[0])
+
+    def _ready(self):
+        now = time.monotonic()
+        if now >= self._due:
+            with self._lock:
+                start = not self._loading and now >= self._due
+                if start:
+                    self._loading = True
+                    full = self._rebuilt_at is None or now - self._rebuilt_at >= self.rebuild
+            if start:
+                self.client.submit(self._background_load, full)
+        return self._rebuilt_at is not None
+
+    def _background_load(self, full):
+        try:
+            loaded = self._load(full)
+        except Exception:
+            loaded = False
+        with self._lock:
+            if loaded:
+                self._due = time.monotonic() + self.refresh
+                self._backoff = self.retry
+            else:
+                self.failures += 1
+                self._due = time.monotonic() + self._backoff
+                self._backoff = min(self._backoff * 2, self.rebuild)
+            self._loading = False
+
+    def _load(self, full):
+        if full:
+            stories = self._fetch_all()
+        else:
+            r = self.client.get('stories', '/stories?' + urlencode({
+                'start': self._snapshot[0][-1][0] if self._snapshot[0] else str(datetime.date.min),
+                'end': str(datetime.date.max)}))
+            stories = r.json()['stories'] if r.status_code == 200 else None
+        if stories is None:
+            return False
+
+        stories = [{field: story.get(field) for field in SUMMARY_FIELDS} for story in stories]
+        with self._lock:
+            if full:
+                self._replace(stories)
+                self._rebuilt_at = time.monotonic()
+                self.loads += 1
+            else:
+                self._merge(stories)
+                self.merges += 1
+        return True
+
+    def _fetch_all(self):
+        """
+        All the stories, a page at a time, or None if a page failed.
+        """
+        stories, cursor = [], None
+        while True:
+            page = {'limit': self.page_size}
+            if cursor is not None:
+                page['cursor'] = cursor
+            r = self.client.get('stories', '/stories?' + urlencode(page))
+            if r.status_code != 200:
+                return None
+            body = r.json()
+            stories.extend(body['stories'])
+            cursor = body.get('next_cursor')
+            if cursor is None:
+                return stories
+
+    def _replace(self, stories):
+        # A story may be read twice if others were published between pages.
+        unique = {story['id']: story for story in stories}
+        entries = sorted((((story_day(story['date']), story['id']), story) for story in unique.values()),
+                         key=lambda entry: entry[0])
+        self._snapshot = ([key for key, _ in entries], [story for _, story in entries])
+        self._days = {key[1]: key[0] for key, _ in entries}
+
+    def _merge(self, stories):
+        keys, summaries = list(self._snapshot[0]), list(self._snapshot[1])
+        for story in stories:
+            day = self._days.get(story['id'])
+            if day is not None:
+                position = bisect_left(keys, (day, story['id']))
+                del keys[position], summaries[position]
+            key = (story_day(story['date']), story['id'])
+            position = bisect_left(keys, key)
+            keys.insert(position, key)
+            summaries.insert(position, story)
+            self._days[story['id']] = key[0]
+        self._snapshot = (keys, summaries)
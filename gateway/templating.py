@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, before_render_template, g, stream_with_context, template_rendered
+from flask import current_app as app
+from markupsafe import Markup
+
+from gateway.backend.histogram import Histogram
+
+
+class FragmentCache:
+    """
+    Rendered pieces of pages, keyed by what they show so that a changed
+    piece gets a new key instead of being invalidated. At most `max_size`
+    fragments are kept, the least recently used go first.
+    """
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+    def put(self, key, fragment):
+        with self._lock:
+            self._fragments[key] = fragment
+            while len(self._fragments) > self.max_size:
+                self._fragments.popitem(last=False)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._fragments),
+            'max_size': self.max_size,
+        }
+
+
+class RenderStats:
+    """
+    How many times each template was rendered and how long it took.
+    """
+    def __init__(self):
+        self.histogram = Histogram('gateway_template_render_seconds', 'Template renders.', ('template',))
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed):
+        self.histogram.observe(elapsed, name)
+        with self._lock:
+            count, total, slowest = self._templates.get(name, (0, 0.0, 0.0))
+            self._templates[name] = (count + 1, total + elapsed, max(slowest, elapsed))
+
+    def stats(self):
+        with self._lock:
+            return {name: {'count': count, 'total': total, 'mean': total / count, 'max': slowest}
+                    for name, (count, total, slowest) in self._templates.items()}
+
+
+def _fragment(template_name, key, **context):
+    key = (template_name,) + key
+    fragment = app.fragments.get(key)
+    if fragment is None:
+        fragment = Markup(app.jinja_env.get_template(template_name).render(**context))
+        app.fragments.put(key, fragment)
+    return fragment
+
+
+def story_item(story, wall=False):
+    """
+    A story of a list, rendered once for each number of likes and dislikes.
+    Walls show the date of the story instead of its author.
+    """
+    template_name = 'fragments/wall_story_item.html' if wall else 'fragments/story_item.html'
+    return _fragment(template_name, (story['id'], story['likes'], story['dislikes']), story=story)
+
+
+def dice_strip(faces):
+    """
+    The faces of the rolled dice, rendered once for each outcome: a single
+    image when the strip of the outcome can be made, one image per face
+    otherwise.
+    """
+    return _fragment('fragments/dice_strip.html', tuple(tuple(face) for face in faces), faces=faces,
+                     strip=app.dice_strips.url(faces), strip_webp=app.dice_strips.url(faces, 'webp'))
+
+
+def face_url(path, webp=False):
+    """
+    The url of a static image, as named in the rolls outcome of a story;
+    None when the WebP variant is asked and was not built.
+    """
+    return app.assets.url(path, 'webp' if webp else 'url')
+
+
+def _render_started(sender, template, context, **extra):
+    g.setdefault('render_started', []).append(time.perf_counter())
+
+
+def _render_finished(sender, template, context, **extra):
+    sender.render_stats.record(template.name, time.perf_counter() - g.render_started.pop())
+
+
+def init_templating(app):
+    """
+    Compile every template now rather than on its first request, add the
+    fragment helpers to them and time their rendering.
+    """
+    app.fragments = FragmentCache(app.config.get('TEMPLATE_FRAGMENT_CACHE_SIZE', 10000))
+    app.render_stats = RenderStats()
+    app.jinja_env.globals.update(story_item=story_item, dice_strip=dice_strip, face_url=face_url)
+    for template_name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(template_name)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+
+
+def stream_template(template_name, buffer_size=20, **context):
+    """
+    Like render_template, but the page is sent to the client while it is
+    being rendered, in chunks of `buffer_size` template events. The render
+    signals are sent when the stream starts and ends.
+    """
+    app.update_template_context(context)
+    template = app.jinja_env.get_or_select_template(template_name)
+    stream = template.stream(context)
+    stream.enable_buffering(buffer_size)
+    sender = app._get_current_object()
+
+    def signalled():
+        # The signals of render_template, so that the render is timed and
+        # seen by the listeners the same.
+        before_render_template.send(sender, template=template, context=context)
+        yield from stream
+        template_rendered.send(sender, template=template, context=context)
+
+    return Response(stream_with_context(signalled()), mimetype='text/html')
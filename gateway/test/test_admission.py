@@ -0,0 +1,86 @@
+import time
+import unittest
+
+from gateway.admission import AdaptiveLimit, AdmissionController
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestAdaptiveLimit(unittest.TestCase):
+
+    def test_additive_increase(self):
+        limit = AdaptiveLimit(limit=10, target=1)
+        limit.inflight = 6
+        for _ in range(10):
+            limit.update(0.1, True)
+        self.assertAlmostEqual(limit.limit, 11, places=0)
+        # Not raised while mostly unused.
+        limit.inflight = 0
+        limit.update(0.1, True)
+        self.assertAlmostEqual(limit.limit, 11, places=0)
+
+    def test_multiplicative_decrease(self):
+        limit = AdaptiveLimit(limit=10, min_limit=8, target=0.05, backoff=0.5)
+        limit.update(0.1, True)
+        self.assertEqual(limit.limit, 8)
+        time.sleep(0.05)
+        limit.update(0.01, False)
+        self.assertEqual(limit.limit, 8)
+
+    def test_one_decrease_per_target(self):
+        limit = AdaptiveLimit(limit=100, target=10, backoff=0.5)
+        for _ in range(5):
+            limit.update(11, True)
+        self.assertEqual(limit.limit, 50)
+
+
+class TestAdmissionController(unittest.TestCase):
+
+    def test_shares(self):
+        controller = AdmissionController({'auth': {'limit': 10, 'share': 1.0},
+                                          'heavy': {'limit': 10, 'share': 0.5}}, max_inflight=4)
+        self.assertTrue(controller.acquire('heavy'))
+        self.assertTrue(controller.acquire('heavy'))
+        self.assertFalse(controller.acquire('heavy'))
+        self.assertTrue(controller.acquire('auth'))
+        self.assertTrue(controller.acquire('auth'))
+        self.assertFalse(controller.acquire('auth'))
+        controller.release('heavy', 0.1, True)
+        self.assertTrue(controller.acquire('auth'))
+        self.assertEqual(controller.stats()['heavy']['shed'], 1)
+        self.assertEqual(controller.stats()['auth']['inflight'], 3)
+
+    def test_class_of(self):
+        controller = AdmissionController({}, routes={'/login': 'auth', '/metrics': None})
+        self.assertEqual(controller.class_of('/login', 'POST'), 'auth')
+        self.assertIsNone(controller.class_of('/metrics', 'GET'))
+        self.assertEqual(controller.class_of('/story/<int:story_id>', 'GET'), 'reads')
+        self.assertEqual(controller.class_of('/stories/new_story', 'POST'), 'writes')
+
+
+class TestShedding(StubTestCase):
+
+    def test_heavy_pages_are_shed_first(self):
+        app = self.gateway()
+        client = self.logged(app)
+        self.assertEqual(client.get('/explore').status_code, 200)
+        self.assertEqual(app.admission.stats()['heavy']['inflight'], 0)
+        self.assertEqual(app.admission.class_of('/dice/<theme>/<version>/<cells>.<kind>', 'GET'), 'heavy')
+
+        heavy = app.admission.classes['heavy']
+        heavy.inflight = int(heavy.limit)
+        hits = self.cluster.hits('stories')
+        reply = client.get('/explore')
+        self.assertEqual(reply.status_code, 503)
+        self.assertEqual(reply.headers['Retry-After'], '1')
+        self.assertIn(b'TOO BUSY', reply.data)
+        self.assertEqual(self.cluster.hits('stories'), hits)
+        self.assertEqual(client.get('/story/1').status_code, 200)
+        self.assertEqual(client.get('/logout').status_code, 302)
+        self.assertIn(b'gateway_shed_total{class="heavy"} 1', client.get('/metrics').data)
+
+    def test_admission_off(self):
+        app = self.gateway(ADMISSION_ENABLED=False)
+        client = self.logged(app)
+        heavy = app.admission.classes['heavy']
+        heavy.inflight = int(heavy.limit)
+        self.assertEqual(client.get('/explore').status_code, 200)
@@ -0,0 +1,29 @@
+import unittest
+
+import requests
+
+from gateway.bench.modes import summary
+from gateway.bench.stubs import StubCluster
+
+
+class TestStubs(unittest.TestCase):
+
+    def test_error_rate_and_text_size(self):
+        with StubCluster(services=('stories',), error_rate=0.5, text_size=1000, seed=1) as cluster:
+            statuses = [requests.get(cluster.urls['stories'] + '/story/1/1').status_code for _ in range(40)]
+            self.assertTrue(10 < statuses.count(500) < 30)
+            cluster.apps['stories'].settings['error_rate'] = 0
+            story = requests.get(cluster.urls['stories'] + '/story/1/1').json()
+            self.assertGreaterEqual(len(story['text']), 990)
+
+
+class TestSummary(unittest.TestCase):
+
+    def test_percentiles(self):
+        result = summary([i / 1000 for i in range(100, 0, -1)], 3, 2)
+        self.assertEqual(result['rps'], 50)
+        self.assertEqual(result['errors'], 3)
+        self.assertAlmostEqual(result['p50_ms'], 50)
+        self.assertAlmostEqual(result['p95_ms'], 95)
+        self.assertAlmostEqual(result['p99_ms'], 99)
+        self.assertEqual(summary([], 1, 1)['p99_ms'], 0)
@@ -0,0 +1,121 @@
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+
+from gateway.app import create_app
+from gateway.dice_strips import DiceStrips
+from gateway.static_assets import STATIC_DIR, StaticAssets, build
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+FACES = [['bag', 'static/Mountain/bag.PNG'], ['bird', 'static/Mountain/bird.PNG'], ['bag', 'static/Mountain/bag.PNG']]
+
+
+class FullDisk:
+    """
+    Images that can be drawn but not saved.
+    """
+    @staticmethod
+    def new(mode, size):
+        image = Image.new(mode, size)
+        image.save = FullDisk.save
+        return image
+
+    @staticmethod
+    def open(path):
+        return Image.open(path)
+
+    @staticmethod
+    def save(f, *args, **kwargs):
+        f.write(b'half a strip')
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+
+@unittest.skipIf(Image is None, 'dice strips need Pillow')
+class TestDiceStrips(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.static = tempfile.mkdtemp()
+        cls.built = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(STATIC_DIR, 'Mountain'), os.path.join(cls.static, 'Mountain'))
+        build(cls.static, cls.built)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.static)
+        shutil.rmtree(cls.built)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.strips = DiceStrips(StaticAssets(self.built), self.directory, max_files=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_made_once(self):
+        url = self.strips.url(FACES)
+        self.assertRegex(url, r'^/dice/Mountain/[0-9a-f]{12}/\d+-\d+-\d+\.png$')
+        theme, version, name = url.split('/')[2:]
+        cells, kind = name.split('.')
+        path = self.strips.path(theme, version, cells, kind)
+        self.assertEqual(Image.open(path).size, (600, 200))
+        self.assertEqual(self.strips.path(theme, version, cells, kind), path)
+        self.assertEqual(self.strips.made, 1)
+
+    def test_unknown(self):
+        self.assertIsNone(self.strips.url([['cat', 'static/Youth/cat.PNG']]))
+        self.assertIsNone(self.strips.url([]))
+        version = self.strips.url(FACES).split('/')[3]
+        self.assertIsNone(self.strips.path('Mountain', 'old', '0-1', 'png'))
+        self.assertIsNone(self.strips.path('Mountain', version, '0-999', 'png'))
+        self.assertIsNone(self.strips.path('Mountain', version, 'a-b', 'png'))
+        self.assertIsNone(self.strips.path('Mountain', version, '0-1', 'gif'))
+
+    def test_too_many_dice(self):
+        self.assertIsNone(self.strips.url(FACES * 3))
+        version = self.strips.url(FACES).split('/')[3]
+        self.assertIsNone(self.strips.path('Mountain', version, '-'.join(['0'] * 7), 'png'))
+        self.assertIsNone(self.strips.path('Mountain', version, '-'.join(['0'] * 1000), 'png'))
+        self.assertIsNotNone(self.strips.path('Mountain', version, '-'.join(['0'] * 6), 'png'))
+
+    def test_failed_strip_leaves_no_file(self):
+        version = self.strips.url(FACES).split('/')[3]
+        self.strips._image = FullDisk
+        with self.assertRaises(OSError):
+            self.strips.path('Mountain', version, '0', 'png')
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'Mountain', version)), [])
+        self.assertEqual(self.strips.made, 0)
+
+    def test_lru_eviction(self):
+        version = self.strips.url(FACES).split('/')[3]
+        for cell in range(12):
+            self.strips.path('Mountain', version, str(cell), 'png')
+        self.strips.path('Mountain', version, '0', 'png')
+        self.strips.path('Mountain', version, '12', 'png')
+        files = os.listdir(os.path.join(self.directory, 'Mountain', version))
+        self.assertLessEqual(len(files), 10)
+        self.assertIn('0.png', files)
+        self.assertIn('12.png', files)
+        self.assertNotIn('1.png', files)
+        self.assertGreater(self.strips.evicted, 0)
+
+    def test_story_page(self):
+        app = create_app(test=True, config={'ASSETS_DIR': self.built, 'DICE_STRIPS_DIR': self.directory})
+        with app.test_request_context():
+            strip = app.jinja_env.globals['dice_strip'](FACES)
+        url = app.dice_strips.url(FACES)
+        self.assertIn(url, strip)
+        self.assertEqual(strip.count('<img'), 1)
+        reply = app.test_client().get(url)
+        self.assertEqual(reply.status_code, 200)
+        self.assertEqual(reply.mimetype, 'image/png')
+        self.assertIn('immutable', reply.headers['Cache-Control'])
+        self.assertEqual(app.test_client().get(url.replace('.png', '.webp')).mimetype, 'image/webp')
+        self.assertEqual(app.test_client().get(url.replace('.png', '-0' * 500 + '.png')).status_code, 404)
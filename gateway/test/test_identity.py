@@ -0,0 +1,139 @@
+import os
+import tempfile
+import time
+import unittest
+
+from gateway.classes.user import User
+from gateway.identity import CachedDenylist, Denylist, Identity, SqliteDenylist
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestIdentity(unittest.TestCase):
+
+    def test_round_trip(self):
+        identity = Identity()
+        loaded = identity.loads(identity.dumps(User(3, 'Ann', True)))
+        self.assertEqual(loaded.user_id, 3)
+        self.assertEqual(loaded.firstname, 'Ann')
+        self.assertTrue(loaded.is_admin)
+
+    def test_missing_or_malformed(self):
+        identity = Identity()
+        self.assertIsNone(identity.loads(None))
+        self.assertIsNone(identity.loads('a token of an older gateway'))
+        self.assertIsNone(identity.loads(identity.dumps(User(3, 'Ann'))[:4]))
+
+    def test_expired(self):
+        identity = Identity(max_age=-1)
+        self.assertIsNone(identity.loads(identity.dumps(User(3, 'Ann'))))
+
+    def test_revocation(self):
+        identity = Identity()
+        login = identity.dumps(User(3, 'Ann'))
+        other = identity.dumps(User(3, 'Ann'))
+        identity.revoke(login)
+        self.assertIsNone(identity.loads(login))
+        self.assertIsNotNone(identity.loads(other))
+
+
+class TestDenylist(unittest.TestCase):
+
+    def test_bounded(self):
+        denylist = Denylist(ttl=60, max_size=2)
+        for token_id in ('a', 'b', 'c'):
+            denylist.add(token_id)
+        self.assertNotIn('a', denylist)
+        self.assertIn('c', denylist)
+
+    def test_expired_are_dropped(self):
+        denylist = Denylist(ttl=0.01)
+        denylist.add('a')
+        time.sleep(0.02)
+        denylist.add('b')
+        self.assertEqual(len(denylist), 1)
+
+
+class TestSqliteDenylist(unittest.TestCase):
+
+    def test_shared_by_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'users.sqlite')
+            one, other = SqliteDenylist(path, ttl=60), SqliteDenylist(path, ttl=60)
+            one.add('a')
+            self.assertIn('a', other)
+            self.assertNotIn('b', other)
+            self.assertEqual(len(other), 1)
+
+    def test_expired(self):
+        with tempfile.TemporaryDirectory() as directory:
+            denylist = SqliteDenylist(os.path.join(directory, 'users.sqlite'), ttl=-1)
+            denylist.add('a')
+            self.assertNotIn('a', denylist)
+
+
+class TestCachedDenylist(unittest.TestCase):
+
+    def test_refreshed_from_the_shared_one(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'users.sqlite')
+            one = CachedDenylist(SqliteDenylist(path, ttl=60), refresh=0.05)
+            other = CachedDenylist(SqliteDenylist(path, ttl=60), refresh=0.05)
+            one.add('a')
+            self.assertIn('a', one)
+            self.assertNotIn('a', other)
+            for _ in range(50):
+                if 'a' in other:
+                    break
+                time.sleep(0.01)
+            self.assertIn('a', other)
+            self.assertEqual(len(other), 1)
+
+
+class TestTokenIdentity(StubTestCase):
+    services = ('auth', 'stats', 'stories')
+
+    def test_login_without_shared_store(self):
+        one, other = self.gateway(IDENTITY='token'), self.gateway(IDENTITY='token')
+        reply = one.test_client().post('/login', data={'email': 'example@example.com', 'password': 'admin'})
+        self.assertEqual(len(one.users), 0)
+
+        name, value = reply.headers['Set-Cookie'].split(';')[0].split('=', 1)
+        client = other.test_client()
+        client.set_cookie('localhost', name, value)
+        self.assertEqual(client.get('/my_wall').status_code, 200)
+
+        self.assertEqual(client.get('/logout').status_code, 302)
+        self.assertEqual(client.get('/my_wall').status_code, 401)
+        self.assertEqual(len(other.identity.denylist), 1)
+
+    def test_logout_revokes_on_every_worker(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config = {'IDENTITY': 'token', 'IDENTITY_DENYLIST': 'sqlite', 'IDENTITY_DENYLIST_REFRESH': 0.05,
+                      'IDENTITY_DENYLIST_URL': os.path.join(directory, 'users.sqlite')}
+            one, other = self.gateway(**config), self.gateway(**config)
+            client = one.test_client()
+            reply = client.post('/login', data={'email': 'example@example.com', 'password': 'admin'})
+            name, value = reply.headers['Set-Cookie'].split(';')[0].split('=', 1)
+            copied = other.test_client()
+            copied.set_cookie('localhost', name, value)
+            self.assertEqual(copied.get('/my_wall').status_code, 200)
+
+            self.assertEqual(client.get('/logout').status_code, 302)
+            # Seen by the other worker once its copy of the denylist is loaded again.
+            for _ in range(50):
+                if copied.get('/my_wall').status_code == 401:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(copied.get('/my_wall').status_code, 401)
+
+    def test_key_rotation(self):
+        old = self.gateway(IDENTITY='token', IDENTITY_KEYS=['old'])
+        reply = old.test_client().post('/login', data={'email': 'example@example.com', 'password': 'admin'})
+        name, value = reply.headers['Set-Cookie'].split(';')[0].split('=', 1)
+        for keys, status in ((['new', 'old'], 200), (['new'], 401)):
+            client = self.gateway(IDENTITY='token', IDENTITY_KEYS=keys).test_client()
+            client.set_cookie('localhost', name, value)
+            self.assertEqual(client.get('/my_wall').status_code, status)
+        client = old.test_client()
+        client.set_cookie('localhost', name, value[:-2])
+        self.assertEqual(client.get('/my_wall').status_code, 401)
@@ -0,0 +1,84 @@
+import unittest
+
+from gateway.backend.histogram import Histogram
+from gateway.backend.tracing import Trace, route_of
+from gateway.views.test.TestHelper import StubTestCase
+
+
+TRACEPARENT = '00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01'
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_expose(self):
+        histogram = Histogram('x_seconds', 'Some x.', ('service',), buckets=(0.1, 1))
+        histogram.observe(0.05, 'a')
+        histogram.observe(0.5, 'a')
+        histogram.observe(5, 'a')
+        lines = histogram.expose()
+        self.assertIn('x_seconds_bucket{service="a",le="0.1"} 1', lines)
+        self.assertIn('x_seconds_bucket{service="a",le="1"} 2', lines)
+        self.assertIn('x_seconds_bucket{service="a",le="+Inf"} 3', lines)
+        self.assertIn('x_seconds_count{service="a"} 3', lines)
+        self.assertEqual(histogram.count('a'), 3)
+
+
+class TestTracing(unittest.TestCase):
+
+    def test_route_of(self):
+        self.assertEqual(route_of('/story/12/3?x=1'), '/story/<id>/<id>')
+        self.assertEqual(route_of('/stories'), '/stories')
+
+    def test_traceparent(self):
+        trace = Trace.from_header(TRACEPARENT)
+        self.assertEqual(trace.trace_id, '4bf92f3577b34da6a3ce929d0e0e4736')
+        child = trace.child_header().split('-')
+        self.assertEqual(child[1], trace.trace_id)
+        self.assertNotEqual(child[2], '00f067aa0ba902b7')
+        for bad in (None, 'nope', '00-' + '0' * 32 + '-00f067aa0ba902b7-01'):
+            self.assertEqual(len(Trace.from_header(bad).trace_id), 32)
+
+
+class TestInstrumentation(StubTestCase):
+    services = ('auth', 'stories', 'reactions')
+
+    def setUp(self):
+        self.app = self.gateway()
+        self.client = self.logged(self.app)
+
+    def test_trace_propagated(self):
+        reply = self.client.get('/story/1/like', headers={'traceparent': TRACEPARENT})
+        self.assertEqual(reply.status_code, 200)
+        for service in ('stories', 'reactions'):
+            self.assertEqual(self.cluster.apps[service].last_traceparent.split('-')[1],
+                             '4bf92f3577b34da6a3ce929d0e0e4736')
+        timing = reply.headers['Server-Timing']
+        self.assertIn('reactions;dur=', timing)
+        self.assertIn('stories;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_deadline_propagated(self):
+        reply = self.client.get('/story/1', headers={'X-Request-Timeout-Ms': '500'})
+        self.assertEqual(reply.status_code, 200)
+        self.assertTrue(0 < int(self.cluster.apps['stories'].last_deadline) <= 500)
+        self.client.get('/story/1')
+        self.assertTrue(500 < int(self.cluster.apps['stories'].last_deadline) <= 3000)
+
+    def test_prometheus(self):
+        self.client.get('/story/1')
+        self.client.get('/story/2')
+        reply = self.client.get('/metrics')
+        self.assertEqual(reply.mimetype, 'text/plain')
+        text = reply.data.decode()
+        self.assertIn('gateway_backend_request_seconds_count{method="GET",service="stories",'
+                      'route="/story/<id>/<id>",status="200"} 2', text)
+        self.assertIn('gateway_request_seconds_count{method="GET",route="/story/<int:story_id>",status="200"} 2',
+                      text)
+        self.assertIn('gateway_template_render_seconds_count{template="story.html"} 2', text)
+        self.assertIn('gateway_breaker_open{service="stories"} 0', text)
+
+    def test_slow_request_logged(self):
+        self.app.config['SLOW_REQUEST'] = 0.000001
+        with self.assertLogs(self.app.logger, 'WARNING') as logs:
+            self.client.get('/story/1')
+        self.assertIn('stories/story/<id>/<id>:200:', logs.output[0])
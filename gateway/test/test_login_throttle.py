@@ -0,0 +1,80 @@
+import time
+import unittest
+
+from gateway.login_throttle import LoginThrottle
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestLoginThrottle(unittest.TestCase):
+
+    def test_backoff_per_email(self):
+        throttle = LoginThrottle('secret', email_threshold=2, base_delay=10)
+        throttle.failed('a@example.com', 'one', '10.0.0.1')
+        self.assertEqual(throttle.blocked('a@example.com', '10.0.0.1'), 0)
+        throttle.failed('A@example.com', 'two', '10.0.0.2')
+        self.assertAlmostEqual(throttle.blocked('a@example.com', '10.0.0.3'), 10, places=0)
+        throttle.failed('a@example.com', 'three', '10.0.0.4')
+        self.assertAlmostEqual(throttle.blocked('a@example.com', '10.0.0.3'), 20, places=0)
+        self.assertEqual(throttle.blocked('b@example.com', '10.0.0.3'), 0)
+        throttle.succeeded('a@example.com')
+        self.assertEqual(throttle.blocked('a@example.com', '10.0.0.3'), 0)
+
+    def test_backoff_per_address(self):
+        throttle = LoginThrottle('secret', ip_threshold=3, base_delay=10, max_delay=15)
+        for index in range(5):
+            throttle.failed('%d@example.com' % index, 'password', '10.0.0.1')
+        self.assertAlmostEqual(throttle.blocked('new@example.com', '10.0.0.1'), 15, places=0)
+        self.assertEqual(throttle.blocked('new@example.com', '10.0.0.2'), 0)
+
+    def test_failures_are_forgotten(self):
+        throttle = LoginThrottle('secret', email_threshold=1, forget_after=0.05)
+        throttle.failed('a@example.com', 'one', '10.0.0.1')
+        self.assertGreater(throttle.blocked('a@example.com', '10.0.0.1'), 0)
+        time.sleep(0.05)
+        self.assertEqual(throttle.blocked('a@example.com', '10.0.0.1'), 0)
+
+    def test_known_bad_pairs(self):
+        throttle = LoginThrottle('secret', negative_ttl=60, max_size=2)
+        throttle.failed('a@example.com', 'wrong', '10.0.0.1')
+        self.assertTrue(throttle.known_bad('a@example.com', 'wrong'))
+        self.assertFalse(throttle.known_bad('a@example.com', 'right'))
+        self.assertFalse(throttle.known_bad('b@example.com', 'wrong'))
+        throttle.forget('a@example.com')
+        self.assertFalse(throttle.known_bad('a@example.com', 'wrong'))
+        for email in ('a@example.com', 'b@example.com', 'c@example.com'):
+            throttle.failed(email, 'wrong', '10.0.0.1')
+        self.assertFalse(throttle.known_bad('a@example.com', 'wrong'))
+        self.assertEqual(throttle.stats()['refused_pairs'], 2)
+
+
+class TestLoginView(StubTestCase):
+    services = ('auth', 'stories', 'rank')
+
+    def setUp(self):
+        self.app = self.gateway(LOGIN_THROTTLE={'email_threshold': 3, 'base_delay': 30})
+        self.client = self.app.test_client()
+        self.hits = self.cluster.hits('auth')
+
+    def auth_hits(self):
+        return self.cluster.hits('auth') - self.hits
+
+    def login(self, password, email='example@example.com'):
+        return self.client.post('/login', data={'email': email, 'password': password})
+
+    def test_repeated_bad_password_is_refused_locally(self):
+        self.assertIn(b'User or Password not correct!', self.login('wrong-password').data)
+        self.assertEqual(self.auth_hits(), 1)
+        self.assertIn(b'User or Password not correct!', self.login('wrong-password').data)
+        self.assertEqual(self.auth_hits(), 1)
+        self.assertIn(b'User or Password not correct!', self.login('a' * 100).data)
+        self.assertEqual(self.auth_hits(), 1)
+
+    def test_throttled_after_failures(self):
+        for index in range(3):
+            self.login('wrong-password-%d' % index, 'other@example.com')
+        reply = self.login('admin', 'other@example.com')
+        self.assertEqual(reply.status_code, 429)
+        self.assertIn(b'Too many failed attempts, try again in 30 seconds.', reply.data)
+        self.assertEqual(self.auth_hits(), 3)
+        # Other accounts can still log in.
+        self.assertEqual(self.login('admin').status_code, 302)
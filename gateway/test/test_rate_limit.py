@@ -0,0 +1,73 @@
+import time
+import unittest
+
+from gateway.rate_limit import MemoryBuckets, RateLimiter
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestMemoryBuckets(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        buckets = MemoryBuckets()
+        for _ in range(3):
+            self.assertEqual(buckets.take('a', 20, 3), 0)
+        wait = buckets.take('a', 20, 3)
+        self.assertTrue(0 < wait <= 0.05)
+        self.assertEqual(buckets.take('b', 20, 3), 0)
+        time.sleep(wait)
+        self.assertEqual(buckets.take('a', 20, 3), 0)
+
+    def test_bounded(self):
+        buckets = MemoryBuckets(max_size=2)
+        for key in 'abc':
+            buckets.take(key, 1, 2)
+        self.assertEqual(len(buckets), 2)
+        # The oldest bucket was dropped: it starts full again.
+        self.assertEqual(buckets.take('a', 1, 2), 0)
+        self.assertEqual(buckets.take('a', 1, 2), 0)
+
+    def test_full_buckets_expire(self):
+        buckets = MemoryBuckets()
+        buckets.take('a', 100, 1)
+        time.sleep(0.02)
+        buckets.take('b', 100, 1)
+        self.assertEqual(len(buckets), 1)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_limits(self):
+        limiter = RateLimiter({'/like': [{'per': 'user', 'rate': 0.1, 'burst': 2},
+                                         {'per': 'global', 'rate': 0.1, 'burst': 3}],
+                               '/login': [{'per': 'ip', 'rate': 0.1, 'burst': 1, 'methods': ('POST',)}]},
+                              MemoryBuckets())
+        self.assertEqual(limiter.check('/like', 'GET', 1, '10.0.0.1'), 0)
+        self.assertEqual(limiter.check('/like', 'GET', 1, '10.0.0.1'), 0)
+        self.assertGreater(limiter.check('/like', 'GET', 1, '10.0.0.1'), 9)
+        # Another user has a bucket of their own, but shares the global one.
+        self.assertEqual(limiter.check('/like', 'GET', 2, '10.0.0.1'), 0)
+        self.assertGreater(limiter.check('/like', 'GET', 3, '10.0.0.2'), 0)
+
+        self.assertEqual(limiter.check('/login', 'POST', None, '10.0.0.1'), 0)
+        self.assertGreater(limiter.check('/login', 'POST', None, '10.0.0.1'), 0)
+        self.assertEqual(limiter.check('/login', 'GET', None, '10.0.0.1'), 0)
+        self.assertEqual(limiter.check('/login', 'POST', None, '10.0.0.2'), 0)
+        self.assertEqual(limiter.stats()['limited'], {'/like': 2, '/login': 1})
+
+
+class TestRateLimiting(StubTestCase):
+
+    def test_too_many_requests(self):
+        limits = {'/story/<int:story_id>/like': [{'per': 'user', 'rate': 0.5, 'burst': 2}]}
+        client = self.logged(self.gateway(RATE_LIMITS=limits))
+        hits = self.cluster.hits('reactions')
+        for _ in range(2):
+            self.assertEqual(client.get('/story/1/like').status_code, 200)
+        reply = client.get('/story/1/like')
+        self.assertEqual(reply.status_code, 429)
+        self.assertEqual(reply.headers['Retry-After'], '2')
+        self.assertIn(b'TOO MANY REQUESTS', reply.data)
+        self.assertEqual(self.cluster.hits('reactions') - hits, 2)
+        self.assertEqual(client.get('/story/1').status_code, 200)
+        self.assertIn(b'gateway_rate_limited_total{route="/story/<int:story_id>/like"} 1',
+                      client.get('/metrics').data)
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from gateway.app import create_app
+from gateway.static_assets import STATIC_DIR, StaticAssets, build
+
+
+class TestStaticAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.static = tempfile.mkdtemp()
+        self.out = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.static, 'Late night'))
+        for face in ('bag.PNG', 'bike.PNG'):
+            shutil.copy(os.path.join(STATIC_DIR, 'Mountain', face), os.path.join(self.static, 'Late night'))
+        shutil.copy(os.path.join(STATIC_DIR, 'background.PNG'), self.static)
+        with open(os.path.join(self.static, '.DS_Store'), 'w') as f:
+            f.write('not an image')
+
+    def tearDown(self):
+        shutil.rmtree(self.static)
+        shutil.rmtree(self.out)
+
+    def test_build(self):
+        manifest = build(self.static, self.out)
+        self.assertEqual(sorted(manifest['files']), ['Late night/bag.PNG', 'Late night/bike.PNG', 'background.PNG'])
+        for entry in manifest['files'].values():
+            self.assertRegex(entry['url'], r'\.[0-9a-f]{12}\.PNG$')
+            self.assertTrue(os.path.exists(os.path.join(self.out, entry['url'])))
+        if 'webp' in manifest['files']['background.PNG']:
+            self.assertEqual(manifest['sprites']['Late night']['faces'],
+                             {'Late night/bag.PNG': 0, 'Late night/bike.PNG': 1})
+
+    def test_urls(self):
+        build(self.static, self.out)
+        assets = StaticAssets(self.out)
+        url = assets.url('static/Late night/bag.PNG')
+        self.assertRegex(url, r'^/assets/Late%20night/bag\.[0-9a-f]{12}\.PNG$')
+        self.assertEqual(assets.url('/static/Late night/bag.PNG'), url)
+        self.assertEqual(assets.url('static/Youth/cat.PNG'), '/static/Youth/cat.PNG')
+        self.assertIsNone(assets.url('static/Youth/cat.PNG', 'webp'))
+
+    def test_not_built(self):
+        assets = StaticAssets(self.out)
+        self.assertEqual(assets.url('static/Mountain/bag.PNG'), '/static/Mountain/bag.PNG')
+
+    def test_served_immutable(self):
+        build(self.static, self.out)
+        app = create_app(test=True, config={'ASSETS_DIR': self.out})
+        client = app.test_client()
+        url = app.assets.url('background.PNG')
+        reply = client.get(url)
+        self.assertEqual(reply.status_code, 200)
+        self.assertIn('immutable', reply.headers['Cache-Control'])
+        self.assertIn('max-age=31536000', reply.headers['Cache-Control'])
+        self.assertIn(url.encode(), client.get('/login').data)
+        self.assertEqual(client.get('/assets/nope.PNG').status_code, 404)
@@ -0,0 +1,140 @@
+import time
+
+from gateway.backend import BackendClient
+from gateway.bench.stubs import StubCluster
+from gateway.story_index import StoryIndex, story_day
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestStoryIndex(StubTestCase):
+    services = ('auth', 'stories')
+    stubs = {'stories': 100}
+
+    def setUp(self):
+        self.client = BackendClient(self.cluster.urls)
+
+    def tearDown(self):
+        self.client.close()
+
+    def ids(self, stories):
+        return [story['id'] for story in stories]
+
+    def loaded(self, index):
+        """
+        `index` once its first load, made in the background, is done.
+        """
+        for _ in range(200):
+            if index.between() is not None:
+                return index
+            time.sleep(0.01)
+        self.fail('the story index was not loaded')
+
+    def test_between(self):
+        index = self.loaded(StoryIndex(self.client))
+        self.assertEqual(self.ids(index.between('2019-01-05', '2019-01-07')), [7, 6, 5])
+        self.assertEqual(self.ids(index.between(None, '2019-01-02')), [2, 1])
+        self.assertEqual(len(index.between('2019-04-01', None)), 10)
+        self.assertEqual(len(index.between()), 100)
+        self.assertEqual(index.between('2020-01-01', '2020-02-01'), [])
+
+    def test_loaded_in_the_background_by_pages(self):
+        # Stubs of its own, the other tests may still be refreshing theirs.
+        with StubCluster(services=('stories',), stories=100) as cluster:
+            client = BackendClient(cluster.urls)
+            self.addCleanup(client.close)
+            index = StoryIndex(client, page_size=30)
+            self.assertIsNone(index.between())
+            self.loaded(index)
+            self.assertEqual(len(index), 100)
+            self.assertEqual(cluster.hits('stories'), 4)
+            self.assertEqual(index.loads, 1)
+
+    def test_single_load_then_no_calls(self):
+        index = self.loaded(StoryIndex(self.client))
+        hits = self.cluster.hits('stories')
+        for _ in range(100):
+            index.between('2019-01-05', '2019-03-07')
+        self.assertEqual(self.cluster.hits('stories'), hits)
+        self.assertEqual(index.loads, 1)
+
+    def test_incremental_refresh(self):
+        index = self.loaded(StoryIndex(self.client, refresh=0))
+        self.cluster.apps['stories'].settings['stories'] = 102
+        self.addCleanup(self.cluster.apps['stories'].settings.update, stories=100)
+        index.between()
+        for _ in range(50):
+            if len(index) == 102:
+                break
+            time.sleep(0.01)
+        self.assertEqual(index.merges, 1)
+        self.assertEqual(index.loads, 1)
+        self.assertEqual(self.ids(index.between('2019-04-10', None)), [102, 101, 100])
+
+    def test_discard(self):
+        index = self.loaded(StoryIndex(self.client))
+        index.discard(6)
+        index.discard(1000)
+        self.assertEqual(self.ids(index.between('2019-01-05', '2019-01-07')), [7, 5])
+
+    def test_unavailable(self):
+        client = BackendClient({'stories': 'http://127.0.0.1:1'})
+        self.addCleanup(client.close)
+        index = StoryIndex(client, retry=0.2)
+        self.assertIsNone(index.between())
+        for _ in range(100):
+            if index.failures:
+                break
+            time.sleep(0.01)
+        # Backing off: no other attempt for a while, however many requests.
+        for _ in range(100):
+            self.assertIsNone(index.between())
+        self.assertEqual(index.failures, 1)
+        time.sleep(0.25)
+        index.between()
+        for _ in range(100):
+            if index.failures == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(index.failures, 2)
+
+    def test_story_day(self):
+        self.assertEqual(story_day('2019-11-01'), '2019-11-01')
+        self.assertEqual(story_day('2019-11-01T10:00:00'), '2019-11-01')
+        self.assertEqual(story_day('Fri, 01 Nov 2019 10:00:00 GMT'), '2019-11-01')
+
+    def test_explore_filter(self):
+        app = self.gateway()
+        self.loaded(app.story_index)
+        client = self.logged(app)
+        reply = client.post('/explore', data={'beginDate': '2019-01-05', 'endDate': '2019-01-06'})
+        self.assertEqual(reply.status_code, 200)
+        self.assertIn(b'Story 5<', reply.data)
+        self.assertIn(b'Story 6<', reply.data)
+        self.assertNotIn(b'Story 7<', reply.data)
+        hits = self.cluster.hits('stories')
+        client.post('/explore', data={'beginDate': '', 'endDate': '2019-01-06'})
+        self.assertEqual(self.cluster.hits('stories'), hits)
+
+    def test_deleted_story_leaves_the_filter(self):
+        app = self.gateway()
+        self.loaded(app.story_index)
+        client = self.logged(app)
+        dates = {'beginDate': '2019-01-05', 'endDate': '2019-01-06'}
+        self.assertIn(b'Story 6<', client.post('/explore', data=dates).data)
+        indexed = len(app.story_index)
+        self.assertEqual(client.get('/story/6/delete').status_code, 200)
+        self.assertEqual(len(app.story_index), indexed - 1)
+        reply = client.post('/explore', data=dates)
+        self.assertIn(b'Story 5<', reply.data)
+        self.assertNotIn(b'Story 6<', reply.data)
+
+    def test_explore_filter_before_the_index(self):
+        app = self.gateway(STORY_INDEX_RETRY=60)
+        client = self.logged(app)
+        services = dict(self.cluster.urls, stories='http://127.0.0.1:1')
+        app.story_index.client = BackendClient(services)
+        self.addCleanup(app.story_index.client.close)
+        reply = client.post('/explore', data={'beginDate': '2019-01-05', 'endDate': '2019-01-06'})
+        self.assertEqual(reply.status_code, 200)
+        self.assertIn(b'Story 5<', reply.data)
+        self.assertEqual(len(app.story_index), 0)
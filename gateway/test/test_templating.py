@@ -0,0 +1,63 @@
+import unittest
+
+from gateway.bench.stubs import make_story
+from gateway.templating import FragmentCache, story_item
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def test_lru(self):
+        fragments = FragmentCache(max_size=2)
+        fragments.put('a', 'A')
+        fragments.put('b', 'B')
+        fragments.get('a')
+        fragments.put('c', 'C')
+        self.assertEqual(fragments.get('a'), 'A')
+        self.assertIsNone(fragments.get('b'))
+        self.assertEqual(fragments.stats()['size'], 2)
+
+
+class TestTemplating(StubTestCase):
+    services = ('auth', 'stories')
+    stubs = {'stories': 20}
+
+    def setUp(self):
+        self.app = self.gateway(BACKEND_CACHE_TTLS={})
+        self.client = self.logged(self.app)
+
+    def test_precompiled(self):
+        cached = [key[1] for key in self.app.jinja_env.cache.keys()]
+        self.assertIn('explore.html', cached)
+        self.assertIn('fragments/story_item.html', cached)
+
+    def test_fragments_reused(self):
+        first = self.client.get('/explore').data
+        misses = self.app.fragments.misses
+        second = self.client.get('/explore').data
+        self.assertEqual(first, second)
+        self.assertEqual(self.app.fragments.misses, misses)
+        self.assertEqual(self.app.fragments.hits, 20)
+        self.assertIn(b'<a href="/story/3">Story 3</a>', second)
+
+        self.client.get('/story/1')
+        self.client.get('/story/2')
+        self.assertEqual(self.app.fragments.hits, 21)
+
+    def test_changed_story_new_fragment(self):
+        with self.app.test_request_context():
+            story = make_story(1)
+            before = story_item(story)
+            story['likes'] = 1
+            after = story_item(story)
+        self.assertIn('Likes: 0', before)
+        self.assertIn('Likes: 1', after)
+
+    def test_render_stats(self):
+        self.client.get('/explore').data
+        self.client.get('/story/1')
+        stats = self.app.render_stats.stats()
+        self.assertEqual(stats['explore.html']['count'], 1)
+        self.assertEqual(stats['story.html']['count'], 1)
+        self.assertGreater(stats['story.html']['max'], 0)
+        self.assertIn('templates', self.client.get('/metrics/json').json)
@@ -0,0 +1,24 @@
+import unittest
+
+from gateway.classes.user import SessionUser, User
+
+
+class TestUser(unittest.TestCase):
+
+    def test_immutable(self):
+        user = User(1, 'Ann')
+        with self.assertRaises(AttributeError):
+            user.is_authenticated = True
+        with self.assertRaises(AttributeError):
+            user.lastname = 'Smith'
+        self.assertFalse(user.is_authenticated)
+
+    def test_session_user(self):
+        user = User(1, 'Ann', is_admin=True)
+        current = SessionUser(user)
+        self.assertTrue(current.is_authenticated)
+        self.assertFalse(current.is_anonymous)
+        self.assertEqual(current.get_id(), 1)
+        self.assertEqual(current.firstname, 'Ann')
+        self.assertTrue(current.is_admin)
+        self.assertFalse(user.is_authenticated)
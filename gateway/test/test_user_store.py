@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+import unittest
+
+from gateway.classes.user import User
+from gateway.user_store import MemoryUserStore, SqliteUserStore
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestMemoryUserStore(unittest.TestCase):
+
+    def test_least_recently_used_is_evicted(self):
+        store = MemoryUserStore(max_size=2)
+        store['1'] = User(1, 'one')
+        store['2'] = User(2, 'two')
+        store.get('1')
+        store['3'] = User(3, 'three')
+        self.assertIn('1', store)
+        self.assertNotIn('2', store)
+        self.assertIn('3', store)
+        self.assertEqual(len(store), 2)
+
+    def test_expired_users_are_gone(self):
+        store = MemoryUserStore(ttl=0.01)
+        store['1'] = User(1, 'one')
+        time.sleep(0.02)
+        self.assertIsNone(store.get('1'))
+
+    def test_pop(self):
+        store = MemoryUserStore()
+        store['1'] = User(1, 'one')
+        self.assertEqual(store.pop('1').firstname, 'one')
+        self.assertIsNone(store.pop('1'))
+
+
+class TestSqliteUserStore(StubTestCase):
+    services = ('auth', 'stats', 'stories')
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_shared_between_stores(self):
+        one, other = SqliteUserStore(self.path), SqliteUserStore(self.path)
+        user = User(1, 'one', True)
+        one['1'] = user
+        shared = other.get('1')
+        self.assertEqual(shared.user_id, 1)
+        self.assertEqual(shared.firstname, 'one')
+        self.assertTrue(shared.is_admin)
+        other.pop('1')
+        self.assertNotIn('1', one)
+
+    def test_expired_users_are_gone(self):
+        store = SqliteUserStore(self.path, ttl=-1)
+        store['1'] = User(1, 'one')
+        self.assertIsNone(store.get('1'))
+        self.assertEqual(len(store), 0)
+
+    def test_login_seen_by_another_process(self):
+        config = {'USER_STORE': 'sqlite', 'USER_STORE_URL': self.path}
+        one, other = self.gateway(**config), self.gateway(**config)
+        reply = one.test_client().post('/login', data={'email': 'example@example.com', 'password': 'admin'})
+        name, value = reply.headers['Set-Cookie'].split(';')[0].split('=', 1)
+        client = other.test_client()
+        client.set_cookie('localhost', name, value)
+        reply = client.get('/my_wall')
+        self.assertEqual(reply.status_code, 200)
@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from gateway.classes.user import User
+
+
+def _dump(user):
+    return json.dumps([user.user_id, user.firstname, user.is_admin])
+
+
+def _load(data):
+    user_id, firstname, is_admin = json.loads(data)
+    return User(user_id, firstname, is_admin)
+
+
+class MemoryUserStore:
+    """
+    Logged users of this process, bounded in size (least recently used
+    users are dropped first) and in time (`ttl` seconds after login).
+    """
+    def __init__(self, max_size=100000, ttl=86400):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, default=None):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return default
+            expires, user = entry
+            if expires < time.monotonic():
+                del self._users[user_id]
+                return default
+            self._users.move_to_end(user_id)
+            return user
+
+    def __setitem__(self, user_id, user):
+        with self._lock:
+            self._users[user_id] = (time.monotonic() + self.ttl, user)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def pop(self, user_id, default=None):
+        with self._lock:
+            entry = self._users.pop(user_id, None)
+        return default if entry is None else entry[1]
+
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
+
+    def __len__(self):
+        return len(self._users)
+
+
+def sqlite_connection(local, path):
+    """
+    The connection to the sqlite file `path` of the current thread, kept in
+    the thread local `local`.
+    """
+    # One connection per thread, and never reuse one across a fork.
+    pid = os.getpid()
+    if getattr(local, 'pid', None) != pid:
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        local.connection = connection
+        local.pid = pid
+    return local.connection
+
+
+class SqliteUserStore:
+    """
+    Logged users shared by all the worker processes of a node through a
+    local sqlite file.
+    """
+    def __init__(self, path, ttl=86400):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._connection().execute('CREATE TABLE IF NOT EXISTS users ('
+                                   'user_id TEXT PRIMARY KEY, data TEXT, expires REAL)')
+
+    def _connection(self):
+        return sqlite_connection(self._local, self.path)
+
+    def get(self, user_id, default=None):
+        row = self._connection().execute('SELECT data FROM users WHERE user_id = ? AND expires > ?',
+                                         (user_id, time.time())).fetchone()
+        return default if row is None else _load(row[0])
+
+    def __setitem__(self, user_id, user):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('INSERT OR REPLACE INTO users VALUES (?, ?, ?)',
+                           (user_id, _dump(user), now + self.ttl))
+        connection.execute('DELETE FROM users WHERE expires <= ?', (now,))
+
+    def pop(self, user_id, default=None):
+        user = self.get(user_id, default)
+        self._connection().execute('DELETE FROM users WHERE user_id = ?', (user_id,))
+        return user
+
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM users WHERE expires > ?',
+                                          (time.time(),)).fetchone()[0]
+
+
+class RedisUserStore:
+    """
+    Logged users shared by every gateway node through a redis server (or
+    anything speaking its protocol). Needs the optional `redis` package.
+    """
+    def __init__(self, url, ttl=86400, prefix='gateway:user:'):
+        import redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, user_id, default=None):
+        data = self._redis.get(self.prefix + user_id)
+        return default if data is None else _load(data)
+
+    def __setitem__(self, user_id, user):
+        self._redis.setex(self.prefix + user_id, self.ttl, _dump(user))
+
+    def pop(self, user_id, default=None):
+        user = self.get(user_id, default)
+        self._redis.delete(self.prefix + user_id)
+        return user
+
+    def __contains__(self, user_id):
+        return self._redis.exists(self.prefix + user_id) > 0
+
+    def __len__(self):
+        return sum(1 for _ in self._redis.scan_iter(self.prefix + '*'))
+
+
+def make_user_store(config):
+    kind = config.get('USER_STORE', 'memory')
+    ttl = config.get('USER_STORE_TTL', 86400)
+    if kind == 'memory':
+        return MemoryUserStore(config.get('USER_STORE_SIZE', 100000), ttl)
+    elif kind == 'sqlite':
+        return SqliteUserStore(config['USER_STORE_URL'], ttl)
+    elif kind == 'redis':
+        return RedisUserStore(config['USER_STORE_URL'], ttl)
+    raise ValueError('Unknown user store: ' + kind)
@@ -1,6 +1,9 @@
 from .auth import auth
 from .users import users
 from .stories import stories
+from .metrics import metrics
+from .api import api
+from .assets import assets
 
 
-blueprints = [auth, users, stories]
+blueprints = [auth, users, stories, metrics, api, assets]
@@ -0,0 +1,90 @@
+import math
+
+from flask import Blueprint, abort, jsonify, request
+from flask import current_app as app
+from flask_login import current_user, login_required
+
+from gateway.backend import Call
+
+
+api = Blueprint('api', __name__)
+
+MAX_OPERATIONS = 50
+
+REACTIONS = {
+    'like': ('POST', "/like"),
+    'dislike': ('POST', "/dislike"),
+    'remove_like': ('DELETE', "/like"),
+    'remove_dislike': ('DELETE', "/dislike"),
+}
+
+def _call(operation):
+    op = operation.get('op')
+    story_id = operation.get('story_id')
+    user_id = current_user.get_id()
+    if op in REACTIONS and isinstance(story_id, int):
+        method, path = REACTIONS[op]
+        return Call('reactions', path, method=method, json={'user_id': user_id, 'story_id': story_id})
+    elif op == 'story' and isinstance(story_id, int):
+        return Call('stories', "/story/" + str(story_id) + "/" + str(user_id))
+    elif op == 'random_story':
+        return Call('stories', "/random-story/" + str(user_id))
+    elif op == 'stories':
+        return Call('stories', "/stories", cache='stories')
+    return None
+
+def _limited(operation):
+    # A reaction of a batch takes its token from the buckets of the page
+    # doing the same reaction, so batching does not get around the limits.
+    rule = '/story/<int:story_id>/' + operation['op']
+    return app.rate_limiter.check(rule, 'GET', current_user.get_id(), request.remote_addr)
+
+def _result(r):
+    if isinstance(r, Exception):
+        return {'status': 502, 'error': 'backend unavailable'}
+    try:
+        body = r.json()
+    except ValueError:
+        body = None
+    return {'status': r.status_code, 'body': body}
+
+"""
+This route lets a logged user run several story reads and reactions in a single
+request. The body is {"operations": [{"op": "like", "story_id": 1}, {"op": "story", "story_id": 1}, ...]},
+with op one of story, stories, random_story, like, dislike, remove_like and remove_dislike.
+Operations run concurrently, so a read does not see a reaction of the same batch.
+Each reaction counts against the rate limits of its own page: those over them are
+not run and get a 429 result with the seconds to wait in "retry_after".
+The reply holds one {"status": ..., "body": ...} result per operation, in the same order.
+"""
+@api.route('/api/batch', methods=['POST'])
+@login_required
+def _batch():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('operations'), list):
+        abort(400)
+    operations = payload['operations']
+    if len(operations) > MAX_OPERATIONS:
+        abort(400)
+
+    results = [None] * len(operations)
+    calls = []
+    for index, operation in enumerate(operations):
+        call = _call(operation) if isinstance(operation, dict) else None
+        if call is None:
+            results[index] = {'status': 400, 'error': 'unknown operation'}
+            continue
+        wait = _limited(operation) if call.service == 'reactions' else 0
+        if wait:
+            results[index] = {'status': 429, 'error': 'too many requests', 'retry_after': math.ceil(wait)}
+            continue
+        calls.append((index, call))
+
+    replies = app.backend.gather(*[call for _, call in calls])
+    for (index, call), r in zip(calls, replies):
+        if call.service == 'reactions' and not isinstance(r, Exception) and r.status_code == 200:
+            app.backend.invalidate('stories')
+            app.backend.invalidate('rank')
+        results[index] = _result(r)
+
+    return jsonify(results=results)
@@ -0,0 +1,30 @@
+from flask import Blueprint, abort, send_file, send_from_directory
+from flask import current_app as app
+
+
+assets = Blueprint('assets', __name__)
+
+"""
+This route serves the built static images. Their names change with their
+content, so browsers may keep them forever without asking again.
+"""
+@assets.route('/assets/<path:filename>')
+def _asset(filename):
+    response = send_from_directory(app.assets.directory, filename,
+                                   cache_timeout=app.config['ASSETS_MAX_AGE'])
+    return _immutable(response)
+
+"""
+This route serves the image of the dice of a roll outcome, made the first time
+it is asked. The url names the sprite it is cut from, so it never changes either.
+"""
+@assets.route('/dice/<theme>/<version>/<cells>.<kind>')
+def _dice_strip(theme, version, cells, kind):
+    path = app.dice_strips.path(theme, version, cells, kind)
+    if path is None:
+        abort(404)
+    return _immutable(send_file(path, cache_timeout=app.config['ASSETS_MAX_AGE'], conditional=True))
+
+def _immutable(response):
+    response.headers['Cache-Control'] = 'public, max-age=%d, immutable' % app.config['ASSETS_MAX_AGE']
+    return response
@@ -1,19 +1,21 @@
-import requests
 import json
+import math
 
 from flask_login import current_user, login_user, logout_user, login_required
 from flask import Blueprint, render_template, redirect, request, url_for, abort
 from sqlalchemy.exc import IntegrityError
 from flask import current_app as app
 
-from gateway.forms import LoginForm, UserForm
-from gateway.classes.user import User
+from gateway.auth import forget_user, remember_user
+from gateway.forms import MAX_CHAR_PWD, LoginForm, UserForm
+from gateway.classes.user import SessionUser, User
 
 auth = Blueprint('auth', __name__)
-auth_url = "http://auth:5000"
 
 """
 This route is used to display the form to let the user login.
+Failed attempts are throttled by the gateway: past a few of them, and for
+passwords the auth service just refused, it answers without asking it.
 """
 @auth.route('/login', methods=['GET', 'POST'])
 def login(message=''):
@@ -23,20 +25,36 @@ def login(message=''):
     form = LoginForm()
     form.message = message
     if form.validate_on_submit():
+        email = form.data['email']
+        password = form.data['password']
+        throttle = app.login_throttle
+        wait = throttle.blocked(email, request.remote_addr)
+        if wait:
+            form.message = "Too many failed attempts, try again in " + str(math.ceil(wait)) + " seconds."
+            return render_template('login.html', form=form, notlogged=True), 429
+
+        # No account can have a password longer than signup allows.
+        if len(password) > MAX_CHAR_PWD or throttle.known_bad(email, password):
+            throttle.failed(email, password, request.remote_addr)
+            form.message = "User or Password not correct!"
+            return render_template('login.html', form=form, notlogged=True)
+
         data = {
-            'email': form.data['email'],
-            'password': form.data['password']
+            'email': email,
+            'password': password
         }
-        r = requests.post(auth_url + "/login", json=data, timeout=1)
+        r = app.backend.post('auth', "/login", json=data)
         if r.status_code == 200:
+            throttle.succeeded(email)
             user_info = r.json()
             user_id = user_info['user_id']
             firstname = user_info['firstname']
             user = User(user_id, firstname)
-            app.users[str(user_id)] = user
-            login_user(user)
+            remember_user(user)
+            login_user(SessionUser(user))
             return redirect('/')
         elif r.status_code == 401:
+            throttle.failed(email, password, request.remote_addr)
             form.message = "User or Password not correct!"
         else:
             abort(500)
@@ -51,7 +69,7 @@ This route is used to let the user logout.
 def logout():
     user_id = current_user.get_id()
     logout_user()
-    del app.users[str(user_id)]
+    forget_user(user_id)
     return redirect('/')
 
 """
@@ -72,14 +90,15 @@ def create_user():
 			'dateofbirth': form.dateofbirth.data.strftime("%m/%d/%Y")
 		}
 
-        r = requests.post(auth_url + "/signup", json=new_user, timeout=1)
+        r = app.backend.post('auth', "/signup", json=new_user)
         if r.status_code == 200:
+            app.login_throttle.forget(new_user['email'])
             user_info = r.json()
             user_id = user_info['user_id']
             firstname = user_info['firstname']
             user = User(user_id, firstname)
-            app.users[str(user_id)] = user
-            login_user(user)
+            remember_user(user)
+            login_user(SessionUser(user))
             return redirect('/')
         elif r.status_code == 409:
             form.message = "Seems like this email is already used"
@@ -0,0 +1,33 @@
+from flask import Blueprint, Response, jsonify
+from flask import current_app as app
+
+from gateway.instrumentation import prometheus
+
+
+metrics = Blueprint('metrics', __name__)
+
+"""
+This route exposes the latency histograms and the counters of the gateway to
+prometheus.
+"""
+@metrics.route('/metrics')
+def _metrics():
+    return Response(prometheus(app), mimetype='text/plain; version=0.0.4')
+
+"""
+This route exposes the internal counters of the gateway as json.
+"""
+@metrics.route('/metrics/json')
+def _metrics_json():
+    return jsonify(cache=app.backend.cache.stats(),
+                   coalescing=app.backend.flights.stats(),
+                   breakers={service: breaker.stats() for service, breaker in app.backend.breakers.items()},
+                   instances=app.backend.services.stats(),
+                   retries={service: budget.stats() for service, budget in app.backend.retry_budgets.items()},
+                   hedging=app.backend.hedging.stats() if app.backend.hedging is not None else None,
+                   admission=app.admission.stats(),
+                   rate_limits=app.rate_limiter.stats(),
+                   logins=app.login_throttle.stats(),
+                   fragments=app.fragments.stats(),
+                   dice_strips=app.dice_strips.stats(),
+                   templates=app.render_stats.stats())
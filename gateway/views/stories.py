@@ -1,23 +1,30 @@
 import datetime
-import requests
-import json
 import re
+from urllib.parse import urlencode
 
 from flask import Blueprint, redirect, render_template, request, abort
+from flask import current_app as app
 from flask_login import current_user, login_user, logout_user, login_required
 from sqlalchemy.sql.expression import func
 
 from gateway.auth import admin_required, current_user
+from gateway.backend import Call, Story
+from gateway.templating import stream_template
 
 
 stories = Blueprint('stories', __name__)
-stories_url = "http://stories:5000"
-rank_url = "http://rank:5000"
-reactions_url = "http://reactions:5000"
+
+def _invalidate(*policies):
+    """
+    Forget the cached replies of `policies` after a write changed them.
+    """
+    for policy in policies:
+        app.backend.invalidate(policy)
 
 """
 This route returns, if the user is logged in, the list of stories of the followed writers
-and a list of suggested stories that the user could be interested in.
+and a list of suggested stories that the user could be interested in, when the rank
+service answers in time.
 If not logged, the anonymous user is redirected to the login page.
 """
 @stories.route('/', methods=['GET'])
@@ -25,48 +32,63 @@ def _myhome(message=''):
     if current_user.is_anonymous:
         return redirect("/login", code=302)
 
-    r = requests.get(stories_url + "/following-stories/" + str(current_user.get_id()), timeout=1)
-    if r.status_code != 200:
-        abort(500)
-    followed_stories = r.json()['stories']
-
-    r = requests.get(rank_url + "/rank/" + str(current_user.get_id()), timeout=1)
-    if r.status_code != 200:
-        abort(500)
-    suggested_stories = r.json()['stories']
+    followed, suggested = app.backend.fanout(
+        Call('stories', "/following-stories/" + str(current_user.get_id()), hedge=True),
+        Call('rank', "/rank/" + str(current_user.get_id()), cache='rank',
+             required=False, budget=app.config['BACKEND_OPTIONAL_BUDGET'])
+    )
+    followed_stories = followed.stories()
+    # Suggestions are optional: without them the section is left out.
+    suggested_stories = suggested.stories() if suggested is not None else None
 
     return render_template("home.html", followed_stories=followed_stories, suggested_stories=suggested_stories)
 
 """
 This route returns, if the user is logged in, the list of all stories from all users
-in the social network. The POST is used to filters those stories by user picked date.
+in the social network, one page at a time (the cursor of the next page comes from the
+stories service), streamed to the client while it is rendered.
+The POST is used to filters those stories by user picked date, answered from the
+story index of the gateway when it is available.
 If not logged, the anonymous user is redirected to the login page.
 """
 @stories.route('/explore', methods=['GET', 'POST'])
-@login_required
 def _stories(message=''):
-    if request.method == 'POST':
-        beginDate = request.form["beginDate"]
-        if beginDate == "":
-            beginDate = str(datetime.date.min)
-
-        endDate = request.form["endDate"]
-        if endDate == "":
-            endDate = str(datetime.date.max)
-
-        r = requests.get(stories_url + "/stories?start=" + beginDate + "&end=" + endDate, timeout=1)
-        if r.status_code != 200:
-            abort(500)
+    if current_user.is_anonymous:
+        return redirect("/login", code=302)
 
-        filtered_stories = r.json()['stories']
-        return render_template("explore.html", message="Filtered stories", stories=filtered_stories)
+    if request.method == 'POST':
+        beginDate = request.form["beginDate"] or None
+        endDate = request.form["endDate"] or None
+
+        filtered_stories = None
+        if app.story_index is not None:
+            filtered_stories = app.story_index.between(beginDate, endDate)
+        if filtered_stories is None:
+            r = app.backend.get('stories', "/stories?" + urlencode({
+                'start': beginDate or str(datetime.date.min),
+                'end': endDate or str(datetime.date.max)}))
+            if r.status_code != 200:
+                abort(500)
+            filtered_stories = r.stories()
+
+        return stream_template("explore.html", message="Filtered stories", stories=filtered_stories)
     else:
-        r = requests.get(stories_url + "/stories", timeout=1)
+        path = "/stories"
+        if app.config['EXPLORE_PAGE_SIZE']:
+            page = {'limit': app.config['EXPLORE_PAGE_SIZE']}
+            if request.args.get('cursor'):
+                page['cursor'] = request.args['cursor']
+            path += "?" + urlencode(page)
+
+        r = app.backend.get('stories', path, cache='stories')
         if r.status_code != 200:
             abort(500)
 
-        stories = r.json()['stories']
-        return render_template("explore.html", message=message, stories=stories)
+        reply = r.json()
+        loads = r.codec.loads
+        return stream_template("explore.html", message=message,
+                               stories=[Story(story, loads) for story in reply['stories']],
+                               next_cursor=reply.get('next_cursor'))
 
 """
 This route requires the user to be logged in and returns an entire published story
@@ -76,17 +98,36 @@ options for like/dislike/delete (if authorized) options.
 @stories.route('/story/<int:story_id>')
 @login_required
 def _story(story_id, message=''):
-    r = requests.get(stories_url + "/story/" + str(story_id) + "/" + str(current_user.get_id()), timeout=1)
+    r = app.backend.get('stories', "/story/" + str(story_id) + "/" + str(current_user.get_id()), hedge=True)
+    return _render_story(r, message)
+
+def _render_story(r, message=''):
     if r.status_code == 404:
         message = 'Ooops.. Story not found!'
         return render_template("message.html", message=message)
     elif r.status_code != 200:
         abort(500)
 
-    story = r.json()
-    rolls_outcome = json.loads(story['rolls_outcome'])
+    story = r.story()
     return render_template("story.html", message=message, story=story,
-                           current_user=current_user, rolls_outcome=rolls_outcome)
+                           current_user=current_user, rolls_outcome=story.rolls_outcome)
+
+def _react(story_id, method, path):
+    """
+    Send a reaction, then fetch the story to display, so that the page
+    shows the counts with the reaction in. The story is not fetched when
+    the reaction found no story.
+    """
+    data = {
+        'user_id': current_user.get_id(),
+        'story_id': story_id
+    }
+    r = app.backend.request('reactions', method, path, json=data)
+    if r.status_code not in (200, 404, 409):
+        abort(500)
+    if r.status_code == 404:
+        return r, None
+    return r, app.backend.get('stories', "/story/" + str(story_id) + "/" + str(current_user.get_id()))
 
 """
 In this route the user must be be logged in, and deletes a published story
@@ -95,7 +136,7 @@ if the author id is the same of the user calling it.
 @stories.route('/story/<story_id>/delete')
 @login_required
 def _delete_story(story_id):
-    r = requests.delete(stories_url + "/story/" + str(story_id) + "/" + str(current_user.get_id()), timeout=1)
+    r = app.backend.delete('stories', "/story/" + str(story_id) + "/" + str(current_user.get_id()))
     if r.status_code == 404:
         abort(404)
     elif r.status_code == 401:
@@ -103,6 +144,13 @@ def _delete_story(story_id):
     elif r.status_code != 200:
         abort(500)
 
+    _invalidate('stories', 'writers', 'rank')
+    if app.story_index is not None:
+        # The index holds the int ids of the stories service.
+        try:
+            app.story_index.discard(int(story_id))
+        except ValueError:
+            pass
     message = 'Story sucessfully deleted'
     return render_template("message.html", message=message)
 
@@ -113,10 +161,10 @@ written from someone else user.
 @stories.route('/random_story')
 @login_required
 def _random_story(message=''):
-    r = requests.get(stories_url + "/random-story/" + str(current_user.get_id()), timeout=1)
+    r = app.backend.get('stories', "/random-story/" + str(current_user.get_id()))
     if r.status_code == 200:
-        story = r.json()
-        rolls_outcome = json.loads(story['rolls_outcome'])
+        story = r.story()
+        rolls_outcome = story.rolls_outcome
     elif r.status_code == 404:
         message = 'Ooops.. No random story for you!'
         rolls_outcome = []
@@ -133,21 +181,16 @@ The route can be used by a logged in user to like a published story.
 @stories.route('/story/<int:story_id>/like')
 @login_required
 def _like(story_id):
-    data = {
-        'user_id': current_user.get_id(),
-        'story_id': story_id
-    }
-    r = requests.post(reactions_url + "/like", json=data, timeout=1)
+    r, story_r = _react(story_id, 'POST', "/like")
     if r.status_code == 200:
+        _invalidate('stories', 'rank')
         message = 'Like added!'
     elif r.status_code == 409:
         message = "You've already liked this story!"
     elif r.status_code == 404:
         abort(404)
-    else:
-        abort(500)
 
-    return _story(story_id, message)
+    return _render_story(story_r, message)
 
 """
 The route can be used by a logged in user to dislike a published story.
@@ -155,21 +198,16 @@ The route can be used by a logged in user to dislike a published story.
 @stories.route('/story/<int:story_id>/dislike')
 @login_required
 def _dislike(story_id):
-    data = {
-        'user_id': current_user.get_id(),
-        'story_id': story_id
-    }
-    r = requests.post(reactions_url + "/dislike", json=data, timeout=1)
+    r, story_r = _react(story_id, 'POST', "/dislike")
     if r.status_code == 200:
+        _invalidate('stories', 'rank')
         message = 'Dislike added!'
     elif r.status_code == 409:
         message = "You've already disliked this story!"
     elif r.status_code == 404:
         abort(404)
-    else:
-        abort(500)
 
-    return _story(story_id, message)
+    return _render_story(story_r, message)
 
 """
 The route can be used by a logged in user to remove a like
@@ -178,21 +216,16 @@ from a published story.
 @stories.route('/story/<int:story_id>/remove_like')
 @login_required
 def _remove_like(story_id):
-    data = {
-        'user_id': current_user.get_id(),
-        'story_id': story_id
-    }
-    r = requests.delete(reactions_url + "/like", json=data, timeout=1)
+    r, story_r = _react(story_id, 'DELETE', "/like")
     if r.status_code == 200:
+        _invalidate('stories', 'rank')
         message = 'You removed your like'
     elif r.status_code == 409:
         message = 'You have to like it first!'
     elif r.status_code == 404:
         abort(404)
-    else:
-        abort(500)
 
-    return _story(story_id, message)
+    return _render_story(story_r, message)
     
 """
 The route can be used by a logged in user and to remove a dislike
@@ -201,21 +234,16 @@ from a published story.
 @stories.route('/story/<int:story_id>/remove_dislike')
 @login_required
 def _remove_dislike(story_id):
-    data = {
-        'user_id': current_user.get_id(),
-        'story_id': story_id
-    }
-    r = requests.delete(reactions_url + "/dislike", json=data, timeout=1)
+    r, story_r = _react(story_id, 'DELETE', "/dislike")
     if r.status_code == 200:
+        _invalidate('stories', 'rank')
         message = 'You removed your dislike'
     elif r.status_code == 409:
         message = 'You have to dislike it first!'
     elif r.status_code == 404:
         abort(404)
-    else:
-        abort(500)
 
-    return _story(story_id, message)
+    return _render_story(story_r, message)
 
 """
 This route requires the user to be logged in and lets the user select the dice set theme
@@ -228,7 +256,7 @@ Otherwise it redirects to /write_story of the pending draft.
 @login_required
 def new_stories():
     if request.method == 'GET':
-        r = requests.get(stories_url + "/retrieve-set-themes", timeout=1)
+        r = app.backend.get('stories', "/retrieve-set-themes", cache='themes')
         if r.status_code != 200:
             abort(500)
 
@@ -242,7 +270,7 @@ def new_stories():
             'dice_number': int(request.form["dice_number"]),
             'author_name': current_user.firstname
         }
-        r = requests.post(stories_url + "/new-draft", json=data, timeout=1)
+        r = app.backend.post('stories', "/new-draft", json=data)
         if r.status_code != 200:
             abort(500)
         
@@ -257,7 +285,7 @@ In both cases the used will be able to save it as draft or publish it.
 @stories.route('/write_story/<story_id>', methods=['POST', 'GET'])
 @login_required
 def write_story(story_id):
-    r = requests.get(stories_url + "/story/" + str(story_id) + "/" + str(current_user.get_id()), timeout=1)
+    r = app.backend.get('stories', "/story/" + str(story_id) + "/" + str(current_user.get_id()))
     if r.status_code == 404:
         abort(404)
     elif r.status_code == 401:
@@ -265,9 +293,9 @@ def write_story(story_id):
     elif r.status_code != 200:
         abort(500)
 
-    story = r.json()
-    rolls_outcome = json.loads(story['rolls_outcome'])
-    theme = story['theme']
+    story = r.story()
+    rolls_outcome = story.rolls_outcome
+    theme = story.theme
 
     if request.method == 'POST':
         story = {}
@@ -275,17 +303,19 @@ def write_story(story_id):
         story['published'] = request.form["store_story"] == "1"
         story['title'] = request.form["title"]
         story['story_id'] = int(story_id)
-        r = requests.put(stories_url + "/write-story", json=story, timeout=1)
+        r = app.backend.put('stories', "/write-story", json=story)
         if r.status_code != 200:
             message = r.json()['description']
-            return render_template("/write_story.html", theme=theme, outcome=rolls_outcome,
+            return render_template("write_story.html", theme=theme, outcome=rolls_outcome,
                                    title=story['title'], text=story['text'], message=message)
 
+        _invalidate('stories', 'writers', 'rank')
+
         if story['published']:
             return redirect("../story/" + str(story['story_id']), code=302)
         else:
             return redirect("../", code=302)
 
-    return render_template("/write_story.html", theme=story['theme'], outcome=rolls_outcome,
+    return render_template("write_story.html", theme=story['theme'], outcome=rolls_outcome,
                            title=story['title'], text=story['text'], message="")
 
@@ -1,17 +1,76 @@
+import unittest # pragma: no cover
+
 from gateway.app import create_app # pragma: no cover
+from gateway.bench.stubs import SERVICES, StubCluster # pragma: no cover
 
+from flask.testing import FlaskClient # pragma: no cover
 from flask_testing import TestCase # pragma: no cover
- 
-class TestHelper(TestCase): # pragma: no cover
+
+
+class StubTestCase(unittest.TestCase): # pragma: no cover
+    """
+    Tests of a gateway whose backends are stubs: a StubCluster of `services`
+    made with the `stubs` options, started once for the test case.
+    """
+    services = SERVICES
+    stubs = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cluster = StubCluster(services=cls.services, **cls.stubs)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cluster.shutdown()
+
+    def gateway(self, services=None, **config):
+        """
+        A gateway app calling the stubs, or the urls of `services` instead.
+        """
+        urls = dict(self.cluster.urls, **(services or {}))
+        return create_app(test=True, config=dict(config, BACKEND_SERVICES=urls))
+
+    def logged(self, app, email='example@example.com', password='admin'):
+        """
+        A test client of `app` logged in as `email`.
+        """
+        client = app.test_client()
+        client.post('/login', data={'email': email, 'password': password})
+        return client
+
+
+class BufferedClient(FlaskClient): # pragma: no cover
+    # Reads streamed pages to the end, so that their templates are seen.
+    def open(self, *args, **kwargs):
+        kwargs.setdefault('buffered', True)
+        return super().open(*args, **kwargs)
+
+
+class TestHelper(TestCase, StubTestCase): # pragma: no cover
+    """
+    View tests on stubs holding what the test database held, the admin and
+    their story, started again for each test since the tests change them.
+    """
+    stubs = {'stories': 1}
+
+    @classmethod
+    def setUpClass(cls):
+        pass
+
+    @classmethod
+    def tearDownClass(cls):
+        pass
+
     def create_app(self):
-        self.app = create_app(test=True)
+        self.cluster = StubCluster(services=self.services, **self.stubs)
+        self.app = self.gateway()
+        self.app.test_client_class = BufferedClient
         self.context = self.app.app_context()
         self.client = self.app.test_client()
         return self.app
 
     def tearDown(self):
-        with self.context:
-            db.drop_all()
+        self.cluster.shutdown()
 
     def _login(self, email, password, follow_redirects=False):
         return self.client.post('/login', follow_redirects=follow_redirects, data={
@@ -0,0 +1,56 @@
+import time
+
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestBatchApi(StubTestCase):
+    services = ('auth', 'stories', 'reactions')
+    stubs = {'latency': 0.05}
+
+    def setUp(self):
+        self.app = self.gateway()
+        self.client = self.logged(self.app)
+
+    def test_login_required(self):
+        reply = self.app.test_client().post('/api/batch', json={'operations': []})
+        self.assertEqual(reply.status_code, 401)
+
+    def test_batch(self):
+        operations = [{'op': 'like', 'story_id': i} for i in range(1, 11)]
+        operations += [{'op': 'story', 'story_id': 1}, {'op': 'nope'}, {'op': 'like', 'story_id': 'x'}]
+        reply = self.client.post('/api/batch', json={'operations': operations})
+        self.assertEqual(reply.status_code, 200)
+        results = reply.json['results']
+        self.assertEqual(len(results), 13)
+        self.assertTrue(all(result['status'] == 200 for result in results[:11]))
+        self.assertEqual(results[10]['body']['id'], 1)
+        self.assertEqual(results[11]['status'], 400)
+        self.assertEqual(results[12]['status'], 400)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.post('/api/batch', data='nope').status_code, 400)
+        operations = [{'op': 'story', 'story_id': 1}] * 51
+        self.assertEqual(self.client.post('/api/batch', json={'operations': operations}).status_code, 400)
+
+    def test_reactions_share_the_page_limits(self):
+        limits = {'/story/<int:story_id>/like': [{'per': 'user', 'rate': 0.5, 'burst': 2}]}
+        client = self.logged(self.gateway(RATE_LIMITS=limits))
+        self.assertEqual(client.get('/story/1/like').status_code, 200)
+        reactions = self.cluster.hits('reactions')
+        operations = [{'op': 'like', 'story_id': i} for i in range(1, 4)] + [{'op': 'dislike', 'story_id': 1}]
+        results = client.post('/api/batch', json={'operations': operations}).json['results']
+        self.assertEqual([result['status'] for result in results], [200, 429, 429, 200])
+        self.assertEqual(results[1]['retry_after'], 2)
+        self.assertEqual(self.cluster.hits('reactions') - reactions, 2)
+        self.assertEqual(client.get('/story/1/like').status_code, 429)
+
+    def test_reaction_page_reads_after_the_write(self):
+        stories, reactions = self.cluster.hits('stories'), self.cluster.hits('reactions')
+        started = time.monotonic()
+        reply = self.client.get('/story/1/like')
+        # One call after the other, each delayed by the stubs.
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertEqual(reply.status_code, 200)
+        self.assertIn(b'Like added!', reply.data)
+        self.assertEqual(self.cluster.hits('stories') - stories, 1)
+        self.assertEqual(self.cluster.hits('reactions') - reactions, 1)
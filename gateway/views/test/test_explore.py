@@ -0,0 +1,32 @@
+from gateway.views.test.TestHelper import StubTestCase
+
+
+class TestExplore(StubTestCase):
+    services = ('auth', 'stories')
+    stubs = {'stories': 25}
+
+    def login(self, page_size):
+        return self.logged(self.gateway(EXPLORE_PAGE_SIZE=page_size))
+
+    def test_pages(self):
+        client = self.login(10)
+        reply = client.get('/explore')
+        self.assertEqual(reply.status_code, 200)
+        self.assertIn(b'Story 10<', reply.data)
+        self.assertNotIn(b'Story 11<', reply.data)
+        self.assertIn(b'/explore?cursor=10', reply.data)
+
+        reply = client.get('/explore?cursor=20')
+        self.assertIn(b'Story 25<', reply.data)
+        self.assertNotIn(b'Story 20<', reply.data)
+        self.assertNotIn(b'More stories', reply.data)
+
+    def test_unpaginated(self):
+        reply = self.login(0).get('/explore')
+        self.assertIn(b'Story 25<', reply.data)
+        self.assertNotIn(b'More stories', reply.data)
+
+    def test_streamed(self):
+        reply = self.login(25).get('/explore', buffered=False)
+        self.assertGreater(len(list(reply.response)), 1)
+        reply.close()
@@ -124,7 +124,7 @@ class TestAuth(TestHelper):
         self._login("fantastic@example.com", "betterNerfIrelia")
         reply = self.client.get('/write_story/2')
         self.assertEqual(reply.status_code, 200)
-        self.assert_template_used("/write_story.html")
+        self.assert_template_used("write_story.html")
 
         # error: title needed
         reply = self.client.post('/write_story/2', data={
@@ -150,7 +150,7 @@ class TestAuth(TestHelper):
                  'text' : "1",
                  'title' : "ThisIsATitle",
                  'store_story' : 0})
-        self.assert_template_used("/write_story.html")      
+        self.assert_template_used("write_story.html")      
         
         
         
@@ -1,16 +1,13 @@
-import requests
 
 from flask import Blueprint, redirect, render_template, request, url_for, abort
+from flask import current_app as app
 from flask_login import current_user, login_user, logout_user, login_required
 
 from gateway.auth import admin_required, current_user
+from gateway.backend import Call
 
 
 users = Blueprint('users', __name__)
-stories_url = "http://stories:5000"
-stats_url = "http://stats:5000"
-followers_url = "http://follows:5000"
-auth_url = "http://auth:5000"
 
 """
 This route returns to a logged user the list of the writers in the social network and
@@ -19,12 +16,11 @@ their last published story (if any).
 @users.route('/users')
 @login_required
 def _users():
-    r = requests.get(stories_url + "/writers-last-stories", timeout=1)
+    r = app.backend.get('stories', "/writers-last-stories", cache='writers')
     if r.status_code != 200:
         abort(500)
 
-    data = r.json()['stories']
-    return render_template("users.html", writers=data)
+    return render_template("users.html", writers=r.stories())
 
 """
 This route returns to a logged user his own wall with his score, pending drafts and published 
@@ -33,22 +29,20 @@ stories.
 @users.route('/my_wall')
 @login_required
 def my_wall():
-    r = requests.get(stories_url + "/stories?drafts=true&writer_id=" + str(current_user.get_id()), timeout=1)
+    r, stats_r = app.backend.fanout(
+        Call('stories', "/stories?drafts=true&writer_id=" + str(current_user.get_id()), ok=(200, 404)),
+        Call('stats', "/stats/" + str(current_user.get_id()),
+             required=False, budget=app.config['BACKEND_OPTIONAL_BUDGET'])
+    )
     if r.status_code == 200:
-        my_stories = r.json()['stories']
+        my_stories = r.stories()
         drafts = [my_story for my_story in my_stories if not my_story['published']]
         published = [my_story for my_story in my_stories if my_story['published']]
-    elif r.status_code == 404:
+    else:
         drafts = []
         published = []
-    else:
-        abort(500)
-
-    r = requests.get(stats_url + "/stats/" + str(current_user.get_id()), timeout=1)
-    if r.status_code != 200:
-        abort(500)
 
-    stats = r.json()['score']
+    stats = stats_r.json()['score'] if stats_r is not None else None
     return render_template("mywall.html", published=published, drafts=drafts, stats=stats)
 
 """
@@ -58,25 +52,23 @@ published stories.
 @users.route('/wall/<int:author_id>', methods=['GET'])
 @login_required
 def wall(author_id):
-    r = requests.get(auth_url + "/user-exists/" + str(author_id))
-    if r.status_code == 404:
+    author_r, r = app.backend.fanout(
+        Call('auth', "/user-exists/" + str(author_id), ok=(200, 404)),
+        Call('stories', "/stories?drafts=false&writer_id=" + str(author_id), ok=(200, 404))
+    )
+    if author_r.status_code == 404:
         message = "Ooops.. Writer not found!"
         return render_template("message.html", message=message)
-    elif r.status_code != 200:
-        abort(500)
 
     author = {
-        'name': r.json()['author_name'],
+        'name': author_r.json()['author_name'],
         'id': author_id
     }
 
-    r = requests.get(stories_url + "/stories?drafts=false&writer_id=" + str(author_id), timeout=1)
     if r.status_code == 200:
-        stories = r.json()['stories']
-    elif r.status_code == 404:
-        stories = []
+        stories = r.stories()
     else:
-        abort(500)
+        stories = []
 
     return render_template("wall.html", stories=stories, author=author, current_user=current_user)
 
@@ -91,8 +83,9 @@ def follow(author_id):
         'followee_id': author_id,
         'user_name': current_user.firstname
     }
-    r = requests.post(followers_url + "/follow", json=data, timeout=1)
+    r = app.backend.post('follows', "/follow", json=data)
     if r.status_code == 200:
+        app.backend.invalidate('rank', 'rank', "/rank/" + str(current_user.get_id()))
         message = "Following!"
     elif r.status_code == 409:
         message = "Already following!"
@@ -115,8 +108,9 @@ def unfollow(author_id):
         'user_id': current_user.get_id(),
         'followee_id': author_id
     }
-    r = requests.delete(followers_url + "/follow", json=data, timeout=1)
+    r = app.backend.delete('follows', "/follow", json=data)
     if r.status_code == 200:
+        app.backend.invalidate('rank', 'rank', "/rank/" + str(current_user.get_id()))
         message = "Unfollowed!"
     elif r.status_code == 409:
         message = "You were not following that particular user!"
@@ -135,7 +129,7 @@ This route lets a logged user see his own followers.
 @users.route('/my_wall/followers', methods=['GET'])
 @login_required
 def my_followers():
-    r = requests.get(followers_url + "/followers-list/" + str(current_user.get_id()), timeout=1)
+    r = app.backend.get('follows', "/followers-list/" + str(current_user.get_id()))
     if r.status_code == 200:
         followers = r.json()['followers']
     elif r.status_code == 404:
@@ -0,0 +1,4 @@
+from gateway.app import create_app
+
+
+app = create_app()